@@ -0,0 +1,58 @@
+"""
+In-memory store of open orders
+Holds every non-terminal order (serialized, in the API shape) indexed by
+id, status and table, so kitchen views never touch SQL. The order
+handlers write to the database first and then update the store.
+"""
+from collections import defaultdict
+from sqlalchemy.orm import Session
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from database import Order
+from archive import TERMINAL_STATUSES
+
+class ActiveOrderStore:
+    """Open orders by id, with status and table indexes; one instance per worker"""
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.orders: Dict[str, dict] = {}
+        self.by_status: Dict[str, Set[str]] = defaultdict(set)
+        self.by_table: Dict[int, Set[str]] = defaultdict(set)
+        self.ready = False
+
+    def load(self, db: Session, serialize: Callable[[Order], dict]):
+        """Replace the store with the open orders in the database"""
+        self.clear()
+        for order in db.query(Order).filter(Order.status.notin_(TERMINAL_STATUSES)).all():
+            self.put(serialize(order))
+        self.ready = True
+
+    def put(self, order: dict):
+        """Add or replace an order; finished orders are dropped"""
+        self.remove(order["id"])
+        if order["status"] in TERMINAL_STATUSES:
+            return
+        self.orders[order["id"]] = order
+        self.by_status[order["status"]].add(order["id"])
+        self.by_table[order["tableNumber"]].add(order["id"])
+
+    def remove(self, order_id: str):
+        order = self.orders.pop(order_id, None)
+        if order is None:
+            return
+        for index, key in ((self.by_status, order["status"]), (self.by_table, order["tableNumber"])):
+            index[key].discard(order_id)
+            if not index[key]:
+                del index[key]
+
+    def get(self, order_id: str) -> Optional[dict]:
+        return self.orders.get(order_id)
+
+    def list(self, statuses: Optional[Iterable[str]] = None, table: Optional[int] = None) -> List[dict]:
+        """Open orders, newest first, optionally narrowed by status and table"""
+        ids = set(self.orders) if table is None else set(self.by_table.get(table, ()))
+        if statuses is not None:
+            ids &= set().union(*(self.by_status.get(status, ()) for status in statuses))
+        return sorted((self.orders[order_id] for order_id in ids), key=lambda o: o["timestamp"], reverse=True)
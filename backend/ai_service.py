@@ -0,0 +1,285 @@
+"""
+AI customization and server suggestion service
+Importable module with a router mounted by the order API (backend/main.py)
+and by the standalone app.py, plus direct call paths for in-process use
+"""
+from fastapi import APIRouter, HTTPException, Depends
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+from typing import List, Optional
+import re
+
+from database import get_db, Order, MenuItem
+from archive import TERMINAL_STATUSES, find_archived_order
+from suggestions import suggest_for_order, suggest_for_orders
+from search import TypoIndex, tokenize
+
+router = APIRouter(prefix="/api/ai", tags=["ai"])
+
+# Request/Response models
+class CustomizationRequest(BaseModel):
+    custom_text: str
+
+class CustomizationResponse(BaseModel):
+    kitchen_instruction: str
+
+class ServerSuggestionRequest(BaseModel):
+    order_id: str
+
+class ServerSuggestionResponse(BaseModel):
+    suggestion: str
+    priority: int = 0
+    wait_minutes: int = 0
+
+class OrderSuggestion(ServerSuggestionResponse):
+    order_id: str
+    table_number: int
+    status: str
+
+# Mock AI data and logic
+SPICE_KEYWORDS = ['spicy', 'hot', 'mild', 'medium', 'extra hot', 'not spicy', 'less spicy']
+INGREDIENT_KEYWORDS = ['paneer', 'cheese', 'onions', 'tomatoes', 'garlic', 'ginger', 'cilantro', 'mint']
+COOKING_KEYWORDS = ['well done', 'medium', 'rare', 'crispy', 'soft', 'grilled', 'fried', 'steamed']
+PORTION_KEYWORDS = ['extra', 'less', 'more', 'double', 'half', 'small', 'large']
+
+# Words from menu text that are never ingredients a guest could add or remove
+NON_INGREDIENT_WORDS = {
+    'with', 'and', 'in', 'of', 'or', 'the', 'from', 'like', 'based', 'style', 'choice', 'non', 'pcs',
+    'spices', 'spiced', 'spicy', 'sweet', 'sweetened', 'sour', 'tangy', 'rich', 'creamy', 'classic',
+    'traditional', 'aromatic', 'fresh', 'freshly', 'warm', 'thin', 'thick', 'light', 'mildly', 'whole',
+    'marinated', 'cooked', 'stuffed', 'filled', 'topped', 'layered', 'tempered', 'toasted', 'roasted',
+    'baked', 'boiled', 'brewed', 'battered', 'assorted', 'mixed', 'loaded', 'flavored', 'mashed',
+    'minced', 'scrambled', 'chilled', 'iced', 'steamed', 'stir', 'deep', 'slow', 'boneless', 'jumbo',
+    'platter', 'dessert', 'drink', 'drinks', 'dish', 'thanks', 'thank', 'please', 'problem', 'need',
+}
+
+# Shortest word we will correct for typos; shorter words must match exactly
+MIN_TYPO_LENGTH = 4
+
+class IngredientVocabulary:
+    """Known ingredient words with symmetric-delete lookup for misspellings"""
+    def __init__(self):
+        self.rebuild([])
+
+    def rebuild(self, menu_items: List[dict]):
+        """Rebuild from INGREDIENT_KEYWORDS plus the words in menu names and descriptions"""
+        excluded = set(NON_INGREDIENT_WORDS)
+        for keyword in SPICE_KEYWORDS + COOKING_KEYWORDS + PORTION_KEYWORDS:
+            excluded.update(tokenize(keyword))
+
+        # Curated keywords always win ties against words seen in menu text
+        weights = {keyword: 1000 for keyword in INGREDIENT_KEYWORDS}
+        for item in menu_items:
+            for word in tokenize(f"{item.get('name', '')} {item.get('description', '')}"):
+                if len(word) >= 3 and word.isalpha() and word not in excluded:
+                    weights[word] = weights.get(word, 0) + 1
+
+        index = TypoIndex()
+        for word in weights:
+            index.add(word)
+        self.index, self.weights = index, weights
+
+    def resolve(self, word: str) -> Optional[str]:
+        """The ingredient a (possibly misspelled) word refers to, or None"""
+        if word in self.weights:
+            return word
+        if len(word) < MIN_TYPO_LENGTH:
+            return None
+        candidates = self.index.near(word)
+        if not candidates:
+            return None
+        return max(sorted(candidates), key=lambda candidate: self.weights[candidate])
+
+ingredient_vocabulary = IngredientVocabulary()
+
+def load_ingredient_vocabulary(db: Session):
+    """Rebuild the ingredient vocabulary from the current menu"""
+    rows = db.query(MenuItem.name, MenuItem.description).all()
+    ingredient_vocabulary.rebuild([{'name': name, 'description': description} for name, description in rows])
+
+@router.post("/customize", response_model=CustomizationResponse)
+async def process_customization(request: CustomizationRequest):
+    """
+    AI-powered customization processing endpoint.
+    Converts natural language customer requests into structured kitchen instructions.
+    """
+    try:
+        return CustomizationResponse(kitchen_instruction=parse_customization(request.custom_text))
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing customization: {str(e)}")
+
+@router.post("/suggest_action", response_model=ServerSuggestionResponse)
+async def suggest_server_action(request: ServerSuggestionRequest, db: Session = Depends(get_db)):
+    """
+    AI-powered server action suggestion endpoint.
+    Generates contextual hospitality prompts from the order's table, items, value,
+    status and how long it has been waiting.
+    """
+    order = db.query(Order).filter(Order.id == request.order_id).first()
+    if not order:
+        order = find_archived_order(db, request.order_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Order not found")
+    
+    try:
+        result = suggest_for_order(order)
+        return ServerSuggestionResponse(
+            suggestion=result.suggestion,
+            priority=result.priority,
+            wait_minutes=result.wait_minutes
+        )
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating server suggestion: {str(e)}")
+
+@router.get("/suggest_actions", response_model=List[OrderSuggestion])
+async def suggest_server_actions(db: Session = Depends(get_db)):
+    """
+    Score every open order at once for the floor dashboard, most urgent first.
+    """
+    orders = db.query(Order).filter(Order.status.notin_(TERMINAL_STATUSES)).all()
+    try:
+        return [OrderSuggestion(**result._asdict()) for result in suggest_for_orders(orders)]
+    
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating server suggestions: {str(e)}")
+
+def parse_customization(text: str) -> str:
+    """
+    Convert a natural language customer request into a structured kitchen instruction.
+    Direct call path for in-process callers such as order creation.
+    """
+    custom_text = (text or "").lower().strip()
+    
+    if not custom_text:
+        return "KITCHEN: STANDARD PREPARATION"
+    
+    # Initialize instruction components
+    instruction_parts = []
+    
+    # Process spice level
+    spice_instruction = process_spice_level(custom_text)
+    if spice_instruction:
+        instruction_parts.append(spice_instruction)
+    
+    # Process ingredients (additions and removals)
+    ingredient_instructions = process_ingredients(custom_text)
+    instruction_parts.extend(ingredient_instructions)
+    
+    # Process cooking preferences
+    cooking_instruction = process_cooking_preferences(custom_text)
+    if cooking_instruction:
+        instruction_parts.append(cooking_instruction)
+    
+    # Process portion adjustments
+    portion_instruction = process_portion_adjustments(custom_text)
+    if portion_instruction:
+        instruction_parts.append(portion_instruction)
+    
+    # Compile final instruction
+    if instruction_parts:
+        return "KITCHEN: " + " | ".join(instruction_parts)
+    return "KITCHEN: STANDARD PREPARATION - Special note: " + text[:50]
+
+def annotate_order_lines(lines: List[dict]) -> List[dict]:
+    """
+    Attach a structured kitchenInstruction to every customized order line.
+    Each distinct customization text is parsed once per order.
+    """
+    parsed = {}
+    for line in lines:
+        text = (line.get('customization') or '').strip()
+        if not text:
+            line['kitchenInstruction'] = None
+            continue
+        key = text.lower()
+        if key not in parsed:
+            parsed[key] = parse_customization(text)
+        line['kitchenInstruction'] = parsed[key]
+    return lines
+
+def process_spice_level(text: str) -> str:
+    """Process spice-related instructions"""
+    if any(keyword in text for keyword in ['not spicy', 'less spicy', 'mild']):
+        return "SPICE: LOW"
+    elif any(keyword in text for keyword in ['extra spicy', 'very hot', 'extra hot']):
+        return "SPICE: EXTRA HIGH"
+    elif any(keyword in text for keyword in ['spicy', 'hot']):
+        return "SPICE: HIGH"
+    elif 'medium' in text and 'spice' in text:
+        return "SPICE: MEDIUM"
+    return ""
+
+INGREDIENT_PATTERNS = [
+    (re.compile(r'\bextra\s+(\w+)'), "ADD: EXTRA {}"),
+    (re.compile(r'\bno\s+(\w+)'), "REMOVE: {}"),
+    (re.compile(r'\bmore\s+(\w+)'), "INCREASE: {}"),
+    (re.compile(r'\bless\s+(\w+)'), "REDUCE: {}"),
+]
+
+def process_ingredients(text: str) -> list:
+    """Process ingredient additions and removals against the ingredient vocabulary"""
+    instructions = []
+    
+    # Words that don't resolve to a known ingredient ("no thanks", "extra spicy") are dropped
+    for pattern, template in INGREDIENT_PATTERNS:
+        for word in pattern.findall(text):
+            ingredient = ingredient_vocabulary.resolve(word)
+            if ingredient:
+                instructions.append(template.format(ingredient.upper()))
+    
+    return instructions
+
+def process_cooking_preferences(text: str) -> str:
+    """Process cooking method preferences"""
+    if 'well done' in text:
+        return "COOKING: WELL DONE"
+    elif 'crispy' in text:
+        return "COOKING: EXTRA CRISPY"
+    elif 'soft' in text:
+        return "COOKING: SOFT/TENDER"
+    elif 'grilled' in text:
+        return "METHOD: GRILLED"
+    return ""
+
+def process_portion_adjustments(text: str) -> str:
+    """Process portion size adjustments"""
+    if any(keyword in text for keyword in ['large portion', 'extra large', 'big']):
+        return "PORTION: LARGE"
+    elif any(keyword in text for keyword in ['small portion', 'less food', 'light']):
+        return "PORTION: SMALL"
+    elif 'double' in text:
+        return "PORTION: DOUBLE"
+    return ""
+
+@router.get("/features")
+async def get_features():
+    """List available AI features"""
+    return {
+        "ai_features": [
+            {
+                "name": "Customization Processing",
+                "endpoint": "/api/ai/customize",
+                "description": "Converts natural language customer requests into structured kitchen instructions"
+            },
+            {
+                "name": "Server Action Suggestions",
+                "endpoint": "/api/ai/suggest_action", 
+                "description": "Generates contextual hospitality prompts based on order data and timing"
+            },
+            {
+                "name": "Floor Suggestions",
+                "endpoint": "/api/ai/suggest_actions",
+                "description": "Scores all open orders at once, most urgent first"
+            }
+        ],
+        "supported_languages": ["English"],
+        "processing_capabilities": [
+            "Spice level detection",
+            "Ingredient modification",
+            "Cooking preference analysis",
+            "Portion size adjustment",
+            "Context-aware server prompts"
+        ]
+    }
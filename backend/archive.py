@@ -0,0 +1,59 @@
+"""
+Hot/cold order storage
+Moves finished orders out of the `orders` table into `orders_archive`
+so kitchen queries only scan the orders that are still in play
+"""
+from sqlalchemy import func, insert, delete, select, literal, DateTime
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+import os
+
+from database import Order, ArchivedOrder
+
+# Orders in these states never change again and are safe to move
+TERMINAL_STATUSES = ('completed', 'cancelled')
+
+# How long a finished order stays in the hot table before archival
+ARCHIVE_AFTER_HOURS = float(os.getenv('ARCHIVE_AFTER_HOURS', '24'))
+
+# How often the background job runs (0 disables it)
+ARCHIVE_INTERVAL_MINUTES = float(os.getenv('ARCHIVE_INTERVAL_MINUTES', '60'))
+
+# Rows moved per statement, kept under SQLite's bound-parameter limit
+ARCHIVE_BATCH_SIZE = 500
+
+ARCHIVE_COLUMNS = [
+    'id', 'customer_name', 'table_number', 'items', 'status', 'total', 'subtotal',
+    'gst', 'payment_method', 'customer_instructions', 'timestamp', 'updated_at', 'session_id'
+]
+
+def archive_orders(db: Session, older_than_hours: float = None, now: datetime = None) -> int:
+    """Move terminal orders older than the cutoff into the archive table"""
+    if older_than_hours is None:
+        older_than_hours = ARCHIVE_AFTER_HOURS
+    cutoff = (now or datetime.utcnow()) - timedelta(hours=older_than_hours)
+
+    order_ids = [row[0] for row in db.query(Order.id).filter(
+        Order.status.in_(TERMINAL_STATUSES),
+        func.coalesce(Order.updated_at, Order.timestamp) <= cutoff
+    ).all()]
+
+    archived_at = datetime.utcnow()
+    columns = [getattr(Order, name) for name in ARCHIVE_COLUMNS]
+    for start in range(0, len(order_ids), ARCHIVE_BATCH_SIZE):
+        batch = order_ids[start:start + ARCHIVE_BATCH_SIZE]
+        db.execute(
+            insert(ArchivedOrder).from_select(
+                ARCHIVE_COLUMNS + ['archived_at'],
+                select(*columns, literal(archived_at, DateTime)).where(Order.id.in_(batch))
+            )
+        )
+        db.execute(delete(Order).where(Order.id.in_(batch)))
+
+    # Insert and delete land in one transaction, so an order is never in both tables
+    db.commit()
+    return len(order_ids)
+
+def find_archived_order(db: Session, order_id: str):
+    """Look up an order in cold storage"""
+    return db.query(ArchivedOrder).filter(ArchivedOrder.id == order_id).first()
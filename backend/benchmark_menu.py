@@ -0,0 +1,62 @@
+"""
+Measure /api/menu payload size and serving cost per encoding
+Compares per-request serialization/compression with the cached snapshot
+Run: python benchmark_menu.py
+"""
+import gzip
+import hashlib
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+from seed_menu import generate_menu_items
+from menu_cache import MenuSnapshot, brotli
+
+def api_items():
+    """Seed menu in the /api/menu shape, with the image and nutrition fields phones receive"""
+    items = []
+    for item in generate_menu_items():
+        seed = int(hashlib.md5(item['name'].encode()).hexdigest()[:8], 16) % 1000
+        items.append({
+            "id": item['id'],
+            "name": item['name'],
+            "description": item['description'],
+            "price": item['price'],
+            "category": item['category'],
+            "available": True,
+            "preparationTime": item['preparation_time'],
+            "tags": item['tags'],
+            "nutritionInfo": {"calories": 300, "protein": 12, "carbs": 40, "fat": 10},
+            "aiRecommended": item['ai_recommended'],
+            "image": f"https://picsum.photos/seed/{seed}/400/300"
+        })
+    return items
+
+def per_call_ms(fn, repeat=200):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+if __name__ == "__main__":
+    items = api_items()
+    snapshot = MenuSnapshot(1, items)
+
+    print(f"📋 {len(items)} menu items")
+    print("=" * 60)
+    for encoding, size in snapshot.sizes().items():
+        ratio = size / snapshot.sizes()['identity'] * 100
+        print(f"   {encoding:<9} {size:>8} bytes  ({ratio:.1f}% of identity)")
+    if not brotli:
+        print("   (install brotli for the br variant)")
+
+    print("=" * 60)
+    build_ms = per_call_ms(lambda: MenuSnapshot(1, items), repeat=10)
+    print(f"   Snapshot build (once per menu version): {build_ms:.2f} ms")
+
+    uncached = per_call_ms(lambda: json.dumps(jsonable_encoder(items)).encode())
+    print(f"   Per-request serialize (old path):       {uncached:.3f} ms")
+    gzip_each = per_call_ms(lambda: gzip.compress(json.dumps(jsonable_encoder(items)).encode(), compresslevel=6))
+    print(f"   Per-request serialize + gzip:           {gzip_each:.3f} ms")
+    cached = per_call_ms(lambda: snapshot.bodies['gzip'], repeat=10000)
+    print(f"   Cached snapshot lookup:                 {cached:.4f} ms")
@@ -0,0 +1,65 @@
+"""
+Measure prep-time refits over a year of synthetic orders
+Simulates order_events with known per-dish prep times and a load effect,
+then times sample extraction and the NumPy fit and checks the recovered
+estimates
+Run: python benchmark_prep.py [orders_per_day]
+"""
+from datetime import datetime, timedelta
+import random
+import sys
+import time
+
+from seed_menu import generate_menu_items
+from prep_model import PrepTimeModel, extract_samples
+
+TRUE_LOAD_FACTOR = 0.04
+
+def simulate_year(orders_per_day: int, seed: int = 7):
+    """(events, order_lines, true minutes) for 365 days of service"""
+    rng = random.Random(seed)
+    menu = generate_menu_items()
+    # Real prep times drift from the menu's guesses by up to ±40%
+    truth = {item['id']: item['preparation_time'] * rng.uniform(0.6, 1.4) for item in menu}
+    events, order_lines = [], {}
+    start = datetime(2024, 1, 1, 11)
+    for day in range(365):
+        open_until = []
+        for n in range(orders_per_day):
+            placed = start + timedelta(days=day, seconds=n * 11 * 3600 / orders_per_day)
+            lines = [{"id": item['id'], "quantity": 1, "preparationTime": item['preparation_time']}
+                     for item in rng.sample(menu, rng.randint(1, 4))]
+            open_until = [t for t in open_until if t > placed]
+            load = len(open_until)
+            prep = max(truth[line['id']] for line in lines) * (1 + TRUE_LOAD_FACTOR * load) * rng.uniform(0.9, 1.1)
+            started = placed + timedelta(minutes=rng.uniform(0.5, 3))
+            finished = started + timedelta(minutes=prep)
+            open_until.append(finished)
+            order_id = f"order-{day}-{n}"
+            order_lines[order_id] = lines
+            events += [(order_id, 'new', placed), (order_id, 'preparing', started), (order_id, 'completed', finished)]
+    return events, order_lines, truth
+
+if __name__ == "__main__":
+    per_day = int(sys.argv[1]) if len(sys.argv) > 1 else 250
+    events, order_lines, truth = simulate_year(per_day)
+    events.sort(key=lambda event: (event[0], event[2]))
+
+    print(f"🍳 {len(order_lines)} orders, {len(events)} status events over a year")
+    print("=" * 60)
+    started = time.perf_counter()
+    samples = extract_samples(events, order_lines)
+    extracted = time.perf_counter()
+    model = PrepTimeModel()
+    model.fit(samples)
+    fitted = time.perf_counter()
+    print(f"   Sample extraction: {(extracted - started) * 1000:8.1f} ms")
+    print(f"   NumPy fit:         {(fitted - extracted) * 1000:8.1f} ms")
+
+    errors = [abs(model.base_minutes[item_id] - minutes) / minutes
+              for item_id, minutes in truth.items() if item_id in model.base_minutes]
+    static_errors = [abs(item['preparation_time'] - truth[item['id']]) / truth[item['id']] for item in generate_menu_items()]
+    print("=" * 60)
+    print(f"   Load factor: {model.load_factor:.3f} (true {TRUE_LOAD_FACTOR})")
+    print(f"   Learned dishes: {len(errors)}/{len(truth)}, mean error {sum(errors) / max(len(errors), 1) * 100:.1f}%")
+    print(f"   Static preparationTime mean error: {sum(static_errors) / len(static_errors) * 100:.1f}%")
@@ -0,0 +1,78 @@
+"""
+Measure /ws broadcast cost per encoding
+Compares encoding a new_order event per connection with encoding it once
+per format, and frame sizes with and without permessage-deflate
+Run: python benchmark_ws.py [screens]
+"""
+from datetime import datetime
+import json
+import sys
+import time
+import zlib
+
+from seed_menu import generate_menu_items
+from ws_encoding import EncodedMessage, encode_message, msgpack, SUPPORTED_WS_ENCODINGS
+
+def new_order_event(lines=8):
+    """A busy-table new_order broadcast, shaped like create_order's"""
+    items = []
+    for item in generate_menu_items()[:lines]:
+        items.append({
+            "id": item['id'],
+            "name": item['name'],
+            "price": item['price'],
+            "quantity": 2,
+            "category": item['category'],
+            "customization": "less spicy, no onions",
+            "preparationTime": item['preparation_time'],
+            "kitchenInstruction": "Spice: Mild | Remove: onions"
+        })
+    return {
+        "type": "new_order",
+        "order": {
+            "id": "order-1735689600000",
+            "customerName": "Table guest",
+            "tableNumber": 12,
+            "items": items,
+            "status": "new",
+            "total": sum(i['price'] * i['quantity'] for i in items) * 1.05,
+            "customerInstructions": "Birthday, please bring candles",
+            "kitchenInstruction": None,
+            "timestamp": datetime(2025, 1, 1, 19, 30).isoformat()
+        }
+    }
+
+def deflated_size(frame) -> int:
+    """Frame size after permessage-deflate (raw deflate, no context takeover)"""
+    data = frame.encode() if isinstance(frame, str) else frame
+    compressor = zlib.compressobj(wbits=-15)
+    return len(compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)) - 4
+
+def per_call_ms(fn, repeat=500):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) * 1000 / repeat
+
+if __name__ == "__main__":
+    screens = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    event = new_order_event()
+
+    print(f"📡 new_order broadcast to {screens} screens")
+    print("=" * 60)
+    for encoding in SUPPORTED_WS_ENCODINGS:
+        frame = encode_message(event, encoding)
+        print(f"   {encoding:<8} {len(frame):>6} bytes, {deflated_size(frame):>5} with permessage-deflate")
+    if not msgpack:
+        print("   (install msgpack for the msgpack variant)")
+
+    print("=" * 60)
+    per_connection = per_call_ms(lambda: [json.dumps(event) for _ in range(screens)])
+    print(f"   Encode per connection (old send_json):  {per_connection:.3f} ms/broadcast")
+    once = per_call_ms(lambda: EncodedMessage(event).frame('json'))
+    print(f"   Encode once per format (json):          {once:.3f} ms/broadcast")
+    if msgpack:
+        both = per_call_ms(lambda: [EncodedMessage(event).frame(f) for f in SUPPORTED_WS_ENCODINGS])
+        print(f"   Encode once per format (json+msgpack):  {both:.3f} ms/broadcast")
+    deflate = per_call_ms(lambda: deflated_size(encode_message(event, 'json')))
+    print(f"   permessage-deflate per connection:      {deflate * screens:.3f} ms/broadcast")
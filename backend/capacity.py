@@ -0,0 +1,111 @@
+"""
+Kitchen capacity model
+Sums outstanding preparation time per station over open orders and
+decides whether a new order can go straight to the kitchen
+"""
+from typing import Callable, Dict, Iterable, List
+import os
+
+# 'off' accepts everything, 'quote' asks the guest to accept a quoted wait,
+# 'queue' parks overflow orders as 'pending' until the kitchen accepts them
+THROTTLE_MODES = ('off', 'quote', 'queue')
+
+def throttle_mode(value: str) -> str:
+    """Validated KITCHEN_THROTTLE_MODE; a typo would otherwise quietly pick a mode"""
+    mode = value.strip().lower()
+    if mode not in THROTTLE_MODES:
+        raise ValueError(f"KITCHEN_THROTTLE_MODE must be one of {', '.join(THROTTLE_MODES)}, got {value!r}")
+    return mode
+
+KITCHEN_THROTTLE_MODE = throttle_mode(os.getenv('KITCHEN_THROTTLE_MODE', 'off'))
+
+# Longest wait a station may quote before new orders are throttled
+KITCHEN_MAX_WAIT_MINUTES = float(os.getenv('KITCHEN_MAX_WAIT_MINUTES', '45'))
+
+# Status of orders waiting for the kitchen to accept them
+PENDING_STATUS = 'pending'
+
+# Orders whose items still need kitchen time
+OPEN_STATUSES = ('new', 'preparing')
+
+# Orders whose work is ahead of a newly placed one; queued orders count,
+# so a new order can't overtake them as soon as the load dips
+BACKLOG_STATUSES = (PENDING_STATUS,) + OPEN_STATUSES
+
+# Dishes each station can work on at once
+STATION_SLOTS = {
+    'bar': 2,
+    'desserts': 2,
+    'tandoor': 3,
+    'wok': 3,
+    'kitchen': 4,
+}
+
+# (category keyword, station); first match wins, anything else goes to 'kitchen'
+STATION_RULES = [
+    ('beverage', 'bar'),
+    ('dessert', 'desserts'),
+    ('bread', 'tandoor'),
+    ('tandoor', 'tandoor'),
+    ('chinese', 'wok'),
+]
+
+DEFAULT_PREPARATION_TIME = 15
+
+def station_for(category: str) -> str:
+    """Kitchen station that cooks items of a category"""
+    category = (category or '').lower()
+    for keyword, station in STATION_RULES:
+        if keyword in category:
+            return station
+    return 'kitchen'
+
+# Prep minutes for one unit of a line
+PrepEstimate = Callable[[dict], float]
+
+def static_minutes(line: dict) -> float:
+    """Prep minutes from the menu's preparationTime"""
+    return line.get('preparationTime') or DEFAULT_PREPARATION_TIME
+
+def line_minutes(line: dict, prep: PrepEstimate = static_minutes) -> float:
+    return prep(line) * (line.get('quantity') or 1)
+
+def station_load(orders_items: Iterable[List[dict]], prep: PrepEstimate = static_minutes) -> Dict[str, float]:
+    """Outstanding cooking minutes per station across the given orders' lines"""
+    load = {station: 0.0 for station in STATION_SLOTS}
+    for items in orders_items:
+        for line in items:
+            station = station_for(line.get('category'))
+            load[station] = load.get(station, 0.0) + line_minutes(line, prep)
+    return load
+
+def station_wait(load: Dict[str, float]) -> Dict[str, float]:
+    """Minutes until each station clears its backlog"""
+    return {station: minutes / STATION_SLOTS.get(station, 1) for station, minutes in load.items()}
+
+def quote_wait(load: Dict[str, float], items: List[dict], prep: PrepEstimate = static_minutes) -> int:
+    """Estimated minutes until a new order with these lines is ready"""
+    waits = station_wait(load)
+    quote = 0.0
+    for line in items:
+        station = station_for(line.get('category'))
+        quote = max(quote, waits.get(station, 0.0) + prep(line))
+    return int(round(quote))
+
+def is_overloaded(load: Dict[str, float], items: List[dict]) -> bool:
+    """True if any station this order needs is already past the wait threshold"""
+    waits = station_wait(load)
+    return any(waits.get(station_for(line.get('category')), 0.0) > KITCHEN_MAX_WAIT_MINUTES for line in items)
+
+def load_summary(load: Dict[str, float]) -> dict:
+    waits = station_wait(load)
+    return {
+        "mode": KITCHEN_THROTTLE_MODE,
+        "maxWaitMinutes": KITCHEN_MAX_WAIT_MINUTES,
+        "estimatedWaitMinutes": int(round(max(waits.values(), default=0.0))),
+        "overloaded": any(wait > KITCHEN_MAX_WAIT_MINUTES for wait in waits.values()),
+        "stations": {
+            station: {"loadMinutes": round(load[station], 1), "waitMinutes": round(waits[station], 1)}
+            for station in load
+        }
+    }
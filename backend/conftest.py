@@ -0,0 +1,167 @@
+"""
+Shared test fixtures
+Tests run against one in-memory shared-cache SQLite database whose schema
+is created once per session. Every test runs inside a transaction that is
+rolled back afterwards; commits made by the app only release savepoints.
+"""
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+import json
+import os
+import time
+import pytest
+
+from main import app, heartbeats, order_events, active_orders, prep_model, menu_index, recommender, idempotency_store, admission, menu_cache
+from database import Base, get_db
+from ai_service import ingredient_vocabulary
+
+# Test database setup
+TEST_DATABASE_URL = "sqlite:///file:swiftserve_test?mode=memory&cache=shared&uri=true"
+engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
+
+# pysqlite's own transaction handling breaks SAVEPOINT; let SQLAlchemy emit BEGIN instead
+@event.listens_for(engine, "connect")
+def disable_pysqlite_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+@event.listens_for(engine, "begin")
+def begin_transaction(conn):
+    conn.exec_driver_sql("BEGIN")
+
+# Bound to each test's connection by the `connection` fixture
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False)
+
+def override_get_db():
+    try:
+        db = TestingSessionLocal()
+        yield db
+    finally:
+        db.close()
+
+@pytest.fixture(scope="session")
+def schema():
+    # The in-memory database lives as long as one connection to it stays open
+    keeper = engine.connect()
+    Base.metadata.create_all(bind=keeper)
+    keeper.commit()
+    yield
+    keeper.close()
+
+@pytest.fixture
+def connection(schema):
+    conn = engine.connect()
+    outer = conn.begin()
+    TestingSessionLocal.configure(bind=conn, join_transaction_mode="create_savepoint")
+    yield conn
+    outer.rollback()
+    conn.close()
+
+@pytest.fixture
+def db(connection):
+    """A session inside the test's transaction, for setting up rows directly"""
+    session = TestingSessionLocal()
+    yield session
+    session.close()
+
+@pytest.fixture(scope="function")
+def client(connection):
+    menu_index.clear()
+    recommender.clear()
+    ingredient_vocabulary.rebuild([])
+    idempotency_store.cache.clear()
+    admission.reset()
+    menu_cache.invalidate()
+    order_events.clear()
+    heartbeats.reset()
+    active_orders.clear()
+    prep_model.clear()
+    app.dependency_overrides[get_db] = override_get_db
+    yield TestClient(app)
+
+# Throughput benchmarks
+# Results are divided by a fixed pure-Python workload timed on the same machine,
+# so a baseline recorded on one machine still means something on another
+PERF_BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "perf_baseline.json")
+
+# Wall-clock benchmarks are noisy on shared machines, so they only run when asked for
+RUN_PERF = os.getenv('RUN_PERF', '0') == '1'
+
+# Fraction of baseline throughput a benchmark may lose before it fails
+PERF_TOLERANCE = float(os.getenv('PERF_TOLERANCE', '0.4'))
+
+# Set to 1 to rewrite perf_baseline.json from this run instead of checking it
+PERF_UPDATE_BASELINE = os.getenv('PERF_UPDATE_BASELINE', '0') == '1'
+
+perf_results = {}
+
+def ops_per_second(fn, rounds: int, iterations: int) -> float:
+    """Throughput of the fastest of several timed rounds, after one warm-up call.
+    Slower rounds measure interference from the rest of the machine, not the code"""
+    fn()
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        timings.append((time.perf_counter() - start) / iterations)
+    return 1 / min(timings)
+
+def calibration_workload():
+    json.loads(json.dumps([{"id": i, "name": f"item{i}", "price": i * 1.05} for i in range(200)]))
+    sorted(range(2000), key=lambda i: -i)
+
+@pytest.fixture(scope="session")
+def machine_speed() -> float:
+    return ops_per_second(calibration_workload, rounds=10, iterations=50)
+
+@pytest.fixture
+def benchmark(request, machine_speed):
+    """benchmark(fn) times fn and fails the test if it is slower than the recorded baseline allows"""
+    def run(fn, rounds: int = 5, iterations: int = 20) -> float:
+        ops = ops_per_second(fn, rounds, iterations)
+        relative = ops / machine_speed
+        name = request.node.name
+        perf_results[name] = (ops, relative)
+        if PERF_UPDATE_BASELINE:
+            return ops
+        baseline = load_perf_baseline().get(name)
+        if baseline is not None and relative < baseline * (1 - PERF_TOLERANCE):
+            pytest.fail(f"{name} regressed: {relative:.4f} relative ops/s vs baseline {baseline:.4f} "
+                        f"({ops:.0f} ops/s, tolerance {PERF_TOLERANCE:.0%})")
+        return ops
+    return run
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "perf: throughput benchmark, run with RUN_PERF=1 pytest -m perf")
+
+def pytest_collection_modifyitems(config, items):
+    skip = pytest.mark.skip(reason="throughput benchmark; set RUN_PERF=1 to run")
+    for item in items:
+        if "benchmark" in getattr(item, "fixturenames", ()):
+            item.add_marker(pytest.mark.perf)
+            if not (RUN_PERF or PERF_UPDATE_BASELINE):
+                item.add_marker(skip)
+
+def load_perf_baseline() -> dict:
+    if not os.path.exists(PERF_BASELINE_PATH):
+        return {}
+    with open(PERF_BASELINE_PATH) as f:
+        return json.load(f)
+
+def pytest_sessionfinish(session, exitstatus):
+    if PERF_UPDATE_BASELINE and perf_results:
+        baseline = {**load_perf_baseline(), **{name: round(relative, 6) for name, (_, relative) in perf_results.items()}}
+        with open(PERF_BASELINE_PATH, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+def pytest_terminal_summary(terminalreporter):
+    if not perf_results:
+        return
+    baseline = load_perf_baseline()
+    terminalreporter.section("throughput")
+    for name, (ops, relative) in sorted(perf_results.items()):
+        recorded = baseline.get(name)
+        change = f"{relative / recorded - 1:+.0%} vs baseline" if recorded else "no baseline"
+        terminalreporter.write_line(f"{name:<45} {ops:>10.0f} ops/s  {change}")
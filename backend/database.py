@@ -1,8 +1,10 @@
-from sqlalchemy import create_engine, Column, Integer, String, Float, DateTime, JSON, Boolean
+from sqlalchemy import create_engine, inspect, text, Column, Index, Integer, String, Float, DateTime, JSON, Boolean
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 from datetime import datetime
 import json
+import os
 
 Base = declarative_base()
 
@@ -13,7 +15,7 @@ class Order(Base):
     customer_name = Column(String, nullable=False)
     table_number = Column(Integer, nullable=False)
     items = Column(JSON, nullable=False)  # Stored as JSON
-    status = Column(String, default='new')
+    status = Column(String, default='new', index=True)
     total = Column(Float, nullable=False)
     subtotal = Column(Float, nullable=False)
     gst = Column(Float, nullable=False)
@@ -21,6 +23,69 @@ class Order(Base):
     customer_instructions = Column(String, nullable=True)
     timestamp = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    session_id = Column(Integer, nullable=True)  # TableSession whose bill this order is on
+
+class ArchivedOrder(Base):
+    """Cold storage for finished orders moved out of the hot `orders` table"""
+    __tablename__ = 'orders_archive'
+    
+    id = Column(String, primary_key=True)
+    customer_name = Column(String, nullable=False)
+    table_number = Column(Integer, nullable=False)
+    items = Column(JSON, nullable=False)
+    status = Column(String, nullable=False)
+    total = Column(Float, nullable=False)
+    subtotal = Column(Float, nullable=False)
+    gst = Column(Float, nullable=False)
+    payment_method = Column(String, nullable=False)
+    customer_instructions = Column(String, nullable=True)
+    timestamp = Column(DateTime, nullable=False)
+    updated_at = Column(DateTime, nullable=True)
+    session_id = Column(Integer, nullable=True)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+class OrderEvent(Base):
+    """Append-only history of order status transitions"""
+    __tablename__ = 'order_events'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    order_id = Column(String, nullable=False)
+    from_status = Column(String, nullable=True)  # None for the order being placed
+    to_status = Column(String, nullable=False)
+    at = Column(DateTime, nullable=False, default=datetime.utcnow, index=True)
+    
+    __table_args__ = (
+        Index('ix_order_events_order_id_at', 'order_id', 'at'),
+    )
+
+class TableSession(Base):
+    """A table's visit from first order to settling, with its running bill"""
+    __tablename__ = 'table_sessions'
+    
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    table_number = Column(Integer, nullable=False)
+    status = Column(String, nullable=False, default='open')  # open, settled
+    order_count = Column(Integer, nullable=False, default=0)
+    subtotal = Column(Float, nullable=False, default=0.0)
+    gst = Column(Float, nullable=False, default=0.0)
+    total = Column(Float, nullable=False, default=0.0)
+    payment_method = Column(String, nullable=True)
+    opened_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+    settled_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        # At most one open session per table
+        Index('ix_table_sessions_open_table', 'table_number', unique=True, sqlite_where=text("status = 'open'")),
+    )
+
+class IdempotencyKey(Base):
+    """Stored responses for retried requests carrying an Idempotency-Key header"""
+    __tablename__ = 'idempotency_keys'
+    
+    key = Column(String, primary_key=True)
+    request_hash = Column(String, nullable=False)
+    response = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
 
 class MenuItem(Base):
     __tablename__ = 'menu_items'
@@ -36,6 +101,7 @@ class MenuItem(Base):
     nutrition_info = Column(JSON, nullable=True)
     ai_recommended = Column(Boolean, default=False)
     image = Column(String, nullable=True)
+    stock = Column(Integer, nullable=True)  # None means stock isn't tracked
 
 class RestaurantSettings(Base):
     __tablename__ = 'restaurant_settings'
@@ -52,13 +118,45 @@ class RestaurantSettings(Base):
     email_notifications = Column(Boolean, default=True)
 
 # Database initialization
-DATABASE_URL = "sqlite:///./swiftserve.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+# Anchored to this directory so every service that imports it shares one file
+DATABASE_URL = os.getenv(
+    "DATABASE_URL",
+    "sqlite:///" + os.path.join(os.path.dirname(os.path.abspath(__file__)), "swiftserve.db")
+)
+# No pool: request sessions keep their connection until the response has been sent, so a bounded
+# pool runs dry under concurrent requests and blocks the event loop waiting for one. SQLite
+# connections are just file handles and cheap to open
+engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False}, poolclass=NullPool)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# (table, column, type) added after release; create_all() skips tables that already exist
+ADDED_COLUMNS = [
+    ('menu_items', 'stock', 'INTEGER'),
+    ('orders', 'session_id', 'INTEGER'),
+    ('orders_archive', 'session_id', 'INTEGER'),
+]
+
+def add_missing_columns():
+    """Bring tables created by older versions up to date"""
+    inspector = inspect(engine)
+    tables = inspector.get_table_names()
+    with engine.begin() as conn:
+        for table, column, column_type in ADDED_COLUMNS:
+            if table in tables and column not in {c['name'] for c in inspector.get_columns(table)}:
+                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+
+def add_missing_indexes(bind=engine):
+    """Create indexes added to tables that older versions created; create_all() skips those tables"""
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(bind=conn, checkfirst=True)
+
 def init_db():
     """Initialize database and create tables"""
     Base.metadata.create_all(bind=engine)
+    add_missing_columns()
+    add_missing_indexes()
     print("Database initialized successfully!")
 
 def get_db():
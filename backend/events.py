@@ -0,0 +1,131 @@
+"""
+Per-order Server-Sent Events and long-poll waiters
+Every message passed to manager.broadcast is numbered and fanned out to
+SSE subscribers of the order it concerns, and wakes requests parked on
+that order. A short replay buffer lets a reconnecting client resume from
+its Last-Event-ID.
+"""
+from collections import defaultdict, deque
+from typing import Dict, List, Optional, Set, Tuple
+import asyncio
+import json
+import os
+import time
+
+# Seconds between keep-alive comments on an idle stream
+SSE_KEEPALIVE_SECONDS = float(os.getenv('SSE_KEEPALIVE_SECONDS', '15'))
+
+# Recent events kept per worker for Last-Event-ID resume
+SSE_REPLAY_SIZE = int(os.getenv('SSE_REPLAY_SIZE', '1000'))
+
+# Events a slow subscriber may fall behind before it is dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Longest a GET /api/orders/{order_id}?wait= long-poll may be parked
+MAX_WAIT_SECONDS = 60
+
+def event_order_id(message: dict) -> Optional[str]:
+    """Order a broadcast message is about, if any"""
+    if message.get('orderId'):
+        return message['orderId']
+    order = message.get('order')
+    if isinstance(order, dict):
+        return order.get('id')
+    return None
+
+def format_event(event_id: Optional[str], event_type: str, data: dict) -> str:
+    lines = []
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    lines.append(f"data: {json.dumps(data, separators=(',', ':'))}")
+    return "\n".join(lines) + "\n\n"
+
+KEEPALIVE = ": keep-alive\n\n"
+
+class OrderEventHub:
+    """Numbers order events and routes them to per-order subscriber queues"""
+    def __init__(self, replay_size: int = SSE_REPLAY_SIZE):
+        # Ids look like '<boot>-<seq>' so ids from before a restart are recognised as a gap
+        self.boot = str(int(time.time()))
+        self.replay_size = replay_size
+        self.clear()
+
+    def clear(self):
+        self.seq = 0
+        self.recent: deque = deque(maxlen=self.replay_size)
+        self.subscribers: Dict[str, Set[asyncio.Queue]] = defaultdict(set)
+        self.waiters: Dict[str, Set[asyncio.Future]] = defaultdict(set)
+
+    def publish(self, message: dict):
+        order_id = event_order_id(message)
+        if order_id is None:
+            return
+        self.seq += 1
+        event = (self.seq, order_id, message)
+        self.recent.append(event)
+        for future in self.waiters.pop(order_id, ()):
+            if not future.done():
+                future.set_result(True)
+        for queue in list(self.subscribers.get(order_id, ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # Close a stalled stream; its client reconnects and resumes from Last-Event-ID
+                self.unsubscribe(order_id, queue)
+                queue.get_nowait()
+                queue.put_nowait(None)
+
+    def event_id(self, seq: int) -> str:
+        return f"{self.boot}-{seq}"
+
+    def parse_event_id(self, last_event_id: Optional[str]) -> Optional[int]:
+        """Sequence number from a Last-Event-ID issued by this worker, else None"""
+        boot, _, seq = (last_event_id or '').partition('-')
+        if boot != self.boot or not seq.isdigit() or int(seq) > self.seq:
+            return None
+        return int(seq)
+
+    def subscribe(self, order_id: str, last_event_id: Optional[str] = None) -> Tuple[asyncio.Queue, Optional[List[tuple]]]:
+        """Queue for future events plus the events missed since last_event_id.
+        The backlog is None when they can't be replayed and the client needs a fresh snapshot"""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers[order_id].add(queue)
+        since = self.parse_event_id(last_event_id)
+        if since is None:
+            return queue, None
+        oldest = self.recent[0][0] if self.recent else self.seq + 1
+        if since + 1 < oldest:
+            return queue, None
+        return queue, [event for event in self.recent if event[0] > since and event[1] == order_id]
+
+    def unsubscribe(self, order_id: str, queue: asyncio.Queue):
+        queues = self.subscribers.get(order_id)
+        if queues is not None:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[order_id]
+
+    def waiter(self, order_id: str) -> asyncio.Future:
+        """Future resolved by the next event for the order, for long-polling"""
+        future = asyncio.get_running_loop().create_future()
+        self.waiters[order_id].add(future)
+        return future
+
+    def discard_waiter(self, order_id: str, future: asyncio.Future):
+        futures = self.waiters.get(order_id)
+        if futures is not None:
+            futures.discard(future)
+            if not futures:
+                del self.waiters[order_id]
+
+    async def wait(self, future: asyncio.Future, timeout: float) -> bool:
+        """True if the order changed within timeout seconds"""
+        try:
+            await asyncio.wait_for(asyncio.shield(future), min(timeout, MAX_WAIT_SECONDS))
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    def subscriber_count(self) -> int:
+        return sum(len(queues) for queues in self.subscribers.values())
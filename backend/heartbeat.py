@@ -0,0 +1,131 @@
+"""
+Server-driven WebSocket heartbeats
+All connections share one hashed timer wheel advanced by a single task:
+each due connection is pinged, and reaped if it hasn't answered by the
+pong deadline. Any message from the client counts as a sign of life.
+"""
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import math
+import os
+import time
+
+# Seconds of silence before a connection is pinged
+WS_HEARTBEAT_INTERVAL = float(os.getenv('WS_HEARTBEAT_INTERVAL', '25'))
+
+# Seconds a pinged connection has to answer before it is dropped
+WS_PONG_TIMEOUT = float(os.getenv('WS_PONG_TIMEOUT', '10'))
+
+# Resolution of the timer wheel in seconds
+WHEEL_TICK = 1.0
+
+class TimerWheel:
+    """Hashed timing wheel: O(1) to schedule, and one slot to visit per tick however many timers exist"""
+    def __init__(self, tick: float, horizon: float):
+        self.tick = tick
+        self.slots: List[list] = [[] for _ in range(int(math.ceil(horizon / tick)) + 1)]
+        self.position = 0
+
+    def schedule(self, item, delay: float):
+        ticks = min(max(1, int(math.ceil(delay / self.tick))), len(self.slots) - 1)
+        self.slots[(self.position + ticks) % len(self.slots)].append(item)
+
+    def advance(self) -> list:
+        """Move one tick forward and return what fell due"""
+        self.position = (self.position + 1) % len(self.slots)
+        due, self.slots[self.position] = self.slots[self.position], []
+        return due
+
+class Peer:
+    """Heartbeat state for one connection"""
+    __slots__ = ('websocket', 'last_seen', 'ping_sent', 'closed')
+
+    def __init__(self, websocket, now: float):
+        self.websocket = websocket
+        self.last_seen = now
+        self.ping_sent: Optional[float] = None
+        self.closed = False
+
+class HeartbeatMonitor:
+    """Pings quiet connections and reaps the ones that stop answering"""
+    def __init__(self, interval: float = WS_HEARTBEAT_INTERVAL, pong_timeout: float = WS_PONG_TIMEOUT,
+                 tick: float = WHEEL_TICK):
+        self.interval = interval
+        self.pong_timeout = pong_timeout
+        self.tick_seconds = tick
+        # Called with each reaped websocket, to drop it from the broadcast list
+        self.on_reap: Optional[Callable[[object], None]] = None
+        # Sends a ping to a websocket; defaults to a JSON text frame
+        self.send: Optional[Callable[[object], Awaitable]] = None
+        self.reset()
+
+    def reset(self):
+        self.wheel = TimerWheel(self.tick_seconds, max(self.interval, self.pong_timeout))
+        self.peers: Dict[object, Peer] = {}
+        self.connected = 0
+        self.reaped = 0
+        self.pings_sent = 0
+
+    def track(self, websocket, now: Optional[float] = None):
+        peer = Peer(websocket, time.monotonic() if now is None else now)
+        self.peers[websocket] = peer
+        self.connected += 1
+        self.wheel.schedule(peer, self.interval)
+
+    def untrack(self, websocket):
+        peer = self.peers.pop(websocket, None)
+        if peer:
+            # Left in its wheel slot and skipped when it falls due
+            peer.closed = True
+
+    def seen(self, websocket, now: Optional[float] = None):
+        peer = self.peers.get(websocket)
+        if peer:
+            peer.last_seen = time.monotonic() if now is None else now
+
+    async def reap(self, peer: Peer):
+        self.untrack(peer.websocket)
+        self.reaped += 1
+        if self.on_reap:
+            self.on_reap(peer.websocket)
+        try:
+            await peer.websocket.close(code=1001)
+        except Exception:
+            pass
+
+    async def tick(self, now: Optional[float] = None):
+        """Advance the wheel one slot, pinging or reaping whatever is due"""
+        now = time.monotonic() if now is None else now
+        for peer in self.wheel.advance():
+            if peer.closed:
+                continue
+            if peer.ping_sent is not None:
+                if peer.last_seen < peer.ping_sent:
+                    await self.reap(peer)
+                    continue
+                peer.ping_sent = None
+            quiet = now - peer.last_seen
+            if quiet < self.interval:
+                # Heard from recently; check again when it has been quiet a full interval
+                self.wheel.schedule(peer, self.interval - quiet)
+                continue
+            try:
+                # Bounded so one stuck socket can't stall the wheel for everyone else
+                ping = self.send(peer.websocket) if self.send else peer.websocket.send_json({"type": "ping"})
+                await asyncio.wait_for(ping, self.pong_timeout)
+            except Exception:
+                await self.reap(peer)
+                continue
+            self.pings_sent += 1
+            peer.ping_sent = now
+            self.wheel.schedule(peer, self.pong_timeout)
+
+    def stats(self) -> dict:
+        return {
+            "live": len(self.peers),
+            "connected": self.connected,
+            "reaped": self.reaped,
+            "pingsSent": self.pings_sent,
+            "intervalSeconds": self.interval,
+            "pongTimeoutSeconds": self.pong_timeout
+        }
@@ -0,0 +1,84 @@
+"""
+Idempotency keys for retried requests
+Responses are kept in a bounded in-memory TTL cache and in the
+`idempotency_keys` table so retries hitting another worker still match
+"""
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from typing import Optional, Tuple
+import hashlib
+import json
+import os
+import time
+
+from database import IdempotencyKey
+
+# How long a key keeps returning the original response
+IDEMPOTENCY_TTL_HOURS = float(os.getenv('IDEMPOTENCY_TTL_HOURS', '24'))
+
+# Most keys held in memory per worker
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv('IDEMPOTENCY_CACHE_SIZE', '10000'))
+
+class TTLCache:
+    """Bounded LRU mapping whose entries expire after ttl seconds"""
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries: OrderedDict = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def set(self, key, value):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def clear(self):
+        self.entries.clear()
+
+def request_fingerprint(payload: dict) -> str:
+    """Stable hash of a request body, to catch keys reused for a different request"""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+class IdempotencyStore:
+    """Two-level (memory, then database) store of (fingerprint, response) per key"""
+    def __init__(self, ttl_hours: float = IDEMPOTENCY_TTL_HOURS, maxsize: int = IDEMPOTENCY_CACHE_SIZE):
+        self.ttl = timedelta(hours=ttl_hours)
+        self.cache = TTLCache(maxsize, self.ttl.total_seconds())
+
+    def lookup(self, db: Session, key: str) -> Optional[Tuple[str, dict]]:
+        """Return the stored (fingerprint, response) for key, if still live"""
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        row = db.query(IdempotencyKey).filter(IdempotencyKey.key == key).first()
+        if row is None or row.created_at < datetime.utcnow() - self.ttl:
+            return None
+        stored = (row.request_hash, json.loads(row.response))
+        self.cache.set(key, stored)
+        return stored
+
+    def record(self, db: Session, key: str, fingerprint: str, response: dict):
+        """Stage the response in the caller's transaction; call remember() after commit"""
+        db.add(IdempotencyKey(key=key, request_hash=fingerprint, response=json.dumps(response)))
+
+    def remember(self, key: str, fingerprint: str, response: dict):
+        self.cache.set(key, (fingerprint, response))
+
+    def purge_expired(self, db: Session) -> int:
+        """Delete keys older than the TTL"""
+        cutoff = datetime.utcnow() - self.ttl
+        deleted = db.query(IdempotencyKey).filter(IdempotencyKey.created_at < cutoff).delete(synchronize_session=False)
+        db.commit()
+        return deleted
@@ -0,0 +1,82 @@
+"""
+Per-item stock counts
+Orders decrement stock with one conditional UPDATE per tracked item inside
+the order's transaction, so concurrent orders on any worker can never take
+more than is left and no table lock is needed. Items with a NULL stock are
+not tracked.
+"""
+from collections import Counter
+from sqlalchemy import case
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+
+from database import MenuItem
+
+class OutOfStock(Exception):
+    """An order asked for more of some items than is left"""
+    def __init__(self, remaining: Dict[str, int]):
+        super().__init__(f"Insufficient stock for {', '.join(remaining)}")
+        self.remaining = remaining
+
+def line_quantities(lines: List[dict]) -> Counter:
+    """Total quantity ordered per menu item id"""
+    quantities = Counter()
+    for line in lines:
+        quantities[line['id']] += line.get('quantity') or 1
+    return quantities
+
+def reserve_stock(db: Session, lines: List[dict]) -> List[str]:
+    """Take stock for an order in the caller's transaction.
+    Returns ids that just sold out; raises OutOfStock if any item is short, and the caller rolls back"""
+    quantities = line_quantities(lines)
+    tracked = [item_id for (item_id,) in db.query(MenuItem.id).filter(
+        MenuItem.id.in_(quantities), MenuItem.stock.isnot(None)
+    ).all()]
+    if not tracked:
+        return []
+
+    short = {}
+    sold_out = []
+    for item_id in sorted(tracked):
+        quantity = quantities[item_id]
+        # The WHERE clause is the guard: a concurrent order that got there first makes this match nothing
+        updated = db.query(MenuItem).filter(MenuItem.id == item_id, MenuItem.stock >= quantity).update({
+            MenuItem.stock: MenuItem.stock - quantity,
+            MenuItem.available: case((MenuItem.stock - quantity <= 0, False), else_=MenuItem.available),
+        }, synchronize_session=False)
+        # Read back inside the transaction; the count read above may be stale by now
+        left = db.query(MenuItem.stock).filter(MenuItem.id == item_id).scalar() or 0
+        if not updated:
+            short[item_id] = left
+        elif left <= 0:
+            sold_out.append(item_id)
+    if short:
+        raise OutOfStock(short)
+    return sold_out
+
+def release_stock(db: Session, lines: List[dict]) -> List[str]:
+    """Give back stock taken by an order that was cancelled, in the caller's transaction.
+    Items that sold out on stock go back on sale; ones taken off by hand stay off.
+    Returns ids that are back on sale"""
+    quantities = line_quantities(lines)
+    restocked = [item_id for (item_id,) in db.query(MenuItem.id).filter(
+        MenuItem.id.in_(quantities), MenuItem.stock <= 0, MenuItem.available.is_(False)
+    ).all()]
+    for item_id, quantity in quantities.items():
+        # SET expressions see the row as it was, so this tests the stock before the release
+        db.query(MenuItem).filter(MenuItem.id == item_id, MenuItem.stock.isnot(None)).update({
+            MenuItem.stock: MenuItem.stock + quantity,
+            MenuItem.available: case((MenuItem.stock <= 0, True), else_=MenuItem.available),
+        }, synchronize_session=False)
+    return restocked
+
+def set_stock(db: Session, item: MenuItem, stock: Optional[int]):
+    """Set (or with None, stop tracking) an item's stock; a positive count puts it back on sale"""
+    item.stock = stock
+    if stock is not None:
+        item.available = stock > 0
+    db.commit()
+
+def stock_levels(db: Session) -> Dict[str, int]:
+    """Remaining stock for every tracked item"""
+    return dict(db.query(MenuItem.id, MenuItem.stock).filter(MenuItem.stock.isnot(None)).all())
@@ -0,0 +1,322 @@
+"""
+Restaurant load simulator and traffic replay
+simulate: parties arrive at a configurable rate, scan their table's QR code
+(menu fetch), browse, customise and build a cart, check the kitchen wait,
+order, and track the order until it is served, sometimes ordering a
+second round before closing the table. Kitchen tablets hold /ws
+connections and staff bump each new order through the kitchen as it
+cooks. Simulated time runs --time-scale times faster than real time.
+replay: re-sends a trace recorded with TRACE_FILE at --speed times its
+original pace, pointing requests for recorded orders at the orders the
+replay creates. SSE streams are skipped, and conditional GETs send the
+ETag the replay last saw for that URL.
+Run: python loadsim.py simulate [--url URL] [--parties-per-hour 50] [--minutes 120] [--time-scale 60]
+     python loadsim.py replay TRACE [--url URL] [--speed 5]
+"""
+from collections import Counter
+import argparse
+import asyncio
+import json
+import random
+import re
+import sys
+import time
+import uuid
+import zlib
+
+import httpx
+import numpy as np
+import websockets
+
+from stress_orders import Recorder
+
+CUSTOMIZATIONS = [
+    "extra spicy", "less spicy", "no onions", "no garlic, less oil", "make it mild",
+    "extra cheese", "gluten free please", "no coriander", "well done", "half portion",
+]
+SEARCHES = ["paneer", "chicken", "noodles", "spicy", "veg", "pasta", "biryani", "soup"]
+PAYMENT_METHODS = ["upi", "card", "cash"]
+TERMINAL_STATUSES = ('completed', 'cancelled')
+
+class Simulation:
+    def __init__(self, args, client: httpx.AsyncClient):
+        self.args = args
+        self.client = client
+        self.recorder = Recorder()
+        self.rng = random.Random(args.seed)
+        self.free_tables = list(range(1, args.tables + 1))
+        self.counts = Counter()
+        self.posted_at = {}     # order id -> when its POST was sent
+        self.received_at = {}   # order id -> when the first screen heard about it
+        self.cooking = set()
+
+    async def sim_sleep(self, minutes: float):
+        await asyncio.sleep(minutes * 60 / self.args.time_scale)
+
+    async def call(self, label: str, method: str, url: str, **kwargs):
+        """A request that waits out 429s the way the apps do"""
+        for _ in range(5):
+            response = await self.recorder.call(self.client, label, method, url, **kwargs)
+            if response is None or response.status_code != 429:
+                return response
+            await asyncio.sleep(float(response.headers.get('retry-after', 1)))
+        return response
+
+    # Guests
+    async def party(self, n: int):
+        if not self.free_tables:
+            self.counts['parties turned away'] += 1
+            return
+        table = self.free_tables.pop(self.rng.randrange(len(self.free_tables)))
+        headers = {"X-Table-Number": str(table)}
+        self.counts['parties seated'] += 1
+        try:
+            response = await self.call('GET /api/menu', 'GET', '/api/menu', headers={**headers, "Accept-Encoding": "br, gzip"})
+            if response is None or response.status_code != 200:
+                return
+            menu = [item for item in response.json() if item.get("available")]
+            rounds = 2 if self.rng.random() < self.args.second_round else 1
+            for _ in range(rounds):
+                order_id = await self.order_round(n, table, headers, menu)
+                if not order_id:
+                    return
+                await self.track(order_id, headers)
+            await self.sim_sleep(self.rng.uniform(3, 8))
+            response = await self.call('POST /api/tables/{n}/close', 'POST', f'/api/tables/{table}/close',
+                                       json={"paymentMethod": self.rng.choice(PAYMENT_METHODS)}, headers=headers)
+            if response is not None and response.status_code == 200:
+                self.counts['tables settled'] += 1
+        finally:
+            self.free_tables.append(table)
+
+    async def order_round(self, n: int, table: int, headers: dict, menu: list):
+        await self.sim_sleep(self.rng.uniform(2, 6))
+        if self.rng.random() < 0.3:
+            await self.call('GET /api/menu/search', 'GET', f'/api/menu/search?q={self.rng.choice(SEARCHES)}', headers=headers)
+
+        cart = []
+        for item in self.rng.sample(menu, min(len(menu), self.rng.randint(1, self.args.max_lines))):
+            line = {"id": item["id"], "name": item["name"], "price": item["price"], "quantity": self.rng.randint(1, 2),
+                    "category": item["category"], "preparationTime": item.get("preparationTime", 15)}
+            if self.rng.random() < self.args.customize:
+                line["customization"] = self.rng.choice(CUSTOMIZATIONS)
+                await self.call('POST /api/ai/customize', 'POST', '/api/ai/customize',
+                                json={"custom_text": line["customization"]}, headers=headers)
+            cart.append(line)
+            if self.rng.random() < 0.5:
+                await self.call('POST /api/menu/recommendations', 'POST', '/api/menu/recommendations',
+                                json={"itemIds": [l["id"] for l in cart]}, headers=headers)
+            await self.sim_sleep(self.rng.uniform(0.2, 1))
+
+        await self.call('GET /api/kitchen/load', 'GET', '/api/kitchen/load', headers=headers)
+        subtotal = sum(line["price"] * line["quantity"] for line in cart)
+        body = {"items": cart, "tableNumber": table, "customerName": f"Guest {n}",
+                "paymentMethod": self.rng.choice(PAYMENT_METHODS), "subtotal": subtotal,
+                "gst": round(subtotal * 0.05, 2), "total": round(subtotal * 1.05, 2)}
+        order_headers = {**headers, "Idempotency-Key": str(uuid.uuid4())}
+        for _ in range(2):
+            sent = time.perf_counter()
+            response = await self.call('POST /api/orders', 'POST', '/api/orders', json=body, headers=order_headers)
+            if response is not None and response.status_code == 409 and "quotedWaitMinutes" in response.text:
+                # Busy kitchen: most guests accept the quoted wait
+                if self.rng.random() < 0.2:
+                    self.counts['orders abandoned at quote'] += 1
+                    return None
+                body["acceptQuotedWait"] = True
+                continue
+            break
+        if response is None or response.status_code != 200:
+            self.counts['orders failed'] += 1
+            return None
+        order_id = response.json()["id"]
+        self.posted_at[order_id] = sent
+        self.counts['orders placed'] += 1
+        return order_id
+
+    async def track(self, order_id: str, headers: dict):
+        """Long-poll the tracking page until the order is served"""
+        etag = None
+        while True:
+            response = await self.call('GET /api/orders/{id}?wait', 'GET', f'/api/orders/{order_id}?wait=20',
+                                       headers={**headers, **({"If-None-Match": etag} if etag else {})})
+            if response is None:
+                await asyncio.sleep(1)
+                continue
+            if response.status_code == 200:
+                etag = response.headers.get("etag")
+                if response.json()["status"] in TERMINAL_STATUSES:
+                    self.counts['orders served'] += 1
+                    return
+            elif response.status_code != 304:
+                return
+
+    # Kitchen
+    async def screen(self, k: int):
+        """A kitchen tablet: loads open orders, then follows /ws and cooks its share of new orders"""
+        url = re.sub(r'^http', 'ws', self.args.url) + '/ws?encoding=json'
+        headers = {"X-Client-Id": f"kitchen-{k}"}
+        await self.call('GET /api/orders?active', 'GET', '/api/orders?active=true', headers=headers)
+        async with websockets.connect(url) as ws:
+            async for frame in ws:
+                message = json.loads(frame)
+                self.counts['ws messages'] += 1
+                if message.get("type") == "ping":
+                    await ws.send(json.dumps({"type": "pong"}))
+                elif message.get("type") == "new_order":
+                    order = message["order"]
+                    self.received_at.setdefault(order["id"], time.perf_counter())
+                    if zlib.crc32(order["id"].encode()) % self.args.screens == k:
+                        task = asyncio.create_task(self.cook(order, headers))
+                        self.cooking.add(task)
+                        task.add_done_callback(self.cooking.discard)
+
+    async def cook(self, order: dict, headers: dict):
+        prep = max((line.get("preparationTime") or 15 for line in order["items"]), default=15)
+        steps = [("preparing", self.rng.uniform(0.5, 3)), ("ready", prep * self.rng.uniform(0.8, 1.3)),
+                 ("completed", self.rng.uniform(1, 4))]
+        for status, minutes in steps:
+            await self.sim_sleep(minutes)
+            await self.call('PATCH /api/orders/{id}', 'PATCH', f'/api/orders/{order["id"]}',
+                            json={"status": status}, headers=headers)
+
+    async def run(self):
+        screens = [asyncio.create_task(self.screen(k)) for k in range(self.args.screens)]
+        await asyncio.sleep(0.5)
+        parties = []
+        elapsed = 0.0
+        per_minute = self.args.parties_per_hour / 60
+        while True:
+            gap = self.rng.expovariate(per_minute)
+            elapsed += gap
+            if elapsed > self.args.minutes:
+                break
+            await self.sim_sleep(gap)
+            self.counts['parties arrived'] += 1
+            parties.append(asyncio.create_task(self.party(len(parties))))
+
+        # Let seated parties finish their meals, up to --drain real seconds
+        done, pending = await asyncio.wait(parties, timeout=self.args.drain) if parties else (set(), set())
+        self.counts['parties still eating at the end'] = len(pending)
+        for task in [*pending, *screens, *self.cooking]:
+            task.cancel()
+        await asyncio.gather(*pending, *screens, *self.cooking, return_exceptions=True)
+
+    def report(self):
+        print("=" * 90)
+        for name, value in self.counts.items():
+            print(f"   {name:<36} {value}")
+        lags = [(self.received_at[i] - self.posted_at[i]) * 1000 for i in self.posted_at if i in self.received_at]
+        if lags:
+            p50, p95, p99 = np.percentile(lags, [50, 95, 99])
+            print(f"   {'POST to kitchen screen (ms)':<36} p50 {p50:.1f}, p95 {p95:.1f}, p99 {p99:.1f}")
+        print("=" * 90)
+        self.recorder.report()
+
+async def simulate(args) -> int:
+    print(f"🍽️  {args.parties_per_hour} parties/hour for {args.minutes} simulated minutes at {args.time_scale}× "
+          f"({args.minutes * 60 / args.time_scale:.0f}s), {args.tables} tables, {args.screens} kitchen screens")
+    async with httpx.AsyncClient(base_url=args.url, timeout=60, limits=httpx.Limits(max_connections=None)) as client:
+        simulation = Simulation(args, client)
+        started = time.perf_counter()
+        await simulation.run()
+        print(f"   Finished in {time.perf_counter() - started:.1f}s")
+        simulation.report()
+    return 1 if simulation.recorder.errors() else 0
+
+# Replay
+ORDER_ID = re.compile(r'order-[0-9]+(?:-[0-9a-f]+)?')
+
+def route_label(method: str, path: str) -> str:
+    return f"{method} {re.sub(r'/[0-9]+(?=/|$)', '/{n}', ORDER_ID.sub('{id}', path))}"
+
+async def replay(args) -> int:
+    with open(args.trace) as f:
+        entries = sorted((json.loads(line) for line in f if line.strip()), key=lambda e: e["at"])
+    entries = [e for e in entries if not e["path"].endswith("/events")]
+    if not entries:
+        print("Nothing to replay")
+        return 1
+    span = entries[-1]["at"] - entries[0]["at"]
+    run_id = uuid.uuid4().hex[:8]
+    created = {e["orderId"]: asyncio.Event() for e in entries if e.get("orderId")}
+    new_ids = {}
+    etags = {}      # path -> ETag this replay last saw for it
+    recorder = Recorder()
+    mismatched = Counter()
+    gate = asyncio.Semaphore(args.concurrency)
+
+    def rewrite(text: str) -> str:
+        return ORDER_ID.sub(lambda m: new_ids.get(m.group(0), m.group(0)), text)
+
+    async def send(entry, client, start):
+        await asyncio.sleep(max(0.0, start + (entry["at"] - entries[0]["at"]) / args.speed - time.perf_counter()))
+        # Requests for an order created in the trace wait for the replayed creation
+        for old_id in set(ORDER_ID.findall(entry["path"] + (entry.get("body") or ""))) & created.keys():
+            try:
+                await asyncio.wait_for(created[old_id].wait(), timeout=30)
+            except asyncio.TimeoutError:
+                pass
+        headers = dict(entry.get("headers") or {})
+        if "idempotency-key" in headers:
+            headers["idempotency-key"] += f"-replay-{run_id}"
+        path = rewrite(entry["path"])
+        # Recorded ETags never match the replayed orders; long-polls park on the latest one seen here instead
+        if "if-none-match" in headers:
+            headers.pop("if-none-match")
+            if path in etags:
+                headers["if-none-match"] = etags[path]
+        url = path + (f"?{rewrite(entry['query'])}" if entry.get("query") else "")
+        body = rewrite(entry["body"]).encode() if entry.get("body") else None
+        label = route_label(entry["method"], entry["path"])
+        async with gate:
+            response = await recorder.call(client, label, entry["method"], url, content=body, headers=headers)
+        if response is not None and response.headers.get("etag"):
+            etags[path] = response.headers["etag"]
+        if response is not None and response.status_code != entry.get("status"):
+            mismatched[f"{label} {entry.get('status')}→{response.status_code}"] += 1
+        if entry.get("orderId"):
+            if response is not None and response.status_code == 200:
+                new_ids[entry["orderId"]] = response.json().get("id")
+            created[entry["orderId"]].set()
+
+    print(f"⏩ Replaying {len(entries)} requests spanning {span:.0f}s at {args.speed}× against {args.url}")
+    async with httpx.AsyncClient(base_url=args.url, timeout=60, limits=httpx.Limits(max_connections=args.concurrency)) as client:
+        start = time.perf_counter()
+        await asyncio.gather(*[send(entry, client, start) for entry in entries])
+        print(f"   Finished in {time.perf_counter() - start:.1f}s (recorded pace: {span / args.speed:.1f}s)")
+    print("=" * 90)
+    recorder.report()
+    if mismatched:
+        print("=" * 90)
+        print("   Status codes that differ from the trace:")
+        for change, count in mismatched.most_common(10):
+            print(f"   {count:>6}  {change}")
+    return 1 if recorder.errors() else 0
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:8000')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    sim = commands.add_parser('simulate', help="model guests, kitchen screens and staff")
+    sim.add_argument('--parties-per-hour', type=float, default=50, help="mean arrival rate (Poisson)")
+    sim.add_argument('--minutes', type=float, default=120, help="simulated service length")
+    sim.add_argument('--time-scale', type=float, default=60, help="simulated seconds per real second")
+    sim.add_argument('--tables', type=int, default=40)
+    sim.add_argument('--screens', type=int, default=3, help="kitchen tablets on /ws")
+    sim.add_argument('--max-lines', type=int, default=5, help="most dishes per order")
+    sim.add_argument('--customize', type=float, default=0.3, help="share of dishes with a customization")
+    sim.add_argument('--second-round', type=float, default=0.25, help="share of tables that order again")
+    sim.add_argument('--drain', type=float, default=60, help="real seconds to let seated parties finish")
+    sim.add_argument('--seed', type=int, default=7)
+
+    rep = commands.add_parser('replay', help="re-send a TRACE_FILE recording")
+    rep.add_argument('trace')
+    rep.add_argument('--speed', type=float, default=1, help="N× the recorded pace")
+    rep.add_argument('--concurrency', type=int, default=200)
+
+    args = parser.parse_args()
+    return asyncio.run(simulate(args) if args.command == 'simulate' else replay(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,16 +1,56 @@
-from fastapi import FastAPI, HTTPException, Depends, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.orm import Session
-from typing import List, Optional
-from pydantic import BaseModel
-from datetime import datetime
+from sqlalchemy.exc import IntegrityError
+from typing import Dict, List, Literal, Optional
+from pydantic import BaseModel, Field
+from datetime import datetime, timedelta
 import json
 import asyncio
+import hashlib
+import re
+import secrets
 
-from database import get_db, init_db, Order, MenuItem, RestaurantSettings
+from database import get_db, init_db, SessionLocal, Order, ArchivedOrder, MenuItem, RestaurantSettings
+from archive import archive_orders, find_archived_order, ARCHIVE_INTERVAL_MINUTES, TERMINAL_STATUSES
+from search import MenuSearchIndex
+from recommend import RecommendationEngine
+from idempotency import IdempotencyStore, request_fingerprint
+from ratelimit import AdmissionController, AdmissionControlMiddleware
+from menu_cache import MenuCache, negotiate_encoding
+from traffic_trace import TraceRecorderMiddleware, TRACE_FILE
+import capacity
+from events import OrderEventHub, format_event, KEEPALIVE, SSE_KEEPALIVE_SECONDS
+from heartbeat import HeartbeatMonitor
+from ws_encoding import EncodedMessage, WS_PER_MESSAGE_DEFLATE, decode_client_message, negotiate_ws_encoding
+from active_orders import ActiveOrderStore
+from order_history import record_transition, order_timeline, time_in_state
+from prep_model import PrepTimeModel, load_samples, PREP_HISTORY_DAYS, PREP_REFIT_MINUTES
+from inventory import OutOfStock, reserve_stock, release_stock, set_stock, stock_levels
+from table_sessions import open_session, current_session, add_to_bill, settle_tables, serialize_bill
+from ai_service import router as ai_router, parse_customization, annotate_order_lines, load_ingredient_vocabulary
 
 app = FastAPI(title="SwiftServe AI API")
 
+# Server-Sent Events streams; GZip would buffer them until enough bytes pile up
+EVENT_STREAM_PATH = re.compile(r'^/api/orders/[^/]+/events$')
+
+class EventStreamAwareGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that leaves event streams uncompressed, so each event reaches the client as it is written"""
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'http' and EVENT_STREAM_PATH.match(scope['path']):
+            return await self.app(scope, receive, send)
+        await super().__call__(scope, receive, send)
+
+# Compress other large responses; precompressed menu bodies pass through untouched
+app.add_middleware(EventStreamAwareGZipMiddleware, minimum_size=1000, compresslevel=6)
+
+# Token-bucket rate limits and DB concurrency cap; added first so CORS wraps its 429s
+admission = AdmissionController()
+app.add_middleware(AdmissionControlMiddleware, controller=admission)
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -18,28 +58,143 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["Retry-After", "X-Menu-Version", "X-Menu-Epoch", "ETag"],
 )
 
+# Request traces for `loadsim.py replay`; outermost, so it records what clients actually sent
+if TRACE_FILE:
+    app.add_middleware(TraceRecorderMiddleware, path=TRACE_FILE)
+
+# AI customization and suggestion endpoints, served in-process
+app.include_router(ai_router)
+
 # WebSocket connection manager for real-time updates
 class ConnectionManager:
     def __init__(self):
-        self.active_connections: List[WebSocket] = []
+        # Connection -> negotiated message encoding
+        self.active_connections: Dict[WebSocket, str] = {}
 
-    async def connect(self, websocket: WebSocket):
+    async def connect(self, websocket: WebSocket, encoding: str = 'json'):
         await websocket.accept()
-        self.active_connections.append(websocket)
+        self.active_connections[websocket] = encoding
+        heartbeats.track(websocket)
 
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
+        self.active_connections.pop(websocket, None)
+        heartbeats.untrack(websocket)
+
+    async def send(self, websocket: WebSocket, message: EncodedMessage):
+        """Send a message in the connection's encoding, reusing frames already encoded for it"""
+        frame = message.frame(self.active_connections.get(websocket, 'json'))
+        if isinstance(frame, bytes):
+            await websocket.send_bytes(frame)
+        else:
+            await websocket.send_text(frame)
 
     async def broadcast(self, message: dict):
-        for connection in self.active_connections:
+        order_events.publish(message)
+        # Encoded once per format, not once per connection
+        encoded = EncodedMessage(message)
+        for connection in list(self.active_connections):
             try:
-                await connection.send_json(message)
+                await self.send(connection, encoded)
             except:
-                pass
+                self.disconnect(connection)
+
+# Pings idle /ws clients on one shared timer wheel and drops the ones that stop answering
+heartbeats = HeartbeatMonitor()
 
 manager = ConnectionManager()
+heartbeats.on_reap = manager.disconnect
+PING = EncodedMessage({"type": "ping"})
+heartbeats.send = lambda websocket: manager.send(websocket, PING)
+
+# Order events from manager.broadcast, fanned out to per-order SSE streams
+order_events = OrderEventHub()
+
+# Responses to POST /api/orders keyed by the client's Idempotency-Key header
+idempotency_store = IdempotencyStore()
+
+# Serialized and precompressed /api/menu bodies, rebuilt once per menu version
+menu_cache = MenuCache()
+
+# In-memory full-text index over the menu, built lazily on first search
+menu_index = MenuSearchIndex()
+
+def ensure_menu_index(db: Session) -> MenuSearchIndex:
+    """Build the search index from the database if it hasn't been yet"""
+    if not menu_index.ready:
+        menu_index.rebuild([serialize_menu_item(item) for item in db.query(MenuItem).all()])
+    return menu_index
+
+# Item co-occurrence counts over order history, built lazily on first use
+recommender = RecommendationEngine()
+
+def ensure_recommender(db: Session) -> RecommendationEngine:
+    """Count the full order history (hot and archived) if it hasn't been yet"""
+    if not recommender.ready:
+        history = []
+        for model in (Order, ArchivedOrder):
+            for items, timestamp in db.query(model.items, model.timestamp).all():
+                history.append((json.loads(items), timestamp))
+        recommender.rebuild(history)
+    return recommender
+
+# Open orders held in memory for kitchen reads, loaded at startup or on first use
+active_orders = ActiveOrderStore()
+
+def ensure_active_orders(db: Session) -> ActiveOrderStore:
+    """Load open orders from the database if the store hasn't been yet"""
+    if not active_orders.ready:
+        active_orders.load(db, serialize_order)
+    return active_orders
+
+# Prep times learned from order history, refitted in the background
+prep_model = PrepTimeModel()
+
+def prep_estimate() -> capacity.PrepEstimate:
+    """Learned per-dish prep minutes once fitted, else the menu's static values"""
+    return prep_model.item_minutes if prep_model.ready else capacity.static_minutes
+
+def refit_prep_model(db: Session):
+    prep_model.fit(load_samples(db, datetime.utcnow() - timedelta(days=PREP_HISTORY_DAYS)))
+
+def kitchen_load(db: Session) -> Dict[str, float]:
+    """Outstanding cooking minutes per station, queued orders included, from the in-memory open orders"""
+    orders = ensure_active_orders(db).list(capacity.BACKLOG_STATUSES)
+    return capacity.station_load((order["items"] for order in orders), prep_estimate())
+
+def menu_upsert(db_item: MenuItem) -> dict:
+    """Index a created/updated item and describe the change for clients"""
+    item = serialize_menu_item(db_item)
+    if menu_index.ready:
+        menu_index.upsert(item)
+    return {"op": "upsert", "item": item}
+
+def menu_delete(item_id: str) -> dict:
+    """Drop a deleted item from the index and describe the change for clients"""
+    menu_index.remove(item_id)
+    return {"op": "delete", "id": item_id}
+
+def menu_patch(item_id: str, fields: dict) -> dict:
+    """Apply a partial update to the indexed item and describe it for clients"""
+    if menu_index.ready and item_id in menu_index.items:
+        menu_index.items[item_id].update(fields)
+    return {"op": "patch", "id": item_id, "fields": fields}
+
+async def publish_menu_changes(db: Session, changes: List[dict], refresh_vocabulary: bool = True):
+    """Bump the menu version and broadcast the changes as one delta.
+    Clients at baseVersion apply them in place; anyone further behind refetches /api/menu"""
+    if refresh_vocabulary:
+        load_ingredient_vocabulary(db)
+    menu_cache.invalidate()
+    await manager.broadcast({
+        "type": "menu_updated",
+        "epoch": menu_cache.epoch,
+        "version": menu_cache.version,
+        "baseVersion": menu_cache.version - 1,
+        "changes": changes
+    })
 
 # Pydantic models
 class OrderItem(BaseModel):
@@ -60,9 +215,14 @@ class OrderCreate(BaseModel):
     total: float
     subtotal: float
     gst: float
+    acceptQuotedWait: bool = False
 
 class OrderUpdate(BaseModel):
-    status: str
+    status: Literal['pending', 'new', 'preparing', 'ready', 'completed', 'cancelled']
+
+class CartRecommendationRequest(BaseModel):
+    itemIds: List[str]
+    limit: int = Field(5, ge=1, le=50)
 
 class MenuItemCreate(BaseModel):
     name: str
@@ -75,6 +235,23 @@ class MenuItemCreate(BaseModel):
     aiRecommended: bool = False
     image: Optional[str] = None
 
+class AvailabilityUpdate(BaseModel):
+    available: bool
+
+class BulkAvailabilityUpdate(BaseModel):
+    itemIds: List[str]
+    available: bool
+
+class StockUpdate(BaseModel):
+    stock: Optional[int] = Field(None, ge=0)  # None stops tracking
+
+class TableSettle(BaseModel):
+    tableNumbers: List[int]
+    paymentMethod: Optional[str] = None
+
+class TableClose(BaseModel):
+    paymentMethod: Optional[str] = None
+
 # Initialize database on startup
 @app.on_event("startup")
 async def startup_event():
@@ -83,7 +260,54 @@ async def startup_event():
     db = next(get_db())
     if db.query(MenuItem).count() == 0:
         seed_menu_data(db)
+    load_ingredient_vocabulary(db)
+    ensure_active_orders(db)
     db.close()
+    if ARCHIVE_INTERVAL_MINUTES > 0:
+        asyncio.create_task(archive_loop())
+    if heartbeats.interval > 0:
+        asyncio.create_task(heartbeat_loop())
+    if PREP_REFIT_MINUTES > 0:
+        asyncio.create_task(prep_refit_loop())
+
+def refit_prep_model_job():
+    db = SessionLocal()
+    try:
+        refit_prep_model(db)
+    finally:
+        db.close()
+
+async def prep_refit_loop():
+    """Fit prep times now and again every PREP_REFIT_MINUTES, off the event loop"""
+    while True:
+        try:
+            await asyncio.to_thread(refit_prep_model_job)
+        except Exception as e:
+            print(f"Prep time refit failed: {e}")
+        await asyncio.sleep(PREP_REFIT_MINUTES * 60)
+
+async def heartbeat_loop():
+    """Advance the shared heartbeat wheel once per tick"""
+    while True:
+        await asyncio.sleep(heartbeats.tick_seconds)
+        try:
+            await heartbeats.tick()
+        except Exception as e:
+            print(f"WebSocket heartbeat failed: {e}")
+
+async def archive_loop():
+    """Periodically move finished orders into cold storage"""
+    while True:
+        await asyncio.sleep(ARCHIVE_INTERVAL_MINUTES * 60)
+        db = SessionLocal()
+        try:
+            archive_orders(db)
+            idempotency_store.purge_expired(db)
+        except Exception as e:
+            db.rollback()
+            print(f"Order archival failed: {e}")
+        finally:
+            db.close()
 
 def seed_menu_data(db: Session):
     """Seed initial menu data"""
@@ -206,37 +430,143 @@ def seed_menu_data(db: Session):
 # WebSocket endpoint for real-time updates
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    await manager.connect(websocket)
+    await manager.connect(websocket, negotiate_ws_encoding(websocket.query_params.get("encoding")))
     try:
         while True:
-            data = await websocket.receive_text()
-            # Keep connection alive
-            await websocket.send_text(json.dumps({"type": "ping"}))
+            frame = await websocket.receive()
+            if frame["type"] == "websocket.disconnect":
+                break
+            heartbeats.seen(websocket)
+            # Pongs answer our heartbeat; anything else still gets the old keep-alive reply
+            message = decode_client_message(frame)
+            if message and message.get("type") == "pong":
+                continue
+            await manager.send(websocket, PING)
     except WebSocketDisconnect:
+        pass
+    finally:
         manager.disconnect(websocket)
 
+@app.get("/api/ws/stats")
+async def websocket_stats():
+    """Live vs. reaped WebSocket connections on this worker"""
+    return {**heartbeats.stats(), "broadcastTargets": len(manager.active_connections)}
+
+def serialize_order(order) -> dict:
+    """Convert an Order (or ArchivedOrder) row to the API shape"""
+    return {
+        "id": order.id,
+        "customerName": order.customer_name,
+        "tableNumber": order.table_number,
+        "items": json.loads(order.items),
+        "status": order.status,
+        "total": order.total,
+        "subtotal": order.subtotal,
+        "gst": order.gst,
+        "paymentMethod": order.payment_method,
+        "customerInstructions": order.customer_instructions,
+        "timestamp": order.timestamp.isoformat(),
+        "sessionId": order.session_id
+    }
+
 # Order endpoints
+def replay_idempotent(stored: tuple, fingerprint: str, response: Response) -> dict:
+    """Return the original response for a retried request"""
+    stored_fingerprint, stored_response = stored
+    if stored_fingerprint != fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+    response.headers["Idempotent-Replayed"] = "true"
+    return stored_response
+
+def new_order_id() -> str:
+    """Millisecond timestamp for ordering, plus a random suffix so concurrent orders on any worker never collide"""
+    return f"order-{int(datetime.now().timestamp() * 1000)}-{secrets.token_hex(4)}"
+
 @app.post("/api/orders")
-async def create_order(order: OrderCreate, db: Session = Depends(get_db)):
-    """Create a new order"""
-    order_id = f"order-{int(datetime.now().timestamp() * 1000)}"
+async def create_order(
+    order: OrderCreate,
+    response: Response,
+    db: Session = Depends(get_db),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Create a new order; retries with the same Idempotency-Key return the first response"""
+    if idempotency_key:
+        fingerprint = request_fingerprint(order.dict())
+        stored = idempotency_store.lookup(db, idempotency_key)
+        if stored:
+            return replay_idempotent(stored, fingerprint, response)
     
+    order_id = new_order_id()
+    # Parse customizations once here so kitchen screens never have to
+    items = annotate_order_lines([item.dict() for item in order.items])
+    
+    status = 'new'
+    result = {"id": order_id}
+    if capacity.KITCHEN_THROTTLE_MODE != 'off':
+        load = kitchen_load(db)
+        quoted_wait = capacity.quote_wait(load, items, prep_estimate())
+        if capacity.is_overloaded(load, items):
+            if capacity.KITCHEN_THROTTLE_MODE == 'queue':
+                status = capacity.PENDING_STATUS
+            elif not order.acceptQuotedWait:
+                raise HTTPException(status_code=409, detail={
+                    "message": "Kitchen is busy, please confirm the longer wait",
+                    "quotedWaitMinutes": quoted_wait
+                })
+        result = {"id": order_id, "status": status, "quotedWaitMinutes": quoted_wait}
+    
+    try:
+        sold_out = reserve_stock(db, items)
+    except OutOfStock as e:
+        db.rollback()
+        raise HTTPException(status_code=409, detail={
+            "message": "Some items just sold out",
+            "remainingStock": e.remaining
+        })
+    
+    table_session = open_session(db, order.tableNumber)
+    placed_at = datetime.utcnow()
     db_order = Order(
         id=order_id,
         customer_name=order.customerName,
         table_number=order.tableNumber,
-        items=json.dumps([item.dict() for item in order.items]),
-        status='new',
+        items=json.dumps(items),
+        status=status,
         total=order.total,
         subtotal=order.subtotal,
         gst=order.gst,
         payment_method=order.paymentMethod,
-        customer_instructions=order.customerInstructions
+        customer_instructions=order.customerInstructions,
+        timestamp=placed_at,
+        session_id=table_session.id
     )
     
     db.add(db_order)
-    db.commit()
+    add_to_bill(db, table_session.id, db_order)
+    record_transition(db, order_id, None, status, placed_at)
+    if idempotency_key:
+        # Same transaction as the order, so a key never exists without its order
+        idempotency_store.record(db, idempotency_key, fingerprint, result)
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        # Another worker committed the same key first
+        stored = idempotency_store.lookup(db, idempotency_key) if idempotency_key else None
+        if not stored:
+            raise
+        return replay_idempotent(stored, fingerprint, response)
+    if idempotency_key:
+        idempotency_store.remember(idempotency_key, fingerprint, result)
     db.refresh(db_order)
+    if active_orders.ready:
+        active_orders.put(serialize_order(db_order))
+    if recommender.ready:
+        recommender.add_order(items, db_order.timestamp)
+    if sold_out:
+        await publish_menu_changes(
+            db, [menu_patch(item_id, {"available": False}) for item_id in sold_out], refresh_vocabulary=False
+        )
     
     # Broadcast new order to all connected clients
     await manager.broadcast({
@@ -245,64 +575,214 @@ async def create_order(order: OrderCreate, db: Session = Depends(get_db)):
             "id": db_order.id,
             "customerName": db_order.customer_name,
             "tableNumber": db_order.table_number,
-            "items": json.loads(db_order.items),
+            "items": items,
             "status": db_order.status,
             "total": db_order.total,
+            "customerInstructions": db_order.customer_instructions,
+            "kitchenInstruction": parse_customization(db_order.customer_instructions) if db_order.customer_instructions else None,
             "timestamp": db_order.timestamp.isoformat()
         }
     })
     
-    return {"id": order_id}
+    return result
+
+@app.get("/api/kitchen/time-in-state")
+async def get_time_in_state(hours: float = 24, db: Session = Depends(get_db)):
+    """How long orders spent in each status over the last few hours"""
+    return time_in_state(db, datetime.utcnow() - timedelta(hours=hours))
+
+@app.get("/api/kitchen/prep-times")
+async def get_prep_times(db: Session = Depends(get_db)):
+    """Learned prep minutes per dish and how much the current load stretches them"""
+    open_orders = len(ensure_active_orders(db).list(capacity.OPEN_STATUSES))
+    return {
+        **prep_model.summary(),
+        "openOrders": open_orders,
+        "loadMultiplier": round(1 + prep_model.load_factor * open_orders, 3)
+    }
+
+@app.post("/api/kitchen/prep-times/refit")
+async def run_prep_refit(db: Session = Depends(get_db)):
+    """Refit prep times from order history now, off the event loop"""
+    await asyncio.to_thread(refit_prep_model, db)
+    return prep_model.summary()
+
+@app.get("/api/kitchen/load")
+async def get_kitchen_load(db: Session = Depends(get_db)):
+    """Outstanding cooking time per station, for quoting waits before checkout"""
+    return capacity.load_summary(kitchen_load(db))
 
 @app.get("/api/orders")
-async def get_orders(db: Session = Depends(get_db)):
-    """Get all orders"""
+async def get_orders(active: bool = False, status: Optional[str] = None, db: Session = Depends(get_db)):
+    """Get all orders; ?active=true serves open orders from memory, optionally by status"""
+    if active:
+        return ensure_active_orders(db).list([status] if status else None)
     orders = db.query(Order).order_by(Order.timestamp.desc()).all()
-    return [{
-        "id": order.id,
-        "customerName": order.customer_name,
-        "tableNumber": order.table_number,
-        "items": json.loads(order.items),
-        "status": order.status,
-        "total": order.total,
-        "subtotal": order.subtotal,
-        "gst": order.gst,
-        "paymentMethod": order.payment_method,
-        "customerInstructions": order.customer_instructions,
-        "timestamp": order.timestamp.isoformat()
-    } for order in orders]
+    return [serialize_order(order) for order in orders]
+
+@app.post("/api/orders/archive")
+async def run_order_archival(olderThanHours: Optional[float] = None, db: Session = Depends(get_db)):
+    """Move finished orders into cold storage now"""
+    archived = archive_orders(db, older_than_hours=olderThanHours)
+    return {"archived": archived}
+
+def order_etag(body: dict) -> str:
+    """Version tag for an order's current state"""
+    return '"' + hashlib.sha1(json.dumps(body, sort_keys=True).encode()).hexdigest()[:16] + '"'
 
 @app.get("/api/orders/{order_id}")
-async def get_order(order_id: str, db: Session = Depends(get_db)):
-    """Get a specific order"""
-    order = db.query(Order).filter(Order.id == order_id).first()
-    if not order:
-        raise HTTPException(status_code=404, detail="Order not found")
+async def get_order(order_id: str, request: Request, wait: float = 0, db: Session = Depends(get_db)):
+    """Get a specific order, falling back to the archive.
+    With If-None-Match and ?wait=N, waits up to N seconds for a change before answering 304"""
+    # Registered before reading so a change landing mid-request still wakes us
+    waiter = order_events.waiter(order_id) if wait > 0 else None
+    try:
+        order = db.query(Order).filter(Order.id == order_id).first()
+        if not order:
+            order = find_archived_order(db, order_id)
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found")
+        body = serialize_order(order)
+        etag = order_etag(body)
+        
+        if_none_match = request.headers.get("if-none-match")
+        if waiter and if_none_match == etag:
+            # Hand the pooled connection back while parked
+            db.close()
+            if await order_events.wait(waiter, wait):
+                order = db.query(Order).filter(Order.id == order_id).first() or find_archived_order(db, order_id)
+                if order:
+                    body = serialize_order(order)
+                    etag = order_etag(body)
+    finally:
+        if waiter:
+            order_events.discard_waiter(order_id, waiter)
     
-    return {
-        "id": order.id,
-        "customerName": order.customer_name,
-        "tableNumber": order.table_number,
-        "items": json.loads(order.items),
-        "status": order.status,
-        "total": order.total,
-        "subtotal": order.subtotal,
-        "gst": order.gst,
-        "paymentMethod": order.payment_method,
-        "customerInstructions": order.customer_instructions,
-        "timestamp": order.timestamp.isoformat()
-    }
+    if if_none_match == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    return JSONResponse(body, headers={"ETag": etag})
 
-@app.patch("/api/orders/{order_id}")
-async def update_order_status(order_id: str, update: OrderUpdate, db: Session = Depends(get_db)):
-    """Update order status"""
-    order = db.query(Order).filter(Order.id == order_id).first()
-    if not order:
+def order_event_status(message: dict) -> Optional[str]:
+    order = message.get("order")
+    return message.get("status") or (order.get("status") if isinstance(order, dict) else None)
+
+@app.get("/api/orders/{order_id}/events")
+async def stream_order_events(order_id: str, request: Request, db: Session = Depends(get_db)):
+    """Server-Sent Events for one order; reconnects resume from Last-Event-ID"""
+    position = order_events.seq
+    last_event_id = request.headers.get("last-event-id")
+    queue, backlog = order_events.subscribe(order_id, last_event_id)
+    snapshot = None
+    if backlog is None:
+        order = db.query(Order).filter(Order.id == order_id).first() or find_archived_order(db, order_id)
+        if not order:
+            order_events.unsubscribe(order_id, queue)
+            raise HTTPException(status_code=404, detail="Order not found")
+        snapshot = serialize_order(order)
+    # Don't hold a pooled connection for the life of the stream
+    db.close()
+    
+    async def stream():
+        try:
+            yield "retry: 3000\n\n"
+            if snapshot:
+                yield format_event(order_events.event_id(position), "snapshot", snapshot)
+                if snapshot["status"] in TERMINAL_STATUSES:
+                    return
+            for seq, _, message in backlog or []:
+                yield format_event(order_events.event_id(seq), message["type"], message)
+                if order_event_status(message) in TERMINAL_STATUSES:
+                    return
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE
+                    continue
+                if event is None:
+                    return
+                seq, _, message = event
+                yield format_event(order_events.event_id(seq), message["type"], message)
+                if order_event_status(message) in TERMINAL_STATUSES:
+                    return
+        finally:
+            order_events.unsubscribe(order_id, queue)
+    
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no"
+    })
+
+@app.get("/api/orders/{order_id}/timeline")
+async def get_order_timeline(order_id: str, db: Session = Depends(get_db)):
+    """Status transitions of an order with time spent in each"""
+    timeline = order_timeline(db, order_id)
+    if not timeline:
         raise HTTPException(status_code=404, detail="Order not found")
+    return {"orderId": order_id, "timeline": timeline}
+
+# Attempts at the status compare-and-set before giving up on a hot order
+STATUS_UPDATE_ATTEMPTS = 3
+
+@app.patch("/api/orders/{order_id}")
+async def update_order_status(
+    order_id: str,
+    update: OrderUpdate,
+    db: Session = Depends(get_db),
+    if_match: Optional[str] = Header(None, alias="If-Match")
+):
+    """Update order status.
+    The write only lands if the status is still the one just read, so concurrent updates from any
+    worker are applied one after another and each is recorded from the status it really replaced.
+    With If-Match, fails with 412 if the order changed since the client's copy"""
+    for _ in range(STATUS_UPDATE_ATTEMPTS):
+        order = db.query(Order).filter(Order.id == order_id).first()
+        if not order:
+            raise HTTPException(status_code=404, detail="Order not found")
+        if if_match and if_match != order_etag(serialize_order(order)):
+            raise HTTPException(status_code=412, detail="Order changed since it was read")
+        previous = order.status
+        if previous == update.status:
+            return {"message": "Order updated successfully"}
+        now = datetime.utcnow()
+        changed = db.query(Order).filter(Order.id == order_id, Order.status == previous).update(
+            {Order.status: update.status, Order.updated_at: now}, synchronize_session=False
+        )
+        if changed:
+            break
+        # Another request changed it first; expire what we read and look again
+        db.rollback()
+    else:
+        raise HTTPException(status_code=409, detail="Order is being updated concurrently, please retry")
     
-    order.status = update.status
-    order.updated_at = datetime.utcnow()
+    # Every order that isn't cancelled holds its stock, as it holds its place on the bill
+    menu_changes = []
+    if update.status == 'cancelled':
+        menu_changes = [menu_patch(item_id, {"available": True}) for item_id in release_stock(db, json.loads(order.items))]
+    elif previous == 'cancelled':
+        # A reinstated order takes its stock again, or stays cancelled if that stock has been sold since
+        try:
+            sold_out = reserve_stock(db, json.loads(order.items))
+        except OutOfStock as e:
+            db.rollback()
+            raise HTTPException(status_code=409, detail={
+                "message": "Some items sold out since the order was cancelled",
+                "remainingStock": e.remaining
+            })
+        menu_changes = [menu_patch(item_id, {"available": False}) for item_id in sold_out]
+    if order.session_id and 'cancelled' in (previous, update.status):
+        # Cancelled orders come off the table's bill, and go back on if reinstated
+        add_to_bill(db, order.session_id, order, -1 if update.status == 'cancelled' else 1)
+    record_transition(db, order_id, previous, update.status, now)
+    stored = active_orders.get(order_id)
+    reopened = {**serialize_order(order), "status": update.status} if active_orders.ready and not stored else None
     db.commit()
+    if stored:
+        active_orders.put({**stored, "status": update.status})
+    elif reopened:
+        active_orders.put(reopened)
+    if menu_changes:
+        await publish_menu_changes(db, menu_changes, refresh_vocabulary=False)
     
     # Broadcast status update
     await manager.broadcast({
@@ -313,12 +793,39 @@ async def update_order_status(order_id: str, update: OrderUpdate, db: Session =
     
     return {"message": "Order updated successfully"}
 
-# Menu endpoints
-@app.get("/api/menu")
-async def get_menu(db: Session = Depends(get_db)):
-    """Get all menu items"""
-    items = db.query(MenuItem).all()
-    return [{
+# Table bill endpoints
+@app.get("/api/tables/{table_number}/bill")
+async def get_table_bill(table_number: int, db: Session = Depends(get_db)):
+    """Running bill of the table's open session"""
+    table_session = current_session(db, table_number)
+    if not table_session:
+        raise HTTPException(status_code=404, detail="No open bill for this table")
+    return serialize_bill(table_session)
+
+async def settle_and_broadcast(db: Session, table_numbers: List[int], payment_method: Optional[str]) -> List[dict]:
+    bills = [serialize_bill(s) for s in settle_tables(db, table_numbers, payment_method)]
+    if bills:
+        await manager.broadcast({"type": "tables_settled", "bills": bills})
+    return bills
+
+@app.post("/api/tables/close")
+async def close_tables(settle: TableSettle, db: Session = Depends(get_db)):
+    """Settle several tables at once; their next orders start new bills"""
+    bills = await settle_and_broadcast(db, settle.tableNumbers, settle.paymentMethod)
+    settled = {bill["tableNumber"] for bill in bills}
+    return {"settled": bills, "missing": [n for n in settle.tableNumbers if n not in settled]}
+
+@app.post("/api/tables/{table_number}/close")
+async def close_table(table_number: int, close: Optional[TableClose] = None, db: Session = Depends(get_db)):
+    """Settle one table's bill"""
+    bills = await settle_and_broadcast(db, [table_number], close.paymentMethod if close else None)
+    if not bills:
+        raise HTTPException(status_code=404, detail="No open bill for this table")
+    return bills[0]
+
+def serialize_menu_item(item: MenuItem) -> dict:
+    """Convert a MenuItem row to the API shape"""
+    return {
         "id": item.id,
         "name": item.name,
         "description": item.description,
@@ -330,7 +837,64 @@ async def get_menu(db: Session = Depends(get_db)):
         "nutritionInfo": json.loads(item.nutrition_info) if item.nutrition_info else {},
         "aiRecommended": item.ai_recommended,
         "image": item.image
-    } for item in items]
+    }
+
+# Menu endpoints
+@app.get("/api/menu")
+async def get_menu(request: Request, db: Session = Depends(get_db)):
+    """Get all menu items, precompressed for the client's Accept-Encoding"""
+    snapshot = menu_cache.current()
+    if snapshot is None:
+        # Loading and compressing the menu would stall every socket on this worker; do it off the loop
+        snapshot = await asyncio.to_thread(
+            menu_cache.get, lambda: [serialize_menu_item(item) for item in db.query(MenuItem).all()]
+        )
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    headers = {"ETag": snapshot.etag(encoding), "Vary": "Accept-Encoding", "X-Menu-Version": str(snapshot.version),
+               "X-Menu-Epoch": menu_cache.epoch}
+    if snapshot.matches(request.headers.get("if-none-match")):
+        return Response(status_code=304, headers=headers)
+    
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=snapshot.bodies[encoding], media_type="application/json", headers=headers)
+
+@app.get("/api/menu/search")
+async def search_menu(q: str = "", limit: int = Query(10, ge=1, le=50), db: Session = Depends(get_db)):
+    """Search menu items by name, description, category and tags"""
+    return ensure_menu_index(db).search(q, limit=limit)
+
+def recommended_menu_items(menu: dict, scored: list) -> list:
+    """Attach scores to available menu items from (item_id, score) pairs"""
+    results = []
+    for item_id, score in scored:
+        item = menu.get(item_id)
+        if item and item["available"]:
+            results.append({**item, "score": round(score, 4)})
+    return results
+
+@app.post("/api/menu/recommendations")
+async def get_cart_recommendations(request: CartRecommendationRequest, db: Session = Depends(get_db)):
+    """Get dishes frequently ordered with the items in a cart"""
+    menu = ensure_menu_index(db).items
+    # Over-fetch so unavailable items can be filtered out without a second pass
+    scored = ensure_recommender(db).for_cart(request.itemIds, limit=request.limit * 2)
+    return recommended_menu_items(menu, scored)[:request.limit]
+
+@app.get("/api/menu/{item_id}/recommendations")
+async def get_item_recommendations(item_id: str, limit: int = Query(5, ge=1, le=50), db: Session = Depends(get_db)):
+    """Get dishes frequently ordered with an item, plus what is popular right now"""
+    menu = ensure_menu_index(db).items
+    if item_id not in menu:
+        raise HTTPException(status_code=404, detail="Menu item not found")
+    
+    engine = ensure_recommender(db)
+    popular = engine.popular_at(datetime.utcnow().hour, limit=limit * 2)
+    return {
+        "itemId": item_id,
+        "frequentlyOrderedWith": recommended_menu_items(menu, engine.frequently_with(item_id, limit=limit * 2))[:limit],
+        "popularNow": recommended_menu_items(menu, [p for p in popular if p[0] != item_id])[:limit]
+    }
 
 @app.post("/api/menu")
 async def create_menu_item(item: MenuItemCreate, db: Session = Depends(get_db)):
@@ -351,9 +915,7 @@ async def create_menu_item(item: MenuItemCreate, db: Session = Depends(get_db)):
     
     db.add(db_item)
     db.commit()
-    
-    # Broadcast menu update
-    await manager.broadcast({"type": "menu_updated"})
+    await publish_menu_changes(db, [menu_upsert(db_item)])
     
     return {"id": item_id}
 
@@ -374,9 +936,7 @@ async def update_menu_item(item_id: str, item: MenuItemCreate, db: Session = Dep
     db_item.ai_recommended = item.aiRecommended
     
     db.commit()
-    
-    # Broadcast menu update
-    await manager.broadcast({"type": "menu_updated"})
+    await publish_menu_changes(db, [menu_upsert(db_item)])
     
     return {"message": "Menu item updated successfully"}
 
@@ -389,12 +949,67 @@ async def delete_menu_item(item_id: str, db: Session = Depends(get_db)):
     
     db.delete(db_item)
     db.commit()
-    
-    # Broadcast menu update
-    await manager.broadcast({"type": "menu_updated"})
+    await publish_menu_changes(db, [menu_delete(item_id)])
     
     return {"message": "Menu item deleted successfully"}
 
+def set_availability(db: Session, item_ids: List[str], available: bool) -> List[str]:
+    """Flip the available flag with one UPDATE; returns ids whose flag actually changed"""
+    changed = [item_id for (item_id,) in db.query(MenuItem.id).filter(
+        MenuItem.id.in_(item_ids), MenuItem.available != available
+    ).all()]
+    if changed:
+        db.query(MenuItem).filter(MenuItem.id.in_(changed)).update(
+            {MenuItem.available: available}, synchronize_session=False
+        )
+        db.commit()
+    return changed
+
+@app.patch("/api/menu/availability")
+async def bulk_update_availability(update: BulkAvailabilityUpdate, db: Session = Depends(get_db)):
+    """Mark several menu items available or sold out at once"""
+    item_ids = list(dict.fromkeys(update.itemIds))
+    found = {item_id for (item_id,) in db.query(MenuItem.id).filter(MenuItem.id.in_(item_ids)).all()}
+    changed = set_availability(db, item_ids, update.available)
+    if changed:
+        await publish_menu_changes(
+            db, [menu_patch(item_id, {"available": update.available}) for item_id in changed],
+            refresh_vocabulary=False
+        )
+    return {
+        "available": update.available,
+        "updated": changed,
+        "missing": [item_id for item_id in item_ids if item_id not in found]
+    }
+
+@app.patch("/api/menu/{item_id}/availability")
+async def update_availability(item_id: str, update: AvailabilityUpdate, db: Session = Depends(get_db)):
+    """Mark a single menu item available or sold out"""
+    if not db.query(MenuItem.id).filter(MenuItem.id == item_id).first():
+        raise HTTPException(status_code=404, detail="Menu item not found")
+    
+    if set_availability(db, [item_id], update.available):
+        await publish_menu_changes(db, [menu_patch(item_id, {"available": update.available})], refresh_vocabulary=False)
+    return {"id": item_id, "available": update.available}
+
+@app.get("/api/menu/stock")
+async def get_stock(db: Session = Depends(get_db)):
+    """Remaining stock for every tracked menu item"""
+    return stock_levels(db)
+
+@app.put("/api/menu/{item_id}/stock")
+async def update_stock(item_id: str, update: StockUpdate, db: Session = Depends(get_db)):
+    """Set an item's stock count; restocking puts a sold-out item back on sale"""
+    db_item = db.query(MenuItem).filter(MenuItem.id == item_id).first()
+    if not db_item:
+        raise HTTPException(status_code=404, detail="Menu item not found")
+    
+    was_available = db_item.available
+    set_stock(db, db_item, update.stock)
+    if db_item.available != was_available:
+        await publish_menu_changes(db, [menu_patch(item_id, {"available": db_item.available})], refresh_vocabulary=False)
+    return {"id": item_id, "stock": db_item.stock, "available": db_item.available}
+
 # Health check
 @app.get("/api/health")
 async def health_check():
@@ -402,4 +1017,4 @@ async def health_check():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    uvicorn.run(app, host="0.0.0.0", port=8000, ws_per_message_deflate=WS_PER_MESSAGE_DEFLATE)
@@ -0,0 +1,62 @@
+"""
+Order status history
+Every transition is appended to `order_events` in the same transaction as
+the status change, so timelines and time-in-state metrics can be
+computed after the fact
+"""
+from collections import defaultdict
+from datetime import datetime
+from sqlalchemy import DateTime, func
+from sqlalchemy.orm import Session
+from typing import Dict, List, Optional
+import numpy as np
+
+from database import OrderEvent
+from archive import TERMINAL_STATUSES
+
+def record_transition(db: Session, order_id: str, from_status: Optional[str], to_status: str, at: datetime):
+    """Stage a transition in the caller's transaction"""
+    db.add(OrderEvent(order_id=order_id, from_status=from_status, to_status=to_status, at=at))
+
+def order_timeline(db: Session, order_id: str, now: Optional[datetime] = None) -> List[dict]:
+    """Statuses an order went through, with how long it spent in each"""
+    events = db.query(OrderEvent.from_status, OrderEvent.to_status, OrderEvent.at).filter(
+        OrderEvent.order_id == order_id
+    ).order_by(OrderEvent.at, OrderEvent.id).all()
+    now = now or datetime.utcnow()
+    timeline = []
+    for i, (from_status, status, at) in enumerate(events):
+        if i + 1 < len(events):
+            until = events[i + 1].at
+        else:
+            until = None if status in TERMINAL_STATUSES else now
+        timeline.append({
+            "status": status,
+            "fromStatus": from_status,
+            "at": at.isoformat(),
+            "seconds": round((until - at).total_seconds(), 1) if until else None
+        })
+    return timeline
+
+def time_in_state(db: Session, since: datetime) -> Dict[str, dict]:
+    """Count, mean and percentiles of seconds spent in each status, for transitions since a time"""
+    # LEAD over (order_id, at) pairs each event with the order's next one, using the composite index
+    next_at = func.lead(OrderEvent.at, type_=DateTime).over(partition_by=OrderEvent.order_id, order_by=(OrderEvent.at, OrderEvent.id))
+    rows = db.query(OrderEvent.to_status, OrderEvent.at, next_at).filter(OrderEvent.at >= since).all()
+
+    durations = defaultdict(list)
+    for status, at, left_at in rows:
+        if left_at is not None:
+            durations[status].append((left_at - at).total_seconds())
+
+    metrics = {}
+    for status, seconds in durations.items():
+        values = np.array(seconds)
+        p50, p90 = np.percentile(values, [50, 90])
+        metrics[status] = {
+            "count": len(values),
+            "meanSeconds": round(float(values.mean()), 1),
+            "p50Seconds": round(float(p50), 1),
+            "p90Seconds": round(float(p90), 1),
+        }
+    return metrics
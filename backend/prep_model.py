@@ -0,0 +1,141 @@
+"""
+Learned preparation times
+Measures how long orders actually spent in 'preparing' (from order_events),
+fits how much kitchen load stretches that, and estimates a load-free prep
+time per menu item. Fitting is vectorized with NumPy and rerun on a
+background schedule; the static preparationTime is the fallback.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy.orm import Session
+from typing import Dict, Iterable, List, Optional, Tuple
+import json
+import os
+import numpy as np
+
+from database import Order, ArchivedOrder, OrderEvent
+from capacity import static_minutes
+
+# How often the background job refits, in minutes (0 disables it)
+PREP_REFIT_MINUTES = float(os.getenv('PREP_REFIT_MINUTES', '30'))
+
+# Days of order history used for fitting
+PREP_HISTORY_DAYS = float(os.getenv('PREP_HISTORY_DAYS', '90'))
+
+# Orders an item must appear in before its learned time replaces the static one
+MIN_SAMPLES = 5
+
+def extract_samples(events: Iterable[Tuple[str, str, datetime]], order_lines: Dict[str, List[dict]]) -> dict:
+    """One sample per order that finished preparing.
+    events are (order_id, to_status, at) sorted by order and time"""
+    placed, started, finished, static, sample_orders = [], [], [], [], []
+    current, first_at, prep_at = None, None, None
+    for order_id, status, at in events:
+        if order_id != current:
+            current, first_at, prep_at = order_id, at, None
+        if status == 'preparing':
+            prep_at = at
+        elif prep_at is not None:
+            lines = order_lines.get(order_id)
+            if lines and status != 'cancelled':
+                placed.append(first_at.timestamp())
+                started.append(prep_at.timestamp())
+                finished.append(at.timestamp())
+                static.append(max(static_minutes(line) for line in lines) * 60)
+                sample_orders.append(order_id)
+            prep_at = None
+
+    # (sample, item) pairs for the dish that held each order up, for grouped sums with np.bincount.
+    # Dishes cook in parallel, so an order's prep time says most about its slowest line
+    item_index: Dict[str, int] = {}
+    pair_samples, pair_items = [], []
+    for sample, order_id in enumerate(sample_orders):
+        bottleneck = {line['id'] for line in order_lines[order_id] if static_minutes(line) * 60 >= static[sample]}
+        for item_id in bottleneck:
+            pair_samples.append(sample)
+            pair_items.append(item_index.setdefault(item_id, len(item_index)))
+
+    return {
+        "placed": np.array(placed, dtype=np.float64),
+        "started": np.array(started, dtype=np.float64),
+        "finished": np.array(finished, dtype=np.float64),
+        "static": np.array(static, dtype=np.float64),
+        "item_ids": list(item_index),
+        "pair_samples": np.array(pair_samples, dtype=np.int64),
+        "pair_items": np.array(pair_items, dtype=np.int64),
+    }
+
+def kitchen_load_at(placed: np.ndarray, finished: np.ndarray, times: np.ndarray) -> np.ndarray:
+    """Orders placed but not yet done at each time"""
+    return (np.searchsorted(np.sort(placed), times, side='right')
+            - np.searchsorted(np.sort(finished), times, side='right'))
+
+class PrepTimeModel:
+    """duration ≈ base_minutes[item] * (1 + load_factor * open_orders)"""
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.ready = False
+        self.load_factor = 0.0
+        self.base_minutes: Dict[str, float] = {}
+        self.samples: Dict[str, int] = {}
+        self.fitted_at: Optional[datetime] = None
+
+    def fit(self, data: dict):
+        durations = data["finished"] - data["started"]
+        if len(durations) == 0:
+            self.clear()
+            self.ready = True
+            return
+        # Each order's own row still counts as open at its start; exclude it
+        load = kitchen_load_at(data["placed"], data["finished"], data["started"]) - 1
+
+        # How much load stretches prep, relative to the static estimate: ratio = a + b * load
+        ratio = durations / data["static"]
+        design = np.column_stack([np.ones_like(ratio), load])
+        (a, b), *_ = np.linalg.lstsq(design, ratio, rcond=None)
+        load_factor = max(0.0, b / a) if a > 0 else 0.0
+
+        # Per-item mean of the load-free duration over the orders it held up
+        unloaded = durations / (1 + load_factor * load)
+        counts = np.bincount(data["pair_items"], minlength=len(data["item_ids"]))
+        sums = np.bincount(data["pair_items"], weights=unloaded[data["pair_samples"]], minlength=len(data["item_ids"]))
+        means = sums / np.maximum(counts, 1) / 60
+
+        self.load_factor = float(load_factor)
+        self.base_minutes = {item_id: float(means[i]) for i, item_id in enumerate(data["item_ids"]) if counts[i] >= MIN_SAMPLES}
+        self.samples = {item_id: int(counts[i]) for i, item_id in enumerate(data["item_ids"])}
+        self.fitted_at = datetime.utcnow()
+        self.ready = True
+
+    def item_minutes(self, line: dict, load: int = 0) -> float:
+        """Predicted prep minutes for one line at a given kitchen load"""
+        base = self.base_minutes.get(line.get('id'), static_minutes(line))
+        return base * (1 + self.load_factor * load)
+
+    def order_minutes(self, lines: List[dict], load: int = 0) -> float:
+        """Predicted prep minutes for an order; its dishes cook in parallel"""
+        return max((self.item_minutes(line, load) for line in lines), default=0.0)
+
+    def summary(self) -> dict:
+        return {
+            "ready": self.ready,
+            "fittedAt": self.fitted_at.isoformat() if self.fitted_at else None,
+            "loadFactor": round(self.load_factor, 4),
+            "items": {
+                item_id: {"minutes": round(minutes, 1), "samples": self.samples.get(item_id, 0)}
+                for item_id, minutes in sorted(self.base_minutes.items())
+            }
+        }
+
+def load_samples(db: Session, since: datetime) -> dict:
+    """Samples from the order_events history since a time, with lines from hot and archived orders"""
+    events = db.query(OrderEvent.order_id, OrderEvent.to_status, OrderEvent.at).filter(
+        OrderEvent.at >= since
+    ).order_by(OrderEvent.order_id, OrderEvent.at, OrderEvent.id).all()
+    order_lines = {}
+    # Orders placed shortly before the window may still have been cooked inside it
+    for model in (Order, ArchivedOrder):
+        for order_id, items in db.query(model.id, model.items).filter(model.timestamp >= since - timedelta(days=1)).all():
+            order_lines[order_id] = json.loads(items)
+    return extract_samples(events, order_lines)
@@ -0,0 +1,171 @@
+"""
+Admission control for the order API
+Token-bucket rate limits per route and per table/client, plus a global
+concurrency cap on DB-heavy endpoints, as plain ASGI middleware
+"""
+from collections import OrderedDict
+from typing import List, Optional
+import json
+import math
+import os
+import re
+import time
+
+# Set to 0 to turn admission control off
+RATE_LIMIT_ENABLED = os.getenv('RATE_LIMIT_ENABLED', '1') != '0'
+
+# Most DB-heavy requests in flight at once per worker
+DB_CONCURRENCY_LIMIT = int(os.getenv('DB_CONCURRENCY_LIMIT', '32'))
+
+# Most buckets kept per worker; least recently used clients are forgotten first
+MAX_BUCKETS = 10000
+
+# (name, method or None for any, path pattern, tokens per second, burst); first match wins
+RATE_LIMITS = [
+    ('orders-create', 'POST', r'^/api/orders$', 0.5, 5),
+    ('orders-read', 'GET', r'^/api/orders', 2.0, 20),
+    ('orders-update', 'PATCH', r'^/api/orders/', 5.0, 30),
+    ('menu-read', 'GET', r'^/api/menu', 5.0, 50),
+    ('api', None, r'^/api/', 10.0, 100),
+]
+
+# (method or None for any, path pattern) for endpoints that hit the database
+DB_HEAVY_ROUTES = [
+    # SSE streams are long-lived but only touch the database on connect
+    (None, r'^/api/orders(?!/[^/]+/events$)'),
+    ('GET', r'^/api/menu$'),
+    ('POST', r'^/api/menu'),
+    ('PUT', r'^/api/menu/'),
+    ('PATCH', r'^/api/menu/'),
+    ('DELETE', r'^/api/menu/'),
+]
+
+class TokenBucket:
+    """Refills `rate` tokens per second up to `burst`"""
+    __slots__ = ('rate', 'burst', 'tokens', 'updated')
+
+    def __init__(self, rate: float, burst: float, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now: float) -> float:
+        """Spend one token; returns 0 on success or seconds until one is available"""
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+class AdmissionController:
+    """Shared limiter state; one instance per worker"""
+    def __init__(self, rate_limits: List[tuple] = RATE_LIMITS, db_heavy_routes: List[tuple] = DB_HEAVY_ROUTES,
+                 concurrency_limit: int = DB_CONCURRENCY_LIMIT, enabled: bool = RATE_LIMIT_ENABLED):
+        self.rules = [(name, method, re.compile(pattern), rate, burst) for name, method, pattern, rate, burst in rate_limits]
+        self.db_heavy = [(method, re.compile(pattern)) for method, pattern in db_heavy_routes]
+        self.concurrency_limit = concurrency_limit
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self.buckets: OrderedDict = OrderedDict()
+        self.in_flight = 0
+        self.rejected = 0
+
+    def match_rule(self, method: str, path: str) -> Optional[tuple]:
+        for rule in self.rules:
+            if (rule[1] is None or rule[1] == method) and rule[2].match(path):
+                return rule
+        return None
+
+    def is_db_heavy(self, method: str, path: str) -> bool:
+        return any((m is None or m == method) and pattern.match(path) for m, pattern in self.db_heavy)
+
+    def check_rate(self, method: str, path: str, client_key: str) -> float:
+        """0 if the request may proceed, otherwise seconds to wait"""
+        rule = self.match_rule(method, path)
+        if rule is None:
+            return 0.0
+        name, _, _, rate, burst = rule
+        now = time.monotonic()
+        key = (name, client_key)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(rate, burst, now)
+            if len(self.buckets) > MAX_BUCKETS:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+        return bucket.take(now)
+
+def client_key(scope: dict) -> str:
+    """Identify the caller: table number, then device id, then address.
+    Both can come from the query string, for EventSource which can't set headers"""
+    headers = dict(scope.get('headers') or [])
+    query = scope.get('query_string') or b''
+    table = headers.get(b'x-table-number')
+    if not table:
+        match = re.search(rb'(?:^|&)(?:table|tableNumber)=(\d+)', query)
+        table = match.group(1) if match else None
+    if table:
+        return 'table:' + table.decode('latin-1')
+    device = headers.get(b'x-client-id')
+    if not device:
+        match = re.search(rb'(?:^|&)clientId=([^&]+)', query)
+        device = match.group(1) if match else None
+    if device:
+        return 'client:' + device.decode('latin-1')[:64]
+    client = scope.get('client')
+    return 'addr:' + (client[0] if client else 'unknown')
+
+def is_long_poll(scope: dict) -> bool:
+    """GET ?wait= requests spend their time parked, not in the database"""
+    return scope['method'] == 'GET' and re.search(rb'(?:^|&)wait=', scope.get('query_string') or b'') is not None
+
+async def send_too_many_requests(send, retry_after: float, detail: str):
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        'type': 'http.response.start',
+        'status': 429,
+        'headers': [
+            (b'content-type', b'application/json'),
+            (b'content-length', str(len(body)).encode()),
+            (b'retry-after', str(max(1, math.ceil(retry_after))).encode()),
+        ],
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+class AdmissionControlMiddleware:
+    """Reject over-limit HTTP requests with 429 before they reach the app"""
+    def __init__(self, app, controller: AdmissionController):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        controller = self.controller
+        if scope['type'] != 'http' or not controller.enabled or scope['method'] == 'OPTIONS':
+            await self.app(scope, receive, send)
+            return
+
+        method, path = scope['method'], scope['path']
+        retry_after = controller.check_rate(method, path, client_key(scope))
+        if retry_after:
+            controller.rejected += 1
+            await send_too_many_requests(send, retry_after, "Too many requests")
+            return
+
+        if not controller.is_db_heavy(method, path) or is_long_poll(scope):
+            await self.app(scope, receive, send)
+            return
+
+        if controller.in_flight >= controller.concurrency_limit:
+            controller.rejected += 1
+            await send_too_many_requests(send, 1, "Server busy, please retry")
+            return
+        controller.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            controller.in_flight -= 1
@@ -0,0 +1,115 @@
+"""
+Order-history-driven dish recommendations
+Keeps an item co-occurrence matrix and hour-of-day popularity counts,
+updated incrementally as orders come in
+"""
+from collections import OrderedDict
+from datetime import datetime
+from typing import Dict, Iterable, List, Tuple
+import numpy as np
+
+# Cached cart recommendation results kept per engine
+CART_CACHE_SIZE = 1024
+
+class RecommendationEngine:
+    """Co-occurrence counts between menu items across orders"""
+    def __init__(self, capacity: int = 256):
+        self.capacity = capacity
+        self.clear()
+
+    def clear(self):
+        self.ready = False
+        self.version = 0
+        self.item_ids: List[str] = []
+        self.item_index: Dict[str, int] = {}
+        # co_counts[i, j] = orders containing both i and j; the diagonal is orders containing i
+        self.co_counts = np.zeros((self.capacity, self.capacity), dtype=np.int32)
+        # hourly[i, h] = units of i ordered during hour h
+        self.hourly = np.zeros((self.capacity, 24), dtype=np.int32)
+        self.cart_cache: OrderedDict = OrderedDict()
+
+    def _grow(self, size: int):
+        capacity = self.co_counts.shape[0]
+        while capacity < size:
+            capacity *= 2
+        co_counts = np.zeros((capacity, capacity), dtype=np.int32)
+        co_counts[:self.co_counts.shape[0], :self.co_counts.shape[1]] = self.co_counts
+        hourly = np.zeros((capacity, 24), dtype=np.int32)
+        hourly[:self.hourly.shape[0]] = self.hourly
+        self.co_counts, self.hourly = co_counts, hourly
+
+    def _index_of(self, item_id: str) -> int:
+        index = self.item_index.get(item_id)
+        if index is None:
+            index = len(self.item_ids)
+            if index >= self.co_counts.shape[0]:
+                self._grow(index + 1)
+            self.item_index[item_id] = index
+            self.item_ids.append(item_id)
+        return index
+
+    def rebuild(self, orders: Iterable[Tuple[List[dict], datetime]]):
+        """Count a full order history of (items, timestamp) pairs"""
+        self.clear()
+        for items, timestamp in orders:
+            self.add_order(items, timestamp)
+        self.ready = True
+
+    def add_order(self, items: List[dict], timestamp: datetime):
+        """Fold one order's line items into the counts"""
+        quantities: Dict[int, int] = {}
+        for line in items:
+            if line.get('id'):
+                index = self._index_of(line['id'])
+                quantities[index] = quantities.get(index, 0) + line.get('quantity', 1)
+        if not quantities:
+            return
+        indices = np.fromiter(quantities, dtype=np.intp)
+        self.co_counts[np.ix_(indices, indices)] += 1
+        self.hourly[indices, timestamp.hour] += np.fromiter(quantities.values(), dtype=np.int32)
+        self.version += 1
+        self.cart_cache.clear()
+
+    def _top(self, scores: np.ndarray, exclude: Iterable[int], limit: int) -> List[Tuple[str, float]]:
+        scores = scores.astype(np.float64)
+        for index in exclude:
+            scores[index] = 0
+        if limit <= 0 or not scores.any():
+            return []
+        top = np.argsort(-scores, kind='stable')[:limit]
+        return [(self.item_ids[i], float(scores[i])) for i in top if scores[i] > 0]
+
+    def frequently_with(self, item_id: str, limit: int = 5) -> List[Tuple[str, float]]:
+        """Items most often ordered alongside item_id, scored by P(other | item)"""
+        index = self.item_index.get(item_id)
+        if index is None:
+            return []
+        n = len(self.item_ids)
+        orders_with_item = self.co_counts[index, index]
+        return self._top(self.co_counts[index, :n] / max(orders_with_item, 1), [index], limit)
+
+    def for_cart(self, item_ids: Iterable[str], limit: int = 5) -> List[Tuple[str, float]]:
+        """Items most often ordered with anything already in the cart"""
+        indices = sorted({self.item_index[i] for i in item_ids if i in self.item_index})
+        signature = (tuple(indices), limit)
+        cached = self.cart_cache.get(signature)
+        if cached is not None:
+            self.cart_cache.move_to_end(signature)
+            return cached
+        if not indices:
+            return []
+
+        n = len(self.item_ids)
+        rows = self.co_counts[indices, :n]
+        diagonal = self.co_counts[indices, indices].reshape(-1, 1)
+        result = self._top((rows / np.maximum(diagonal, 1)).sum(axis=0), indices, limit)
+
+        self.cart_cache[signature] = result
+        if len(self.cart_cache) > CART_CACHE_SIZE:
+            self.cart_cache.popitem(last=False)
+        return result
+
+    def popular_at(self, hour: int, limit: int = 5) -> List[Tuple[str, float]]:
+        """Items ordered most during the given hour of the day"""
+        n = len(self.item_ids)
+        return self._top(self.hourly[:n, hour % 24], [], limit)
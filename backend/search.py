@@ -0,0 +1,187 @@
+"""
+In-memory full-text menu search
+Inverted index over item name, description, category and tags with
+prefix and single-typo matching, updated incrementally on menu CRUD
+"""
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Set
+import re
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+# How much a hit in each field counts towards an item's score
+FIELD_WEIGHTS = {'name': 3.0, 'tags': 2.0, 'category': 2.0, 'description': 1.0}
+
+# How much each kind of term match counts
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.7
+TYPO_MATCH = 0.5
+
+# Shortest query term we try prefix/typo matching on
+MIN_FUZZY_LENGTH = 3
+
+def tokenize(text: str) -> List[str]:
+    """Split text into lowercase alphanumeric tokens"""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+def within_one_edit(a: str, b: str) -> bool:
+    """True if a and b differ by at most one insert, delete, substitution or adjacent swap"""
+    if a == b:
+        return True
+    la, lb = len(a), len(b)
+    if abs(la - lb) > 1:
+        return False
+    if la > lb:
+        a, b, la, lb = b, a, lb, la
+    i = 0
+    while i < la and a[i] == b[i]:
+        i += 1
+    if la == lb:
+        if a[i + 1:] == b[i + 1:]:
+            return True
+        return i + 1 < la and a[i] == b[i + 1] and a[i + 1] == b[i] and a[i + 2:] == b[i + 2:]
+    return a[i:] == b[i + 1:]
+
+def single_deletes(term: str) -> Set[str]:
+    """All strings formed by removing one character from term"""
+    return {term[:i] + term[i + 1:] for i in range(len(term))}
+
+class TypoIndex:
+    """Vocabulary with symmetric-delete lookup for edit distance 1"""
+    def __init__(self):
+        self.terms: Set[str] = set()
+        self.sorted_terms: List[str] = []
+        self.deletes: Dict[str, Set[str]] = {}
+
+    def add(self, term: str):
+        if term in self.terms:
+            return
+        self.terms.add(term)
+        insort(self.sorted_terms, term)
+        for variant in single_deletes(term) | {term}:
+            self.deletes.setdefault(variant, set()).add(term)
+
+    def discard(self, term: str):
+        if term not in self.terms:
+            return
+        self.terms.discard(term)
+        del self.sorted_terms[bisect_left(self.sorted_terms, term)]
+        for variant in single_deletes(term) | {term}:
+            bucket = self.deletes.get(variant)
+            if bucket is not None:
+                bucket.discard(term)
+                if not bucket:
+                    del self.deletes[variant]
+
+    def with_prefix(self, prefix: str) -> List[str]:
+        """Terms starting with prefix, in sorted order"""
+        start = bisect_left(self.sorted_terms, prefix)
+        matches = []
+        for term in self.sorted_terms[start:]:
+            if not term.startswith(prefix):
+                break
+            matches.append(term)
+        return matches
+
+    def near(self, term: str) -> Set[str]:
+        """Terms within one edit of term"""
+        candidates = set()
+        for variant in single_deletes(term) | {term}:
+            candidates |= self.deletes.get(variant, set())
+        return {candidate for candidate in candidates if within_one_edit(term, candidate)}
+
+    def best_match(self, term: str) -> Optional[str]:
+        """Closest vocabulary term to term, or None if nothing is within one edit"""
+        if term in self.terms:
+            return term
+        matches = self.near(term)
+        return min(matches) if matches else None
+
+class MenuSearchIndex:
+    """Inverted index from token to weighted postings of menu item ids"""
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        self.ready = False
+        self.items: Dict[str, dict] = {}
+        self.item_tokens: Dict[str, Dict[str, float]] = {}
+        self.postings: Dict[str, Dict[str, float]] = {}
+        self.vocabulary = TypoIndex()
+
+    def rebuild(self, items: List[dict]):
+        """Index a full menu snapshot (serialized menu item dicts)"""
+        self.clear()
+        for item in items:
+            self.upsert(item)
+        self.ready = True
+
+    def upsert(self, item: dict):
+        """Add or replace a single menu item"""
+        self.remove(item['id'])
+        token_weights: Dict[str, float] = {}
+        fields = {
+            'name': item.get('name'),
+            'description': item.get('description'),
+            'category': item.get('category'),
+            'tags': ' '.join(item.get('tags') or []),
+        }
+        for field, text in fields.items():
+            for token in tokenize(text):
+                token_weights[token] = max(token_weights.get(token, 0.0), FIELD_WEIGHTS[field])
+
+        self.items[item['id']] = item
+        self.item_tokens[item['id']] = token_weights
+        for token, weight in token_weights.items():
+            self.postings.setdefault(token, {})[item['id']] = weight
+            self.vocabulary.add(token)
+
+    def remove(self, item_id: str):
+        """Drop a menu item from the index"""
+        token_weights = self.item_tokens.pop(item_id, None)
+        self.items.pop(item_id, None)
+        if not token_weights:
+            return
+        for token in token_weights:
+            posting = self.postings.get(token)
+            if posting is None:
+                continue
+            posting.pop(item_id, None)
+            if not posting:
+                del self.postings[token]
+                self.vocabulary.discard(token)
+
+    def expand(self, term: str) -> Dict[str, float]:
+        """Index tokens a query term matches, with the match strength of each"""
+        matches = {}
+        if len(term) >= MIN_FUZZY_LENGTH:
+            for token in self.vocabulary.near(term):
+                matches[token] = TYPO_MATCH
+            for token in self.vocabulary.with_prefix(term):
+                matches[token] = PREFIX_MATCH
+        if term in self.postings:
+            matches[term] = EXACT_MATCH
+        return matches
+
+    def search(self, query: str, limit: int = 20) -> List[dict]:
+        """Ranked menu items matching the query"""
+        terms = tokenize(query)
+        if not terms:
+            return []
+
+        scores: Dict[str, float] = {}
+        hits: Dict[str, int] = {}
+        for term in terms:
+            term_scores: Dict[str, float] = {}
+            for token, strength in self.expand(term).items():
+                for item_id, weight in self.postings[token].items():
+                    score = strength * weight
+                    if score > term_scores.get(item_id, 0.0):
+                        term_scores[item_id] = score
+            for item_id, score in term_scores.items():
+                scores[item_id] = scores.get(item_id, 0.0) + score
+                hits[item_id] = hits.get(item_id, 0) + 1
+
+        # Items matching more query terms always outrank partial matches
+        ranked = sorted(scores, key=lambda item_id: (-hits[item_id], -scores[item_id], self.items[item_id]['name']))
+        return [self.items[item_id] for item_id in ranked[:limit]]
@@ -0,0 +1,250 @@
+"""
+Concurrency stress test for order creation and status updates
+Starts the API on a scratch SQLite database (or targets --url), fires
+hundreds of concurrent POST /api/orders, some retried with the same
+Idempotency-Key, and races PATCH /api/orders/{id} from two kitchen screens
+and the occasional cancelling guest. Then checks that no order was lost or
+duplicated, that every order's status history is an unbroken chain, and
+that table bills match their orders. Prints p50/p95/p99 latency per
+endpoint and exits 1 if any check fails.
+Run: python stress_orders.py [--orders 500] [--concurrency 100] [--workers 2]
+(with --url, run the target with RATE_LIMIT_ENABLED=0)
+"""
+from collections import defaultdict
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from typing import Optional
+
+import httpx
+import numpy as np
+
+KITCHEN_FLOW = ['new', 'preparing', 'ready', 'completed']
+
+class Recorder:
+    """Latency and status codes per endpoint"""
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.codes = defaultdict(lambda: defaultdict(int))
+
+    async def call(self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs) -> Optional[httpx.Response]:
+        """The response, or None if the request timed out or the connection dropped"""
+        start = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.TransportError as e:
+            self.codes[label][type(e).__name__] += 1
+            return None
+        self.latencies[label].append((time.perf_counter() - start) * 1000)
+        self.codes[label][response.status_code] += 1
+        return response
+
+    def report(self):
+        print(f"{'endpoint':<32} {'requests':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}  status codes")
+        for label, values in self.latencies.items():
+            p50, p95, p99 = np.percentile(values, [50, 95, 99])
+            codes = ", ".join(f"{code}×{n}" for code, n in sorted(self.codes[label].items(), key=lambda c: str(c[0])))
+            print(f"{label:<32} {len(values):>8} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f}  {codes}")
+
+    def errors(self) -> int:
+        """5xx responses and requests that never got one"""
+        return sum(n for codes in self.codes.values() for code, n in codes.items() if not isinstance(code, int) or code >= 500)
+
+def prepare_database(database_url: str):
+    """Create and seed the schema once, so workers starting together don't race to seed it"""
+    os.environ['DATABASE_URL'] = database_url
+    from database import init_db, SessionLocal
+    from main import seed_menu_data
+    init_db()
+    db = SessionLocal()
+    try:
+        seed_menu_data(db)
+    finally:
+        db.close()
+
+def start_server(port: int, workers: int, database_url: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        'DATABASE_URL': database_url,
+        'RATE_LIMIT_ENABLED': '0',
+        'ARCHIVE_INTERVAL_MINUTES': '0',
+        'PREP_REFIT_MINUTES': '0',
+        'WS_HEARTBEAT_INTERVAL': '0',
+        'KITCHEN_THROTTLE_MODE': 'off',
+    }
+    return subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'main:app', '--port', str(port), '--workers', str(workers), '--log-level', 'warning'],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env
+    )
+
+async def wait_until_up(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get('/api/health')).status_code == 200:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not come up")
+
+async def place_orders(client, recorder, menu, count, gate, rng):
+    """Concurrent orders; one in ten is sent twice at once with the same Idempotency-Key"""
+    placed = {}   # our key -> order id
+    duplicates = []
+
+    async def place(n):
+        lines = [{"id": item["id"], "name": item["name"], "price": item["price"], "quantity": rng.randint(1, 2),
+                  "category": item["category"]} for item in rng.sample(menu, rng.randint(1, 4))]
+        subtotal = sum(line["price"] * line["quantity"] for line in lines)
+        body = {"items": lines, "tableNumber": rng.randint(1, 40), "customerName": f"Guest {n}",
+                "paymentMethod": "upi", "subtotal": subtotal, "gst": round(subtotal * 0.05, 2),
+                "total": round(subtotal * 1.05, 2), "customerInstructions": "less spicy" if n % 3 == 0 else None}
+        key = str(uuid.uuid4())
+        retried = n % 10 == 0
+        async def send():
+            async with gate:
+                return await recorder.call(client, 'POST /api/orders', 'POST', '/api/orders', json=body,
+                                           headers={'Idempotency-Key': key})
+        responses = await asyncio.gather(*[send() for _ in range(2 if retried else 1)])
+        ids = {r.json()["id"] for r in responses if r is not None and r.status_code == 200}
+        if ids:
+            placed[key] = ids.pop()
+            if ids:
+                duplicates.append(key)
+
+    await asyncio.gather(*[place(n) for n in range(count)])
+    return placed, duplicates
+
+async def race_status_updates(client, recorder, order_ids, gate, rng):
+    """Two kitchen screens bump each order through the flow at once; some guests cancel midway"""
+    async def screen(order_id, use_etag):
+        for status in KITCHEN_FLOW[1:]:
+            async with gate:
+                headers = {}
+                if use_etag:
+                    current = await recorder.call(client, 'GET /api/orders/{id}', 'GET', f'/api/orders/{order_id}')
+                    headers['If-Match'] = current.headers.get('etag', '') if current is not None else ''
+                await recorder.call(client, 'PATCH /api/orders/{id}', 'PATCH', f'/api/orders/{order_id}',
+                                    json={"status": status}, headers=headers)
+
+    async def guest(order_id):
+        await asyncio.sleep(rng.uniform(0, 0.05))
+        async with gate:
+            await recorder.call(client, 'PATCH /api/orders/{id}', 'PATCH', f'/api/orders/{order_id}',
+                                json={"status": "cancelled"})
+
+    tasks = []
+    for order_id in order_ids:
+        tasks += [screen(order_id, False), screen(order_id, True)]
+        if rng.random() < 0.15:
+            tasks.append(guest(order_id))
+    await asyncio.gather(*tasks)
+
+async def check_invariants(client, recorder, placed, duplicates, gate) -> list:
+    failures = []
+    if duplicates:
+        failures.append(f"{len(duplicates)} Idempotency-Key retries created a second order")
+
+    orders = (await client.get('/api/orders')).json()
+    ids = [order["id"] for order in orders]
+    if len(ids) != len(set(ids)):
+        failures.append(f"{len(ids) - len(set(ids))} duplicate order ids")
+    lost = set(placed.values()) - set(ids)
+    if lost:
+        failures.append(f"{len(lost)} acknowledged orders missing, e.g. {sorted(lost)[:3]}")
+    if len(set(ids)) != len(set(placed.values())):
+        failures.append(f"{len(set(ids))} orders stored for {len(set(placed.values()))} placed")
+
+    async def timeline(order_id):
+        async with gate:
+            response = await recorder.call(client, 'GET /api/orders/{id}/timeline', 'GET', f'/api/orders/{order_id}/timeline')
+        return response.json().get("timeline", []) if response is not None else []
+
+    broken = []
+    timelines = await asyncio.gather(*[timeline(order["id"]) for order in orders])
+    for order, steps in zip(orders, timelines):
+        chain = [step["fromStatus"] for step in steps] == [None] + [step["status"] for step in steps[:-1]]
+        no_repeats = all(step["fromStatus"] != step["status"] for step in steps)
+        if not steps or not chain or not no_repeats or steps[-1]["status"] != order["status"]:
+            broken.append(order["id"])
+    if broken:
+        failures.append(f"{len(broken)} orders with an inconsistent status history, e.g. {broken[:3]}")
+
+    # Each open table's bill is the sum of its session's orders that weren't cancelled
+    sessions = defaultdict(list)
+    for order in orders:
+        sessions[(order["tableNumber"], order["sessionId"])].append(order)
+    for (table, session_id), session_orders in sessions.items():
+        bill = (await client.get(f'/api/tables/{table}/bill')).json()
+        if bill.get("sessionId") != session_id:
+            continue
+        expected = round(sum(o["total"] for o in session_orders if o["status"] != 'cancelled'), 2)
+        if abs(bill["total"] - expected) > 0.01:
+            failures.append(f"table {table} bill is {bill['total']}, its orders add up to {expected}")
+
+    if recorder.errors():
+        failures.append(f"{recorder.errors()} requests failed with a 5xx or no response")
+    return failures
+
+async def run(args, base_url: str) -> int:
+    rng = random.Random(args.seed)
+    recorder = Recorder()
+    gate = asyncio.Semaphore(args.concurrency)
+    limits = httpx.Limits(max_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        menu = [item for item in (await client.get('/api/menu')).json() if item.get("available")]
+
+        started = time.perf_counter()
+        placed, duplicates = await place_orders(client, recorder, menu, args.orders, gate, rng)
+        created = time.perf_counter()
+        await race_status_updates(client, recorder, list(placed.values()), gate, rng)
+        updated = time.perf_counter()
+
+        print(f"🔥 {len(placed)} orders in {created - started:.1f}s, status races in {updated - created:.1f}s "
+              f"({args.concurrency} concurrent, {args.workers or 'external'} workers)")
+        print("=" * 80)
+        failures = await check_invariants(client, recorder, placed, duplicates, gate)
+        recorder.report()
+    print("=" * 80)
+    for failure in failures:
+        print(f"❌ {failure}")
+    if not failures:
+        print("✅ No lost or duplicate orders, status histories and bills consistent")
+    return 1 if failures else 0
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--orders', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=100)
+    parser.add_argument('--workers', type=int, default=2, help="uvicorn workers for the local server")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--url', help="target an already running server instead of starting one")
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args()
+
+    if args.url:
+        args.workers = None
+        return asyncio.run(run(args, args.url))
+
+    with tempfile.TemporaryDirectory() as scratch:
+        database_url = "sqlite:///" + os.path.join(scratch, "stress.db")
+        prepare_database(database_url)
+        server = start_server(args.port, args.workers, database_url)
+        base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            asyncio.run(wait_until_up(base_url))
+            return asyncio.run(run(args, base_url))
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+"""
+Server action suggestions from real order state
+Extracts features from an order once (cached per order revision) and
+evaluates them against a rule table compiled at import time
+"""
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+from typing import List, Optional
+import json
+import operator
+
+# Per-order facts that only change when the order row changes
+OrderFeatures = namedtuple('OrderFeatures', [
+    'order_id', 'table_number', 'status', 'item_count', 'distinct_items', 'value',
+    'placed_at', 'has_main_course', 'has_dessert', 'has_beverage'
+])
+
+Suggestion = namedtuple('Suggestion', ['order_id', 'table_number', 'status', 'suggestion', 'priority', 'wait_minutes'])
+
+FEATURE_CACHE_SIZE = 2048
+_feature_cache: OrderedDict = OrderedDict()
+
+def extract_features(order) -> OrderFeatures:
+    """Decode an Order row into suggestion features, cached until the row changes"""
+    key = (order.id, order.status, order.updated_at)
+    cached = _feature_cache.get(key)
+    if cached is not None:
+        _feature_cache.move_to_end(key)
+        return cached
+
+    items = json.loads(order.items) if isinstance(order.items, str) else order.items
+    categories = {(item.get('category') or '').lower() for item in items}
+    features = OrderFeatures(
+        order_id=order.id,
+        table_number=order.table_number,
+        status=order.status,
+        item_count=sum(item.get('quantity', 1) for item in items),
+        distinct_items=len(items),
+        value=order.total,
+        placed_at=order.timestamp,
+        has_main_course=any('main course' in c or 'biryani' in c for c in categories),
+        has_dessert=any('dessert' in c for c in categories),
+        has_beverage=any('beverage' in c for c in categories),
+    )
+
+    _feature_cache[key] = features
+    if len(_feature_cache) > FEATURE_CACHE_SIZE:
+        _feature_cache.popitem(last=False)
+    return features
+
+def clear_feature_cache():
+    _feature_cache.clear()
+
+def time_period(hour: int) -> str:
+    """Service period for a local hour of the day"""
+    if 11 <= hour < 16:
+        return 'lunch'
+    if 16 <= hour < 22:
+        return 'dinner'
+    return 'late'
+
+OPERATORS = {
+    '==': operator.eq,
+    '!=': operator.ne,
+    '>': operator.gt,
+    '>=': operator.ge,
+    '<': operator.lt,
+    'in': lambda value, options: value in options,
+}
+
+# (priority, [(feature, op, value), ...], suggestion template); all conditions must hold
+SUGGESTION_RULES = [
+    (100, [('status', '==', 'ready')], "Food is ready - run it to table {table} now"),
+    (90, [('status', 'in', ('new', 'preparing')), ('wait_minutes', '>', 25)],
+        "Table {table} has waited {wait} min - apologize and offer a complimentary appetizer"),
+    (80, [('status', '==', 'new'), ('wait_minutes', '>', 10)],
+        "Order for table {table} not started after {wait} min - check with the kitchen"),
+    (70, [('status', 'in', ('new', 'preparing')), ('wait_minutes', '>', 15)],
+        "Check if table {table} needs anything while they wait"),
+    (60, [('has_main_course', '==', True), ('has_beverage', '==', False)],
+        "Recommend a beverage pairing for table {table}'s main course"),
+    (55, [('status', '==', 'completed'), ('has_dessert', '==', False)],
+        "Suggest today's dessert special to table {table}"),
+    (50, [('item_count', '>=', 6)], "Large order at table {table} - offer sharing platters and separate billing"),
+    (45, [('value', '>=', 2000)], "Premium order at table {table} - offer the chef's special"),
+    (40, [('value', '<', 300)], "Mention combo deals and daily specials to table {table}"),
+    (20, [('period', '==', 'lunch')], "Offer quick lunch combos to table {table}"),
+    (20, [('period', '==', 'dinner')], "Recommend dessert specials to table {table}"),
+    (20, [('period', '==', 'late')], "Offer herbal teas or light snacks to table {table}"),
+    (0, [], "Check on meal satisfaction at table {table}"),
+]
+
+def compile_rules(rules) -> list:
+    """Resolve operators once and sort rules so the first match wins"""
+    compiled = [
+        (priority, tuple((feature, OPERATORS[op], value) for feature, op, value in conditions), template)
+        for priority, conditions, template in rules
+    ]
+    return sorted(compiled, key=lambda rule: -rule[0])
+
+COMPILED_RULES = compile_rules(SUGGESTION_RULES)
+
+def suggest_for_order(order, now: Optional[datetime] = None, local_hour: Optional[int] = None) -> Suggestion:
+    """Highest-priority suggestion for one order"""
+    now = now or datetime.utcnow()
+    features = extract_features(order)
+    wait_minutes = int((now - features.placed_at).total_seconds() // 60) if features.placed_at else 0
+    facts = features._asdict()
+    facts['wait_minutes'] = wait_minutes
+    facts['period'] = time_period(datetime.now().hour if local_hour is None else local_hour)
+
+    for priority, conditions, template in COMPILED_RULES:
+        if all(check(facts[feature], value) for feature, check, value in conditions):
+            return Suggestion(
+                order_id=features.order_id,
+                table_number=features.table_number,
+                status=features.status,
+                suggestion=template.format(table=features.table_number, wait=wait_minutes),
+                priority=priority,
+                wait_minutes=wait_minutes,
+            )
+
+def suggest_for_orders(orders, now: Optional[datetime] = None, local_hour: Optional[int] = None) -> List[Suggestion]:
+    """Suggestions for many orders, most urgent first"""
+    now = now or datetime.utcnow()
+    local_hour = datetime.now().hour if local_hour is None else local_hour
+    results = [suggest_for_order(order, now=now, local_hour=local_hour) for order in orders]
+    return sorted(results, key=lambda s: (-s.priority, -s.wait_minutes))
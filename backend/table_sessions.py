@@ -0,0 +1,73 @@
+"""
+Table sessions and running bills
+A table's orders from seating to settling are grouped under one open
+session row that carries the bill's subtotal, GST and total. Placing an
+order adds its amounts and cancelling one takes them back, with a relative
+UPDATE in the order's own transaction, so reading a bill is a single
+indexed row lookup.
+"""
+from datetime import datetime
+from sqlalchemy import func
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from database import Order, TableSession
+
+def open_session(db: Session, table_number: int) -> TableSession:
+    """The table's open session, started if there isn't one, in the caller's transaction"""
+    session = current_session(db, table_number)
+    if session:
+        return session
+    # The partial unique index allows one open session per table; a concurrent order that opened it first wins
+    db.execute(
+        insert(TableSession).values(table_number=table_number, status='open', opened_at=datetime.utcnow())
+        .on_conflict_do_nothing(index_elements=['table_number'], index_where=TableSession.status == 'open')
+    )
+    return current_session(db, table_number)
+
+def current_session(db: Session, table_number: int) -> Optional[TableSession]:
+    return db.query(TableSession).filter(
+        TableSession.table_number == table_number, TableSession.status == 'open'
+    ).first()
+
+def add_to_bill(db: Session, session_id: int, order: Order, sign: int = 1):
+    """Add (sign=1) or take back (sign=-1) an order's amounts, in the caller's transaction"""
+    # Relative to the stored values, so concurrent orders on any worker never overwrite each other
+    db.query(TableSession).filter(TableSession.id == session_id).update({
+        TableSession.subtotal: func.round(TableSession.subtotal + sign * order.subtotal, 2),
+        TableSession.gst: func.round(TableSession.gst + sign * order.gst, 2),
+        TableSession.total: func.round(TableSession.total + sign * order.total, 2),
+        TableSession.order_count: TableSession.order_count + sign,
+    }, synchronize_session=False)
+
+def settle_tables(db: Session, table_numbers: List[int], payment_method: Optional[str] = None) -> List[TableSession]:
+    """Close the open sessions of several tables in one UPDATE; returns the settled sessions"""
+    sessions = db.query(TableSession).filter(
+        TableSession.table_number.in_(table_numbers), TableSession.status == 'open'
+    ).all()
+    if not sessions:
+        return []
+    db.query(TableSession).filter(TableSession.id.in_([s.id for s in sessions])).update({
+        TableSession.status: 'settled',
+        TableSession.settled_at: datetime.utcnow(),
+        TableSession.payment_method: payment_method,
+    }, synchronize_session=False)
+    db.commit()
+    for session in sessions:
+        db.refresh(session)
+    return sessions
+
+def serialize_bill(session: TableSession) -> dict:
+    return {
+        "sessionId": session.id,
+        "tableNumber": session.table_number,
+        "status": session.status,
+        "orderCount": session.order_count,
+        "subtotal": session.subtotal,
+        "gst": session.gst,
+        "total": session.total,
+        "paymentMethod": session.payment_method,
+        "openedAt": session.opened_at.isoformat(),
+        "settledAt": session.settled_at.isoformat() if session.settled_at else None
+    }
@@ -1,33 +1,24 @@
 import pytest
-from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+import asyncio
 import json
+from datetime import datetime, timedelta
 
-from main import app
-from database import Base, get_db
-
-# Test database setup
-TEST_DATABASE_URL = "sqlite:///./test.db"
-engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-
-def override_get_db():
-    try:
-        db = TestingSessionLocal()
-        yield db
-    finally:
-        db.close()
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, inspect, text
 
-app.dependency_overrides[get_db] = override_get_db
+from main import app, EventStreamAwareGZipMiddleware, manager, new_order_id, order_events, active_orders, prep_model, idempotency_store, admission, menu_cache
+from menu_cache import negotiate_encoding
+from database import Base, Order, OrderEvent, add_missing_indexes
+from suggestions import suggest_for_order, suggest_for_orders
+import capacity
+from events import OrderEventHub
+from heartbeat import HeartbeatMonitor
+import ws_encoding
+from traffic_trace import TraceRecorderMiddleware
+from ratelimit import client_key
+from loadsim import route_label
 
-@pytest.fixture(scope="function")
-def client():
-    # Create tables
-    Base.metadata.create_all(bind=engine)
-    yield TestClient(app)
-    # Drop tables after test
-    Base.metadata.drop_all(bind=engine)
+# Fixtures (client, db) and the in-memory test database live in conftest.py
 
 # Menu Endpoint Tests
 
@@ -140,6 +131,151 @@ def test_menu_item_validation(client):
     response = client.post("/api/menu", json=invalid_item)
     assert response.status_code == 422  # Validation error
 
+def test_menu_precompressed_encodings(client):
+    """Test GET /api/menu serves cached encodings per Accept-Encoding with an ETag"""
+    menu_item = {
+        "name": "Test Dish",
+        "description": "A test dish " * 20,
+        "price": 250,
+        "category": "Main Course",
+        "tags": ["Test"]
+    }
+    client.post("/api/menu", json=menu_item)
+    
+    plain = client.get("/api/menu", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    gzipped = client.get("/api/menu", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert gzipped.json() == plain.json()
+    assert gzipped.headers["vary"] == "Accept-Encoding"
+    
+    etag = plain.headers["etag"]
+    assert client.get("/api/menu", headers={"If-None-Match": etag}).status_code == 304
+    # Each encoding has its own strong ETag; revalidation matches any of them, weak or strong
+    assert gzipped.headers["etag"] != etag
+    for tag in (gzipped.headers["etag"], f"W/{etag}", f'"stale", W/{gzipped.headers["etag"]}'):
+        revalidated = client.get("/api/menu", headers={"If-None-Match": tag, "Accept-Encoding": "gzip"})
+        assert revalidated.status_code == 304
+        assert revalidated.headers["etag"] == gzipped.headers["etag"]
+    
+    # Menu edits publish a new version and ETag
+    version = int(plain.headers["x-menu-version"])
+    client.post("/api/menu", json={**menu_item, "name": "Other Dish"})
+    changed = client.get("/api/menu", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert int(changed.headers["x-menu-version"]) > version
+    assert len(changed.json()) == 2
+
+def test_menu_changes_broadcast_deltas(client, monkeypatch):
+    """Test menu edits broadcast the changed item with consecutive menu versions"""
+    events = []
+    async def capture(message):
+        events.append(message)
+    monkeypatch.setattr(manager, "broadcast", capture)
+    
+    version = int(client.get("/api/menu").headers["x-menu-version"])
+    menu_item = {"name": "Test Dish", "description": "A test dish", "price": 250, "category": "Main Course"}
+    item_id = client.post("/api/menu", json=menu_item).json()["id"]
+    client.put(f"/api/menu/{item_id}", json={**menu_item, "price": 300})
+    client.delete(f"/api/menu/{item_id}")
+    
+    assert [e["type"] for e in events] == ["menu_updated"] * 3
+    assert [(e["baseVersion"], e["version"]) for e in events] == [(version + i, version + i + 1) for i in range(3)]
+    assert events[0]["changes"][0]["op"] == "upsert"
+    assert events[0]["changes"][0]["item"]["id"] == item_id
+    assert events[1]["changes"][0]["item"]["price"] == 300
+    assert events[2]["changes"] == [{"op": "delete", "id": item_id}]
+    assert client.get("/api/menu").headers["x-menu-version"] == str(events[-1]["version"])
+    # Versions are only comparable within one server process, named by the epoch
+    assert {e["epoch"] for e in events} == {client.get("/api/menu").headers["x-menu-epoch"]}
+
+def test_menu_availability_toggle(client, monkeypatch):
+    """Test PATCH availability endpoints flip only the flag and broadcast a small patch"""
+    events = []
+    async def capture(message):
+        events.append(message)
+    monkeypatch.setattr(manager, "broadcast", capture)
+    
+    menu_item = {"name": "Test Dish", "description": "A test dish", "price": 250, "category": "Main Course", "tags": ["Spicy"]}
+    first = client.post("/api/menu", json=menu_item).json()["id"]
+    second = client.post("/api/menu", json={**menu_item, "name": "Other Dish"}).json()["id"]
+    events.clear()
+    
+    response = client.patch(f"/api/menu/{first}/availability", json={"available": False})
+    assert response.status_code == 200
+    assert events[0]["changes"] == [{"op": "patch", "id": first, "fields": {"available": False}}]
+    item = next(i for i in client.get("/api/menu").json() if i["id"] == first)
+    assert item["available"] is False
+    assert item["tags"] == ["Spicy"]
+    
+    # Repeating a no-op toggle doesn't bump the version
+    client.patch(f"/api/menu/{first}/availability", json={"available": False})
+    assert len(events) == 1
+    
+    response = client.patch("/api/menu/availability", json={"itemIds": [first, second, "item-missing"], "available": False})
+    assert response.json()["updated"] == [second]
+    assert response.json()["missing"] == ["item-missing"]
+    assert len(events) == 2 and events[1]["baseVersion"] == events[0]["version"]
+    
+    assert client.patch("/api/menu/item-missing/availability", json={"available": True}).status_code == 404
+
+def test_negotiate_encoding():
+    """Test Accept-Encoding negotiation honours q-values"""
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0, deflate") == "identity"
+    assert negotiate_encoding(None) == "identity"
+    assert negotiate_encoding("br;q=0.5, gzip") == "gzip"
+
+def test_search_menu(client):
+    """Test GET /api/menu/search ranks matches and tolerates typos and prefixes"""
+    base_item = {
+        "description": "A test dish",
+        "price": 250,
+        "category": "Main Course",
+        "available": True,
+        "preparationTime": 20,
+        "tags": [],
+        "aiRecommended": False
+    }
+    client.post("/api/menu", json={**base_item, "name": "Butter Chicken"})
+    client.post("/api/menu", json={**base_item, "name": "Paneer Tikka", "tags": ["Vegetarian"]})
+    client.post("/api/menu", json={**base_item, "name": "Chicken Biryani", "description": "Rice with butter"})
+    
+    results = client.get("/api/menu/search", params={"q": "butter chicken"}).json()
+    assert [item["name"] for item in results][:2] == ["Butter Chicken", "Chicken Biryani"]
+    
+    # Prefix match
+    assert [item["name"] for item in client.get("/api/menu/search?q=pan").json()] == ["Paneer Tikka"]
+    # Single typo
+    assert [item["name"] for item in client.get("/api/menu/search?q=biryni").json()] == ["Chicken Biryani"]
+    assert client.get("/api/menu/search?q=vegetarain").json()[0]["name"] == "Paneer Tikka"
+    assert client.get("/api/menu/search?q=").json() == []
+    assert len(client.get("/api/menu/search?q=chicken&limit=1").json()) == 1
+    for limit in (-1, 0, 51):
+        assert client.get(f"/api/menu/search?q=chicken&limit={limit}").status_code == 422
+
+def test_search_menu_tracks_updates(client):
+    """Test the search index follows menu updates and deletions"""
+    menu_item = {
+        "name": "Test Dish",
+        "description": "A test dish",
+        "price": 250,
+        "category": "Main Course",
+        "available": True,
+        "preparationTime": 20,
+        "tags": ["Test"],
+        "aiRecommended": False
+    }
+    item_id = client.post("/api/menu", json=menu_item).json()["id"]
+    assert len(client.get("/api/menu/search?q=test").json()) == 1
+    
+    client.put(f"/api/menu/{item_id}", json={**menu_item, "name": "Mango Lassi", "description": "Sweet drink", "tags": []})
+    assert client.get("/api/menu/search?q=test").json() == []
+    assert client.get("/api/menu/search?q=lassi").json()[0]["id"] == item_id
+    
+    client.delete(f"/api/menu/{item_id}")
+    assert client.get("/api/menu/search?q=lassi").json() == []
+
 # Order Endpoint Tests
 
 def test_create_order_valid(client):
@@ -167,6 +303,58 @@ def test_create_order_valid(client):
     assert response.status_code == 200
     assert "id" in response.json()
 
+def test_create_order_precomputes_kitchen_instructions(client):
+    """Test customizations are parsed once at order time and stored per line"""
+    order_data = {
+        "items": [
+            {"id": "item1", "name": "Butter Chicken", "price": 320, "quantity": 1, "customization": "Extra spicy"},
+            {"id": "item2", "name": "Dal Makhani", "price": 240, "quantity": 1, "customization": "extra spicy "},
+            {"id": "item3", "name": "Garlic Naan", "price": 80, "quantity": 2}
+        ],
+        "tableNumber": 5,
+        "customerName": "John Doe",
+        "paymentMethod": "cash",
+        "total": 756,
+        "subtotal": 720,
+        "gst": 36
+    }
+    order_id = client.post("/api/orders", json=order_data).json()["id"]
+    
+    items = client.get(f"/api/orders/{order_id}").json()["items"]
+    assert items[0]["kitchenInstruction"].startswith("KITCHEN: SPICE: EXTRA HIGH")
+    assert items[1]["kitchenInstruction"] == items[0]["kitchenInstruction"]
+    assert items[2]["kitchenInstruction"] is None
+
+def test_create_order_idempotency_key(client):
+    """Test retries with the same Idempotency-Key return the original order"""
+    order_data = {
+        "items": [{"id": "item1", "name": "Test Dish", "price": 250, "quantity": 1}],
+        "tableNumber": 5,
+        "customerName": "John Doe",
+        "paymentMethod": "cash",
+        "total": 262.5,
+        "subtotal": 250,
+        "gst": 12.5
+    }
+    headers = {"Idempotency-Key": "checkout-abc"}
+    first = client.post("/api/orders", json=order_data, headers=headers)
+    retry = client.post("/api/orders", json=order_data, headers=headers)
+    assert retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["Idempotent-Replayed"] == "true"
+    assert len(client.get("/api/orders").json()) == 1
+    
+    # Another worker only has the database copy
+    idempotency_store.cache.clear()
+    admission.reset()
+    menu_cache.invalidate()
+    assert client.post("/api/orders", json=order_data, headers=headers).json() == first.json()
+    assert len(client.get("/api/orders").json()) == 1
+    
+    # Reusing a key for a different order is rejected
+    conflict = client.post("/api/orders", json={**order_data, "tableNumber": 6}, headers=headers)
+    assert conflict.status_code == 422
+
 def test_create_order_invalid(client):
     """Test POST /api/orders rejects invalid data"""
     invalid_order = {
@@ -209,6 +397,54 @@ def test_get_orders(client):
     # Verify sorted by timestamp (newest first)
     assert orders[0]["customerName"] == "Customer 2"
 
+def test_active_orders_served_from_memory(client):
+    """Test GET /api/orders?active=true lists open orders from the in-memory store"""
+    order_data = {
+        "items": [{"id": "item1", "name": "Test Dish", "price": 250, "quantity": 1}],
+        "tableNumber": 5, "customerName": "John Doe", "paymentMethod": "cash",
+        "total": 262.5, "subtotal": 250, "gst": 12.5
+    }
+    first = client.post("/api/orders", json=order_data).json()["id"]
+    # Loaded lazily from the database on first read, then kept in step by the handlers
+    assert [o["id"] for o in client.get("/api/orders?active=true").json()] == [first]
+    assert active_orders.ready
+    
+    second = client.post("/api/orders", json={**order_data, "tableNumber": 6}).json()["id"]
+    client.patch(f"/api/orders/{second}", json={"status": "preparing"})
+    client.patch(f"/api/orders/{first}", json={"status": "completed"})
+    
+    active = client.get("/api/orders?active=true").json()
+    assert [(o["id"], o["status"]) for o in active] == [(second, "preparing")]
+    assert client.get("/api/orders?active=true&status=new").json() == []
+    assert active_orders.list(table=6)[0]["id"] == second
+    assert len(client.get("/api/orders").json()) == 2
+    
+    # Reopening a finished order puts it back
+    client.patch(f"/api/orders/{first}", json={"status": "new"})
+    assert {o["id"] for o in client.get("/api/orders?active=true").json()} == {first, second}
+
+def test_order_status_history(client):
+    """Test status changes are recorded as events with a timeline and time-in-state metrics"""
+    order_data = {
+        "items": [{"id": "item1", "name": "Test Dish", "price": 250, "quantity": 1}],
+        "tableNumber": 5, "customerName": "John Doe", "paymentMethod": "cash",
+        "total": 262.5, "subtotal": 250, "gst": 12.5
+    }
+    order_id = client.post("/api/orders", json=order_data).json()["id"]
+    client.patch(f"/api/orders/{order_id}", json={"status": "preparing"})
+    client.patch(f"/api/orders/{order_id}", json={"status": "preparing"})
+    client.patch(f"/api/orders/{order_id}", json={"status": "completed"})
+    
+    timeline = client.get(f"/api/orders/{order_id}/timeline").json()["timeline"]
+    assert [step["status"] for step in timeline] == ["new", "preparing", "completed"]
+    assert timeline[0]["seconds"] >= 0
+    assert timeline[-1]["seconds"] is None
+    assert client.get("/api/orders/order-missing/timeline").status_code == 404
+    
+    metrics = client.get("/api/kitchen/time-in-state?hours=1").json()
+    assert set(metrics) == {"new", "preparing"}
+    assert metrics["preparing"]["count"] == 1
+
 def test_get_order_by_id(client):
     """Test GET /api/orders/{id} returns specific order"""
     order_data = {
@@ -234,6 +470,99 @@ def test_get_order_not_found(client):
     response = client.get("/api/orders/nonexistent-id")
     assert response.status_code == 404
 
+def parse_sse(body: str):
+    """(id, event, data) for each event in an SSE body, skipping comments"""
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n") if not line.startswith(":") and ": " in line)
+        if "event" in fields:
+            events.append((fields.get("id"), fields["event"], json.loads(fields["data"])))
+    return events
+
+def test_order_event_stream(client):
+    """Test the per-order SSE stream sends a snapshot, resumes from Last-Event-ID and ends at a final status"""
+    order_data = {
+        "items": [{"id": "item1", "name": "Test Dish", "price": 250, "quantity": 1}],
+        "tableNumber": 5, "customerName": "John Doe", "paymentMethod": "cash",
+        "total": 262.5, "subtotal": 250, "gst": 12.5
+    }
+    order_id = client.post("/api/orders", json=order_data).json()["id"]
+    other_id = client.post("/api/orders", json={**order_data, "tableNumber": 6}).json()["id"]
+    client.patch(f"/api/orders/{order_id}", json={"status": "preparing"})
+    client.patch(f"/api/orders/{other_id}", json={"status": "preparing"})
+    client.patch(f"/api/orders/{order_id}", json={"status": "completed"})
+    
+    response = client.get(f"/api/orders/{order_id}/events")
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert "content-encoding" not in response.headers
+    events = parse_sse(response.text)
+    assert [(e[1], e[2]["status"]) for e in events] == [("snapshot", "completed")]
+    
+    # Resuming after the new_order event replays only this order's updates
+    first_id = order_events.event_id(1)
+    response = client.get(f"/api/orders/{order_id}/events", headers={"Last-Event-ID": first_id})
+    events = parse_sse(response.text)
+    assert [(e[1], e[2]["status"]) for e in events] == [("order_updated", "preparing"), ("order_updated", "completed")]
+    
+    # Ids from another worker or boot fall back to a snapshot
+    response = client.get(f"/api/orders/{order_id}/events", headers={"Last-Event-ID": "0-1"})
+    assert parse_sse(response.text)[0][1] == "snapshot"
+    assert order_events.subscriber_count() == 0
+    assert client.get("/api/orders/order-missing/events").status_code == 404
+
+def test_event_streams_skip_gzip():
+    """Test large event streams go out uncompressed while other large responses are gzipped"""
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/event-stream")]})
+        await send({"type": "http.response.body", "body": b"data: x\n\n" * 500})
+    middleware = EventStreamAwareGZipMiddleware(app, minimum_size=1000)
+    
+    def encoding(path):
+        started = []
+        async def send(message):
+            if message["type"] == "http.response.start":
+                started.append(dict(message["headers"]))
+        async def receive():
+            return {"type": "http.request", "body": b""}
+        scope = {"type": "http", "method": "GET", "path": path, "headers": [(b"accept-encoding", b"gzip")]}
+        asyncio.run(middleware(scope, receive, send))
+        return started[0].get(b"content-encoding")
+    assert encoding("/api/orders/order-1/events") is None
+    assert encoding("/api/orders") == b"gzip"
+
+def test_get_order_etag_and_long_poll(client):
+    """Test GET /api/orders/{id} revalidates by ETag and long-polls with ?wait="""
+    order_data = {
+        "items": [{"id": "item1", "name": "Test Dish", "price": 250, "quantity": 1}],
+        "tableNumber": 5, "customerName": "John Doe", "paymentMethod": "cash",
+        "total": 262.5, "subtotal": 250, "gst": 12.5
+    }
+    order_id = client.post("/api/orders", json=order_data).json()["id"]
+    etag = client.get(f"/api/orders/{order_id}").headers["etag"]
+    
+    assert client.get(f"/api/orders/{order_id}", headers={"If-None-Match": etag}).status_code == 304
+    # Unchanged until the wait runs out
+    response = client.get(f"/api/orders/{order_id}?wait=0.2", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert not order_events.waiters
+    
+    client.patch(f"/api/orders/{order_id}", json={"status": "preparing"})
+    response = client.get(f"/api/orders/{order_id}?wait=30", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json()["status"] == "preparing"
+    assert response.headers["etag"] != etag
+
+def test_order_waiters_wake_on_events():
+    """Test parked long-polls wake on the next event for their order only"""
+    async def scenario():
+        hub = OrderEventHub()
+        waiter = hub.waiter("order-1")
+        other = hub.waiter("order-2")
+        hub.publish({"type": "order_updated", "orderId": "order-1", "status": "preparing"})
+        assert await hub.wait(waiter, 1)
+        assert not await hub.wait(other, 0.05)
+    asyncio.run(scenario())
+
 def test_update_order_status(client):
     """Test PATCH /api/orders/{id} updates order status"""
     # Create an order
@@ -281,6 +610,600 @@ def test_order_status_transitions(client):
         get_response = client.get(f"/api/orders/{order_id}")
         assert get_response.json()["status"] == status
 
+def test_order_ids_and_conditional_status_updates(client):
+    """Test order ids stay unique within a millisecond and status updates honour If-Match"""
+    assert len({new_order_id() for _ in range(5000)}) == 5000
+    
+    order_data = {
+        "items": [{"id": "item1", "name": "Test Dish", "price": 250, "quantity": 1}],
+        "tableNumber": 5, "customerName": "John Doe", "paymentMethod": "cash",
+        "total": 262.5, "subtotal": 250, "gst": 12.5
+    }
+    order_id = client.post("/api/orders", json=order_data).json()["id"]
+    assert client.patch(f"/api/orders/{order_id}", json={"status": "served"}).status_code == 422
+    
+    etag = client.get(f"/api/orders/{order_id}").headers["etag"]
+    assert client.patch(f"/api/orders/{order_id}", json={"status": "preparing"}, headers={"If-Match": etag}).status_code == 200
+    # A second screen still holding the old copy can't overwrite the change
+    stale = client.patch(f"/api/orders/{order_id}", json={"status": "cancelled"}, headers={"If-Match": etag})
+    assert stale.status_code == 412
+    assert client.get(f"/api/orders/{order_id}").json()["status"] == "preparing"
+    
+    client.patch(f"/api/orders/{order_id}", json={"status": "ready"})
+    timeline = client.get(f"/api/orders/{order_id}/timeline").json()["timeline"]
+    assert [(step["fromStatus"], step["status"]) for step in timeline] == [(None, "new"), ("new", "preparing"), ("preparing", "ready")]
+
+def test_table_running_bill(client):
+    """Test rounds at a table add up on one bill, cancellations come off it, and closing settles it"""
+    def place(table, subtotal):
+        response = client.post("/api/orders", json={
+            "items": [{"id": "item1", "name": "Dish", "price": int(subtotal), "quantity": 1}],
+            "tableNumber": table,
+            "customerName": "Guest",
+            "paymentMethod": "cash",
+            "total": subtotal * 1.05,
+            "subtotal": subtotal,
+            "gst": subtotal * 0.05
+        })
+        assert response.status_code == 200
+        return response.json()["id"]
+
+    assert client.get("/api/tables/3/bill").status_code == 404
+    first = place(3, 250)
+    place(3, 100.1)
+    place(4, 80)
+    bill = client.get("/api/tables/3/bill").json()
+    assert bill["orderCount"] == 2
+    assert bill["subtotal"] == 350.1
+    assert bill["total"] == 367.61
+    assert client.get(f"/api/orders/{first}").json()["sessionId"] == bill["sessionId"]
+
+    client.patch(f"/api/orders/{first}", json={"status": "cancelled"})
+    bill = client.get("/api/tables/3/bill").json()
+    assert bill["orderCount"] == 1
+    assert bill["subtotal"] == 100.1
+
+    settled = client.post("/api/tables/close", json={"tableNumbers": [3, 4, 9], "paymentMethod": "card"}).json()
+    assert sorted(b["tableNumber"] for b in settled["settled"]) == [3, 4]
+    assert all(b["status"] == "settled" and b["paymentMethod"] == "card" for b in settled["settled"])
+    assert settled["missing"] == [9]
+    assert client.get("/api/tables/3/bill").status_code == 404
+    assert client.post("/api/tables/3/close").status_code == 404
+
+    # The next round opens a fresh bill
+    place(3, 40)
+    bill = client.get("/api/tables/3/bill").json()
+    assert bill["orderCount"] == 1 and bill["subtotal"] == 40
+    assert client.post("/api/tables/3/close").json()["total"] == 42
+
+# Recommendation Tests
+
+def test_recommendations_from_order_history(client):
+    """Test item and cart recommendations follow what is ordered together"""
+    menu_item = {
+        "description": "A test dish",
+        "price": 250,
+        "category": "Main Course",
+        "available": True,
+        "preparationTime": 20,
+        "tags": [],
+        "aiRecommended": False
+    }
+    ids = {}
+    for name in ["Biryani", "Raita", "Naan"]:
+        ids[name] = client.post("/api/menu", json={**menu_item, "name": name}).json()["id"]
+    
+    def place(*names):
+        client.post("/api/orders", json={
+            "items": [{"id": ids[n], "name": n, "price": 250, "quantity": 1} for n in names],
+            "tableNumber": 1,
+            "customerName": "Guest",
+            "paymentMethod": "cash",
+            "total": 262.5,
+            "subtotal": 250,
+            "gst": 12.5
+        })
+    
+    place("Biryani", "Raita")
+    place("Biryani", "Raita")
+    # Counts built so far are updated incrementally from here on
+    client.get(f"/api/menu/{ids['Biryani']}/recommendations")
+    place("Biryani", "Naan")
+    
+    response = client.get(f"/api/menu/{ids['Biryani']}/recommendations")
+    assert response.status_code == 200
+    data = response.json()
+    assert [item["name"] for item in data["frequentlyOrderedWith"]] == ["Raita", "Naan"]
+    assert data["frequentlyOrderedWith"][0]["score"] == round(2 / 3, 4)
+    assert "Biryani" not in [item["name"] for item in data["popularNow"]]
+    
+    cart = client.post("/api/menu/recommendations", json={"itemIds": [ids["Raita"]]}).json()
+    assert [item["name"] for item in cart] == ["Biryani"]
+    
+    # Unavailable dishes are never recommended
+    client.put(f"/api/menu/{ids['Raita']}", json={**menu_item, "name": "Raita", "available": False})
+    data = client.get(f"/api/menu/{ids['Biryani']}/recommendations").json()
+    assert [item["name"] for item in data["frequentlyOrderedWith"]] == ["Naan"]
+    
+    assert client.get("/api/menu/missing/recommendations").status_code == 404
+    for limit in (-1, 0, 51):
+        assert client.get(f"/api/menu/{ids['Biryani']}/recommendations?limit={limit}").status_code == 422
+        assert client.post("/api/menu/recommendations", json={"itemIds": [ids["Raita"]], "limit": limit}).status_code == 422
+
+# Server Suggestion Tests
+
+def test_suggestions_use_order_state(client, db):
+    """Test server suggestions follow the real order's status, items and wait time"""
+    order_data = {
+        "items": [{"id": "item1", "name": "Butter Chicken", "price": 320, "quantity": 1, "category": "Main Course"}],
+        "tableNumber": 7,
+        "customerName": "John Doe",
+        "paymentMethod": "cash",
+        "total": 336,
+        "subtotal": 320,
+        "gst": 16
+    }
+    waiting_id = client.post("/api/orders", json=order_data).json()["id"]
+    ready_id = client.post("/api/orders", json={**order_data, "tableNumber": 3}).json()["id"]
+    client.patch(f"/api/orders/{ready_id}", json={"status": "ready"})
+    
+    waiting = db.query(Order).filter(Order.id == waiting_id).first()
+    placed = waiting.timestamp
+    
+    fresh = suggest_for_order(waiting, now=placed, local_hour=13)
+    assert fresh.suggestion == "Recommend a beverage pairing for table 7's main course"
+    
+    late = suggest_for_order(waiting, now=placed + timedelta(minutes=30), local_hour=13)
+    assert late.priority == 90
+    assert late.wait_minutes == 30
+    assert "Table 7 has waited 30 min" in late.suggestion
+    
+    ranked = suggest_for_orders(db.query(Order).all(), now=placed, local_hour=13)
+    assert [s.order_id for s in ranked] == [ready_id, waiting_id]
+    assert ranked[0].suggestion == "Food is ready - run it to table 3 now"
+
+def test_ai_routes_served_in_process(client):
+    """Test the AI router is mounted on the order API"""
+    response = client.post("/api/ai/customize", json={"custom_text": "extra spicy, no onions"})
+    assert response.status_code == 200
+    assert response.json()["kitchen_instruction"] == "KITCHEN: SPICE: EXTRA HIGH | REMOVE: ONIONS"
+    
+    assert client.post("/api/ai/suggest_action", json={"order_id": "missing"}).status_code == 404
+    assert client.get("/api/ai/suggest_actions").json() == []
+
+def test_customization_resolves_ingredients_from_menu(client):
+    """Test ingredient words are typo-corrected against the menu and non-ingredients dropped"""
+    def instruction(text):
+        return client.post("/api/ai/customize", json={"custom_text": text}).json()["kitchen_instruction"]
+    
+    assert instruction("no onoins") == "KITCHEN: REMOVE: ONIONS"
+    assert instruction("extra chese") == "KITCHEN: ADD: EXTRA CHEESE"
+    assert instruction("no thanks").startswith("KITCHEN: STANDARD PREPARATION")
+    assert instruction("no mushrom").startswith("KITCHEN: STANDARD PREPARATION")
+    
+    # Menu words join the vocabulary as soon as the menu changes
+    client.post("/api/menu", json={
+        "name": "Mushroom Masala",
+        "description": "Button mushrooms in cashew gravy",
+        "price": 300,
+        "category": "Main Course"
+    })
+    assert instruction("no mushrom") == "KITCHEN: REMOVE: MUSHROOM"
+    assert instruction("less cashw") == "KITCHEN: REDUCE: CASHEW"
+
+# Archive Tests
+
+def test_archive_moves_finished_orders(client):
+    """Test completed orders move to the archive and stay readable by id"""
+    order_data = {
+        "items": [{"id": "item1", "name": "Test Dish", "price": 250, "quantity": 1, "preparationTime": 20}],
+        "tableNumber": 5,
+        "customerName": "John Doe",
+        "paymentMethod": "cash",
+        "total": 262.5,
+        "subtotal": 250,
+        "gst": 12.5
+    }
+    done_id = client.post("/api/orders", json=order_data).json()["id"]
+    open_id = client.post("/api/orders", json={**order_data, "tableNumber": 6}).json()["id"]
+    client.patch(f"/api/orders/{done_id}", json={"status": "completed"})
+    
+    response = client.post("/api/orders/archive?olderThanHours=0")
+    assert response.status_code == 200
+    assert response.json()["archived"] == 1
+    
+    # Hot table only keeps the open order
+    orders = client.get("/api/orders").json()
+    assert [order["id"] for order in orders] == [open_id]
+    
+    # Lookup by id falls back to the archive
+    get_response = client.get(f"/api/orders/{done_id}")
+    assert get_response.status_code == 200
+    assert get_response.json()["status"] == "completed"
+    assert get_response.json()["customerName"] == "John Doe"
+
+def test_status_index_added_to_existing_database(tmp_path):
+    """Test databases created before the orders.status index get it on startup"""
+    old = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    Base.metadata.create_all(bind=old)
+    with old.begin() as conn:
+        conn.execute(text("DROP INDEX ix_orders_status"))
+    add_missing_indexes(old)
+    assert "ix_orders_status" in {index["name"] for index in inspect(old).get_indexes("orders")}
+    add_missing_indexes(old)  # idempotent
+    old.dispose()
+
+def test_archive_respects_age(client):
+    """Test recently finished orders stay in the hot table"""
+    order_data = {
+        "items": [{"id": "item1", "name": "Test Dish", "price": 250, "quantity": 1, "preparationTime": 20}],
+        "tableNumber": 5,
+        "customerName": "John Doe",
+        "paymentMethod": "cash",
+        "total": 262.5,
+        "subtotal": 250,
+        "gst": 12.5
+    }
+    order_id = client.post("/api/orders", json=order_data).json()["id"]
+    client.patch(f"/api/orders/{order_id}", json={"status": "cancelled"})
+    
+    response = client.post("/api/orders/archive?olderThanHours=24")
+    assert response.json()["archived"] == 0
+    assert len(client.get("/api/orders").json()) == 1
+
+# Prep Time Tests
+
+def test_prep_times_learned_from_history(client, db):
+    """Test prep times are fitted from order_events and feed the kitchen load"""
+    start = datetime.utcnow() - timedelta(days=1)
+    lines = [{"id": "item1", "name": "Biryani", "price": 300, "quantity": 1, "preparationTime": 20, "category": "Main Course"},
+             {"id": "item2", "name": "Lassi", "price": 80, "quantity": 1, "preparationTime": 5, "category": "Beverages"}]
+    # Six one-at-a-time orders that each spent 10 minutes preparing
+    for i in range(6):
+        placed = start + timedelta(hours=i)
+        order_id = f"order-history-{i}"
+        db.add(Order(id=order_id, customer_name="Guest", table_number=1, items=json.dumps(lines), status="completed",
+                     total=399, subtotal=380, gst=19, payment_method="cash", timestamp=placed))
+        for status, minutes in (("new", 0), ("preparing", 2), ("completed", 12)):
+            db.add(OrderEvent(order_id=order_id, to_status=status, at=placed + timedelta(minutes=minutes)))
+    db.commit()
+    
+    summary = client.post("/api/kitchen/prep-times/refit").json()
+    assert summary["ready"]
+    # The slow dish sets the order's pace; the drink never held an order up, so it keeps its static time
+    assert summary["items"] == {"item1": {"minutes": 10.0, "samples": 6}}
+    assert prep_model.item_minutes(lines[1]) == 5
+    
+    client.post("/api/orders", json={"items": lines, "tableNumber": 2, "customerName": "Guest",
+                                     "total": 399, "subtotal": 380, "gst": 19, "paymentMethod": "cash"})
+    load = client.get("/api/kitchen/load").json()
+    assert load["stations"]["kitchen"]["loadMinutes"] == 10.0
+    assert load["stations"]["bar"]["loadMinutes"] == 5.0
+    assert client.get("/api/kitchen/prep-times").json()["openOrders"] == 1
+
+# Inventory Tests
+
+def test_inventory_decrements_and_sells_out(client, monkeypatch):
+    """Test orders take stock, sell items out at zero and cancellations give stock back"""
+    events = []
+    async def capture(message):
+        events.append(message)
+    monkeypatch.setattr(manager, "broadcast", capture)
+    
+    menu_item = {"name": "Biryani", "description": "Rice", "price": 300, "category": "Main Course"}
+    item_id = client.post("/api/menu", json=menu_item).json()["id"]
+    assert client.put(f"/api/menu/{item_id}/stock", json={"stock": 3}).json()["available"] is True
+    
+    def order(quantity):
+        return client.post("/api/orders", json={
+            "items": [{"id": item_id, "name": "Biryani", "price": 300, "quantity": quantity},
+                      {"id": "item-untracked", "name": "Water", "price": 20, "quantity": 1}],
+            "tableNumber": 1, "customerName": "Guest", "total": 336, "subtotal": 320, "gst": 16, "paymentMethod": "cash"
+        })
+    
+    first = order(2)
+    assert first.status_code == 200
+    assert client.get("/api/menu/stock").json() == {item_id: 1}
+    
+    short = order(2)
+    assert short.status_code == 409
+    assert short.json()["detail"]["remainingStock"] == {item_id: 1}
+    assert client.get("/api/menu/stock").json() == {item_id: 1}
+    
+    events.clear()
+    assert order(1).status_code == 200
+    assert events[0]["type"] == "menu_updated"
+    assert events[0]["changes"] == [{"op": "patch", "id": item_id, "fields": {"available": False}}]
+    menu = client.get("/api/menu").json()
+    assert menu[0]["available"] is False
+    
+    client.patch(f"/api/orders/{first.json()['id']}", json={"status": "cancelled"})
+    assert client.get("/api/menu/stock").json() == {item_id: 2}
+    
+    # Restocking puts the dish back on sale; None stops tracking
+    assert client.put(f"/api/menu/{item_id}/stock", json={"stock": 5}).json()["available"] is True
+    client.put(f"/api/menu/{item_id}/stock", json={"stock": None})
+    assert client.get("/api/menu/stock").json() == {}
+    assert client.put(f"/api/menu/{item_id}/stock", json={"stock": -1}).status_code == 422
+
+def test_cancel_and_reinstate_move_stock(client, monkeypatch):
+    """Test a cancellation puts a sold-out dish back on sale and reinstating takes the stock again"""
+    events = []
+    async def capture(message):
+        events.append(message)
+    monkeypatch.setattr(manager, "broadcast", capture)
+    
+    item_id = client.post("/api/menu", json={"name": "Biryani", "description": "Rice", "price": 300,
+                                             "category": "Main Course"}).json()["id"]
+    client.put(f"/api/menu/{item_id}/stock", json={"stock": 1})
+    order = {"items": [{"id": item_id, "name": "Biryani", "price": 300, "quantity": 1}], "tableNumber": 3,
+             "customerName": "Guest", "total": 315, "subtotal": 300, "gst": 15, "paymentMethod": "cash"}
+    first_id = client.post("/api/orders", json=order).json()["id"]
+    assert client.get("/api/menu").json()[0]["available"] is False
+    
+    events.clear()
+    client.patch(f"/api/orders/{first_id}", json={"status": "cancelled"})
+    assert client.get("/api/menu/stock").json() == {item_id: 1}
+    assert client.get("/api/menu").json()[0]["available"] is True
+    assert events[0]["changes"] == [{"op": "patch", "id": item_id, "fields": {"available": True}}]
+    
+    assert client.patch(f"/api/orders/{first_id}", json={"status": "new"}).status_code == 200
+    assert client.get("/api/menu/stock").json() == {item_id: 0}
+    assert client.get("/api/menu").json()[0]["available"] is False
+    assert client.get("/api/tables/3/bill").json()["total"] == 315
+    
+    # Once the unit has gone to another order, the cancelled one can't come back
+    client.patch(f"/api/orders/{first_id}", json={"status": "cancelled"})
+    assert client.post("/api/orders", json={**order, "tableNumber": 4}).status_code == 200
+    response = client.patch(f"/api/orders/{first_id}", json={"status": "new"})
+    assert response.status_code == 409
+    assert response.json()["detail"]["remainingStock"] == {item_id: 0}
+    assert client.get(f"/api/orders/{first_id}").json()["status"] == "cancelled"
+    assert client.get("/api/tables/3/bill").json()["total"] == 0
+    assert client.get("/api/menu/stock").json() == {item_id: 0}
+    assert client.patch(f"/api/orders/{first_id}", json={"status": "completed"}).status_code == 409
+    
+    # Any move out of cancelled takes stock, and any move into it gives it back
+    client.put(f"/api/menu/{item_id}/stock", json={"stock": 1})
+    assert client.patch(f"/api/orders/{first_id}", json={"status": "completed"}).status_code == 200
+    assert client.get("/api/menu/stock").json() == {item_id: 0}
+    client.patch(f"/api/orders/{first_id}", json={"status": "cancelled"})
+    assert client.get("/api/menu/stock").json() == {item_id: 1}
+
+def test_cancel_keeps_dishes_taken_off_by_hand(client):
+    """Test stock given back by a cancellation doesn't re-list a dish staff marked unavailable"""
+    item_id = client.post("/api/menu", json={"name": "Biryani", "description": "Rice", "price": 300,
+                                             "category": "Main Course"}).json()["id"]
+    client.put(f"/api/menu/{item_id}/stock", json={"stock": 5})
+    order_id = client.post("/api/orders", json={
+        "items": [{"id": item_id, "name": "Biryani", "price": 300, "quantity": 1}], "tableNumber": 3,
+        "customerName": "Guest", "total": 315, "subtotal": 300, "gst": 15, "paymentMethod": "cash"
+    }).json()["id"]
+    client.patch(f"/api/menu/{item_id}/availability", json={"available": False})
+    
+    client.patch(f"/api/orders/{order_id}", json={"status": "cancelled"})
+    assert client.get("/api/menu/stock").json() == {item_id: 5}
+    assert client.get("/api/menu").json()[0]["available"] is False
+
+# Kitchen Capacity Tests
+
+def test_kitchen_load_and_quote_mode(client, monkeypatch):
+    """Test overloaded stations make create_order quote a wait until the guest accepts it"""
+    monkeypatch.setattr(capacity, "KITCHEN_THROTTLE_MODE", "quote")
+    monkeypatch.setattr(capacity, "KITCHEN_MAX_WAIT_MINUTES", 30)
+    order_data = {
+        "items": [{"id": "item1", "name": "Biryani", "price": 350, "quantity": 4, "category": "Main Course", "preparationTime": 30}],
+        "tableNumber": 5,
+        "customerName": "John Doe",
+        "paymentMethod": "cash",
+        "total": 1470,
+        "subtotal": 1400,
+        "gst": 70
+    }
+    first = client.post("/api/orders", json=order_data)
+    assert first.status_code == 200
+    assert first.json()["status"] == "new"
+    assert first.json()["quotedWaitMinutes"] == 30
+    
+    load = client.get("/api/kitchen/load").json()
+    assert load["stations"]["kitchen"] == {"loadMinutes": 120, "waitMinutes": 30}
+    assert load["overloaded"] is False
+    
+    client.post("/api/orders", json=order_data)
+    busy = client.post("/api/orders", json=order_data)
+    assert busy.status_code == 409
+    assert busy.json()["detail"]["quotedWaitMinutes"] == 90
+    assert len(client.get("/api/orders").json()) == 2
+    
+    # Drinks come from a different station and are not held up
+    drinks = {**order_data, "items": [{"id": "item5", "name": "Chai", "price": 60, "quantity": 1, "category": "Beverages", "preparationTime": 5}]}
+    assert client.post("/api/orders", json=drinks).status_code == 200
+    
+    accepted = client.post("/api/orders", json={**order_data, "acceptQuotedWait": True})
+    assert accepted.status_code == 200
+
+def test_kitchen_throttle_mode_validated():
+    """Test an unknown KITCHEN_THROTTLE_MODE is rejected instead of falling back to a mode"""
+    assert capacity.throttle_mode(" Queue ") == "queue"
+    with pytest.raises(ValueError):
+        capacity.throttle_mode("of")
+
+def test_kitchen_queue_mode(client, monkeypatch):
+    """Test overflow orders are parked as pending in queue mode"""
+    monkeypatch.setattr(capacity, "KITCHEN_THROTTLE_MODE", "queue")
+    monkeypatch.setattr(capacity, "KITCHEN_MAX_WAIT_MINUTES", 10)
+    order_data = {
+        "items": [{"id": "item1", "name": "Biryani", "price": 350, "quantity": 2, "category": "Main Course", "preparationTime": 30}],
+        "tableNumber": 5,
+        "customerName": "John Doe",
+        "paymentMethod": "cash",
+        "total": 735,
+        "subtotal": 700,
+        "gst": 35
+    }
+    first = client.post("/api/orders", json=order_data).json()
+    queued = client.post("/api/orders", json=order_data).json()
+    assert queued["status"] == "pending"
+    assert client.get(f"/api/orders/{queued['id']}").json()["status"] == "pending"
+    
+    # The queue keeps its place: with the kitchen clear, its work still comes first
+    client.patch(f"/api/orders/{first['id']}", json={"status": "completed"})
+    later = client.post("/api/orders", json=order_data).json()
+    assert later["status"] == "pending"
+    assert later["quotedWaitMinutes"] == 45
+
+# Admission Control Tests
+
+def test_rate_limit_per_table(client):
+    """Test a client polling too fast gets 429 with Retry-After, without affecting other tables"""
+    statuses = [client.get("/api/orders", headers={"X-Table-Number": "4"}).status_code for _ in range(25)]
+    assert statuses[:20] == [200] * 20
+    assert statuses[-1] == 429
+    
+    limited = client.get("/api/orders", headers={"X-Table-Number": "4"})
+    assert int(limited.headers["Retry-After"]) >= 1
+    assert client.get("/api/orders", headers={"X-Table-Number": "5"}).status_code == 200
+
+def test_rate_limit_key_from_query(client):
+    """Test EventSource requests, which can't set headers, are told apart by ?clientId="""
+    def scope(query, headers=()):
+        return {"headers": list(headers), "query_string": query, "client": ("10.0.0.1", 5000)}
+    assert client_key(scope(b"clientId=phone-1")) == "client:phone-1"
+    assert client_key(scope(b"clientId=phone-1", [(b"x-client-id", b"phone-2")])) == "client:phone-2"
+    assert client_key(scope(b"clientId=phone-1&table=7")) == "table:7"
+    assert client_key(scope(b"")) == "addr:10.0.0.1"
+    
+    statuses = [client.get("/api/orders?clientId=phone-1").status_code for _ in range(25)]
+    assert statuses[-1] == 429
+    assert client.get("/api/orders?clientId=phone-2").status_code == 200
+
+def test_db_concurrency_limit(client):
+    """Test DB-heavy requests beyond the concurrency cap are rejected"""
+    admission.in_flight = admission.concurrency_limit
+    try:
+        assert client.get("/api/orders").status_code == 429
+        assert client.get("/api/health").status_code == 200
+    finally:
+        admission.in_flight = 0
+    assert client.get("/api/orders").status_code == 200
+
+# WebSocket Tests
+
+def test_websocket_heartbeat_tracking(client):
+    """Test /ws connections are tracked for heartbeats and pongs get no reply"""
+    with client.websocket_connect("/ws") as websocket:
+        websocket.send_text(json.dumps({"type": "pong"}))
+        websocket.send_text("hello")
+        assert websocket.receive_json() == {"type": "ping"}
+        stats = client.get("/api/ws/stats").json()
+        assert stats["live"] == 1
+        assert stats["broadcastTargets"] == 1
+    assert client.get("/api/ws/stats").json()["live"] == 0
+
+class FakeSocket:
+    def __init__(self):
+        self.sent = []
+        self.closed = False
+    
+    async def send_json(self, message):
+        self.sent.append(message)
+    
+    async def send_text(self, frame):
+        self.sent.append(frame)
+    
+    async def send_bytes(self, frame):
+        self.sent.append(frame)
+    
+    async def close(self, code=1000):
+        self.closed = True
+
+def test_heartbeat_pings_and_reaps():
+    """Test the timer wheel pings quiet sockets and reaps the ones that never answer"""
+    async def scenario():
+        monitor = HeartbeatMonitor(interval=3, pong_timeout=2, tick=1)
+        reaped = []
+        monitor.on_reap = reaped.append
+        alive, dead = FakeSocket(), FakeSocket()
+        monitor.track(alive, now=0)
+        monitor.track(dead, now=0)
+        
+        for now in range(1, 4):
+            await monitor.tick(now=now)
+        assert alive.sent == [{"type": "ping"}] and dead.sent == [{"type": "ping"}]
+        
+        monitor.seen(alive, now=4)
+        for now in range(4, 6):
+            await monitor.tick(now=now)
+        assert reaped == [dead] and dead.closed
+        assert not alive.closed
+        assert monitor.stats()["live"] == 1
+        assert monitor.stats()["reaped"] == 1
+        
+        # Chatty clients aren't pinged until they go quiet for a full interval
+        monitor.seen(alive, now=7)
+        for now in range(6, 10):
+            await monitor.tick(now=now)
+        assert len(alive.sent) == 1
+        await monitor.tick(now=10)
+        assert len(alive.sent) == 2
+    asyncio.run(scenario())
+
+def test_broadcast_encodes_once_per_format(monkeypatch):
+    """Test a broadcast is encoded once per format however many sockets receive it"""
+    calls = []
+    encode = ws_encoding.encode_message
+    monkeypatch.setattr(ws_encoding, "encode_message", lambda message, fmt: calls.append(fmt) or encode(message, fmt))
+    sockets = {FakeSocket(): "json" for _ in range(3)}
+    if "msgpack" in ws_encoding.SUPPORTED_WS_ENCODINGS:
+        sockets.update({FakeSocket(): "msgpack" for _ in range(2)})
+    monkeypatch.setattr(manager, "active_connections", dict(sockets))
+    
+    message = {"type": "order_updated", "orderId": "order-1", "status": "preparing"}
+    asyncio.run(manager.broadcast(message))
+    assert sorted(calls) == sorted(set(sockets.values()))
+    for socket, fmt in sockets.items():
+        frame = socket.sent[0]
+        decoded = ws_encoding.msgpack.unpackb(frame) if fmt == "msgpack" else json.loads(frame)
+        assert decoded == message
+
+def test_websocket_encoding_negotiation(client):
+    """Test /ws?encoding= picks a supported format and falls back to JSON"""
+    assert ws_encoding.negotiate_ws_encoding("MSGPACK") in ws_encoding.SUPPORTED_WS_ENCODINGS
+    assert ws_encoding.negotiate_ws_encoding("xml") == "json"
+    if "msgpack" not in ws_encoding.SUPPORTED_WS_ENCODINGS:
+        return
+    with client.websocket_connect("/ws?encoding=msgpack") as websocket:
+        websocket.send_bytes(ws_encoding.msgpack.packb({"type": "hello"}))
+        assert ws_encoding.msgpack.unpackb(websocket.receive_bytes()) == {"type": "ping"}
+
+# Traffic Trace Tests
+
+def test_trace_recorder_keeps_replayable_requests(client, tmp_path):
+    """Test TRACE_FILE entries carry the request, its status and the id of a created order"""
+    trace = tmp_path / "trace.jsonl"
+    recorder = TraceRecorderMiddleware(app, path=str(trace))
+    traced = TestClient(recorder)
+    order = {"items": [{"id": "1", "name": "Dal", "price": 200, "quantity": 1, "customization": "less spicy"}],
+             "tableNumber": 4, "customerName": "Asha Rao", "customerInstructions": "call me on 98450 00000",
+             "paymentMethod": "upi", "total": 210, "subtotal": 200, "gst": 10}
+    created = traced.post("/api/orders", json=order, headers={"Idempotency-Key": "k-1", "Authorization": "secret"})
+    traced.get(f"/api/orders/{created.json()['id']}?wait=0")
+    recorder.flush()
+    
+    entries = [json.loads(line) for line in trace.read_text().splitlines()]
+    assert [(e["method"], e["path"], e["status"]) for e in entries] == [
+        ("POST", "/api/orders", 200), ("GET", f"/api/orders/{created.json()['id']}", 200)]
+    assert entries[0]["orderId"] == created.json()["id"]
+    body = json.loads(entries[0]["body"])
+    assert body["tableNumber"] == 4 and body["items"][0]["customization"] == "less spicy"
+    assert body["customerName"] == body["customerInstructions"] == "redacted"
+    assert "Asha" not in trace.read_text() and "98450" not in trace.read_text()
+    assert entries[0]["headers"]["idempotency-key"] == "k-1"
+    assert "authorization" not in entries[0]["headers"]
+    assert entries[1]["query"] == "wait=0" and "orderId" not in entries[1]
+    assert route_label("PATCH", f"/api/orders/{created.json()['id']}") == "PATCH /api/orders/{id}"
+    assert route_label("POST", "/api/tables/12/close") == "POST /api/tables/{n}/close"
+
 # Health Check Test
 
 def test_health_check(client):
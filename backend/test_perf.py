@@ -0,0 +1,79 @@
+"""
+Throughput regression suite
+Times the hottest paths and fails when one falls more than PERF_TOLERANCE
+below perf_baseline.json (see conftest.py). Skipped unless RUN_PERF=1;
+CI runs them as a separate job with:
+RUN_PERF=1 python -m pytest -m perf
+Record new baselines with:
+PERF_UPDATE_BASELINE=1 python -m pytest test_perf.py
+"""
+from datetime import datetime, timedelta
+from itertools import count
+import asyncio
+import json
+import pytest
+
+from main import manager, admission
+from database import Order, MenuItem
+from seed_menu import generate_menu_items
+from benchmark_ws import new_order_event
+
+class SilentSocket:
+    async def send_text(self, frame):
+        pass
+
+    async def send_bytes(self, frame):
+        pass
+
+@pytest.fixture
+def no_rate_limits(monkeypatch):
+    monkeypatch.setattr(admission, "enabled", False)
+
+@pytest.fixture
+def menu(db):
+    for item in generate_menu_items():
+        db.add(MenuItem(id=item['id'], name=item['name'], description=item['description'], price=item['price'],
+                        category=item['category'], available=True, preparation_time=item['preparation_time'],
+                        tags=json.dumps(item['tags']), ai_recommended=item['ai_recommended']))
+    db.commit()
+
+@pytest.fixture
+def order_history(db):
+    """A busy evening: 300 orders, a quarter of them still open"""
+    lines = new_order_event(lines=4)["order"]["items"]
+    start = datetime.utcnow() - timedelta(hours=5)
+    for i in range(300):
+        db.add(Order(id=f"order-history-{i}", customer_name="Guest", table_number=i % 40 + 1, items=json.dumps(lines),
+                     status="preparing" if i % 4 == 0 else "completed", total=1470, subtotal=1400, gst=70,
+                     payment_method="upi", timestamp=start + timedelta(minutes=i)))
+    db.commit()
+
+def test_create_order_throughput(client, benchmark, no_rate_limits):
+    tables = count(1)
+    lines = new_order_event(lines=3)["order"]["items"]
+    def place():
+        response = client.post("/api/orders", json={
+            "items": lines, "tableNumber": next(tables) % 50 + 1, "customerName": "Guest",
+            "paymentMethod": "upi", "total": 1050, "subtotal": 1000, "gst": 50,
+            "customerInstructions": "less spicy"
+        })
+        assert response.status_code == 200
+    benchmark(place, iterations=10)
+
+@pytest.mark.parametrize("query", ["", "?active=true"])
+def test_get_orders_throughput(client, benchmark, no_rate_limits, order_history, query):
+    client.get("/api/orders?active=true")  # load the open-order store before timing
+    benchmark(lambda: client.get(f"/api/orders{query}").raise_for_status(), iterations=5)
+
+def test_get_menu_throughput(client, benchmark, no_rate_limits, menu):
+    benchmark(lambda: client.get("/api/menu", headers={"Accept-Encoding": "br, gzip"}).raise_for_status())
+
+def test_broadcast_latency(benchmark, monkeypatch):
+    """A new_order broadcast to 100 kitchen and table screens"""
+    monkeypatch.setattr(manager, "active_connections", {SilentSocket(): "json" for _ in range(100)})
+    event = new_order_event()
+    loop = asyncio.new_event_loop()
+    try:
+        benchmark(lambda: loop.run_until_complete(manager.broadcast(event)), iterations=50)
+    finally:
+        loop.close()
@@ -0,0 +1,114 @@
+"""
+Request traces for load replay
+With TRACE_FILE set, every HTTP request is appended to that file as one
+JSON line: when it arrived, method, path, query, the headers that change
+how it is served and its body. Created order ids are kept too, so
+loadsim.py replay can point later requests at the orders it creates.
+Guest names and order instructions are redacted; the rest of each body,
+including dish customizations and table numbers, is kept as sent.
+A background thread does the file writes, off the event loop.
+"""
+from typing import Optional
+import json
+import os
+import queue
+import threading
+import time
+
+# JSON-lines file to append request traces to (unset disables tracing)
+TRACE_FILE = os.getenv('TRACE_FILE', '')
+
+# Headers replayed with each request
+TRACED_HEADERS = (
+    b'accept-encoding', b'content-type', b'idempotency-key', b'if-match', b'if-none-match',
+    b'last-event-id', b'x-client-id', b'x-table-number',
+)
+
+# JSON body fields that identify or describe a guest
+REDACTED_FIELDS = ('customerName', 'customerInstructions')
+
+def redact_body(body: bytes) -> Optional[str]:
+    """The request body as text with guest fields replaced"""
+    if not body:
+        return None
+    text = body.decode('utf-8', 'replace')
+    try:
+        data = json.loads(text)
+    except ValueError:
+        return text
+    if not isinstance(data, dict) or not any(data.get(field) for field in REDACTED_FIELDS):
+        return text
+    return json.dumps({key: 'redacted' if key in REDACTED_FIELDS and value else value for key, value in data.items()})
+
+def created_order_id(method: str, path: str, status: Optional[int], body: bytes) -> Optional[str]:
+    if method != 'POST' or path != '/api/orders' or status != 200:
+        return None
+    try:
+        return json.loads(body).get('id')
+    except (ValueError, AttributeError):
+        return None
+
+class TraceRecorderMiddleware:
+    """Append each HTTP request to a JSON-lines trace as plain ASGI middleware"""
+    def __init__(self, app, path: str):
+        self.app = app
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self.file = open(path, 'a', buffering=1)
+        self.lines: queue.Queue = queue.Queue()
+        threading.Thread(target=self.write_lines, name='trace-writer', daemon=True).start()
+
+    def write_lines(self):
+        while True:
+            line = self.lines.get()
+            try:
+                self.file.write(line)
+            finally:
+                self.lines.task_done()
+
+    def flush(self):
+        """Block until every queued entry is on disk"""
+        self.lines.join()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            return await self.app(scope, receive, send)
+
+        arrived = time.time()
+        request_body = bytearray()
+        response_body = bytearray()
+        status = None
+        wants_order_id = scope['method'] == 'POST' and scope['path'] == '/api/orders'
+
+        async def receive_and_keep():
+            message = await receive()
+            if message['type'] == 'http.request':
+                request_body.extend(message.get('body', b''))
+            return message
+
+        async def send_and_keep(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif wants_order_id and message['type'] == 'http.response.body':
+                response_body.extend(message.get('body', b''))
+            await send(message)
+
+        try:
+            await self.app(scope, receive_and_keep, send_and_keep)
+        finally:
+            headers = {name.decode('latin-1'): value.decode('latin-1')
+                       for name, value in scope.get('headers') or [] if name in TRACED_HEADERS}
+            entry = {
+                "at": arrived,
+                "method": scope['method'],
+                "path": scope['path'],
+                "query": (scope.get('query_string') or b'').decode('latin-1'),
+                "headers": headers,
+                "body": redact_body(bytes(request_body)),
+                "status": status,
+                "seconds": round(time.time() - arrived, 4),
+            }
+            order_id = created_order_id(scope['method'], scope['path'], status, bytes(response_body))
+            if order_id:
+                entry["orderId"] = order_id
+            self.lines.put_nowait(json.dumps(entry) + "\n")
@@ -0,0 +1,55 @@
+"""
+WebSocket message encodings
+Clients pick JSON (default) or MessagePack with /ws?encoding=msgpack.
+Each broadcast is encoded at most once per format, however many
+connections receive it. permessage-deflate is negotiated by uvicorn.
+"""
+from typing import Dict, Optional, Union
+import json
+import os
+
+try:
+    import msgpack
+except ImportError:  # msgpack is optional; JSON always works
+    msgpack = None
+
+# Compress /ws frames when the client offers permessage-deflate
+WS_PER_MESSAGE_DEFLATE = os.getenv('WS_PER_MESSAGE_DEFLATE', '1') != '0'
+
+SUPPORTED_WS_ENCODINGS = ['json', 'msgpack'] if msgpack else ['json']
+
+def negotiate_ws_encoding(requested: Optional[str]) -> str:
+    """Encoding for a connection; unknown or unavailable formats fall back to JSON"""
+    requested = (requested or '').lower()
+    return requested if requested in SUPPORTED_WS_ENCODINGS else 'json'
+
+def encode_message(message: dict, encoding: str) -> Union[str, bytes]:
+    """Text frame for JSON, binary frame for MessagePack"""
+    if encoding == 'msgpack':
+        return msgpack.packb(message, use_bin_type=True)
+    return json.dumps(message, separators=(',', ':'))
+
+class EncodedMessage:
+    """One broadcast message, encoded lazily and at most once per format"""
+    __slots__ = ('message', 'frames')
+
+    def __init__(self, message: dict):
+        self.message = message
+        self.frames: Dict[str, Union[str, bytes]] = {}
+
+    def frame(self, encoding: str) -> Union[str, bytes]:
+        frame = self.frames.get(encoding)
+        if frame is None:
+            frame = self.frames[encoding] = encode_message(self.message, encoding)
+        return frame
+
+def decode_client_message(frame: dict) -> Optional[dict]:
+    """Decode a received text/bytes frame; None if it isn't a message we understand"""
+    try:
+        if frame.get('bytes') is not None and msgpack:
+            message = msgpack.unpackb(frame['bytes'], raw=False)
+        else:
+            message = json.loads(frame.get('text') or '')
+    except ValueError:
+        return None
+    return message if isinstance(message, dict) else None
@@ -1,4 +1,4 @@
-import React, { useState } from 'react';
+import React, { useRef, useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import { ArrowBack, Person, TableRestaurant, Payment, CheckCircle } from '@mui/icons-material';
 import { useCart } from '../../shared/context/CartContext';
@@ -16,12 +16,14 @@ const CheckoutPage = () => {
     const [paymentMethod, setPaymentMethod] = useState(PAYMENT_METHODS.UPI);
     const [customerName, setCustomerName] = useState('');
     const [isProcessing, setIsProcessing] = useState(false);
+    // One key per distinct order, reused when "Place Order" is retried
+    const idempotencyKey = useRef(null);
 
     const subtotal = getCartTotal();
     const gst = Math.round(subtotal * 0.05);
     const total = subtotal + gst + 40; // Including delivery fee
 
-    const handlePlaceOrder = async () => {
+    const handlePlaceOrder = async (acceptQuotedWait = false) => {
         if (!tableNumber || !customerName.trim()) {
             toast.error('Please fill all details');
             return;
@@ -36,18 +38,31 @@ const CheckoutPage = () => {
                 paymentMethod,
                 total,
                 subtotal,
-                gst
+                gst,
+                ...(acceptQuotedWait ? { acceptQuotedWait: true } : {})
             };
 
-            const result = await createOrder(order);
+            const body = JSON.stringify(order);
+            if (idempotencyKey.current?.body !== body) {
+                idempotencyKey.current = { body, key: `${Date.now()}-${Math.random().toString(36).slice(2)}` };
+            }
+            const result = await createOrder(order, idempotencyKey.current.key);
             const orderId = result.id || result;
 
             toast.success('Order placed successfully!');
             clearCart();
             setTimeout(() => navigate(`/customer/track/${orderId}`), 1000);
         } catch (error) {
-            toast.error('Failed to place order');
             setIsProcessing(false);
+            // Kitchen is at capacity: let the guest accept the quoted wait and resubmit
+            const quotedWait = error.detail?.quotedWaitMinutes;
+            if (error.status === 409 && quotedWait !== undefined) {
+                if (window.confirm(`The kitchen is busy right now. Expected wait is about ${quotedWait} minutes. Place the order anyway?`)) {
+                    handlePlaceOrder(true);
+                }
+                return;
+            }
+            toast.error('Failed to place order');
         }
     };
 
@@ -126,7 +141,7 @@ const CheckoutPage = () => {
                     </div>
                     <button
                         className="z-pay-btn"
-                        onClick={handlePlaceOrder}
+                        onClick={() => handlePlaceOrder()}
                         disabled={isProcessing}
                     >
                         {isProcessing ? 'Processing...' : `PAY ₹${total}`}
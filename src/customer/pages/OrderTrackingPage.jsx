@@ -1,26 +1,69 @@
 import React, { useEffect, useState } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { ArrowBack, SupportAgent } from '@mui/icons-material';
-import { useOrders } from '../../shared/context/OrderContext';
+import api from '../../shared/services/api';
 import { ORDER_STATUS } from '../../utils/constants';
 import './OrderTrackingPage.css';
 
 const OrderTrackingPage = () => {
     const { orderId } = useParams();
     const navigate = useNavigate();
-    const { getOrderById } = useOrders();
     const [order, setOrder] = useState(null);
 
     useEffect(() => {
-        const loadOrder = () => {
-            const orderData = getOrderById(orderId);
-            setOrder(orderData);
+        let cancelled = false;
+        const isFinal = (status) => status === ORDER_STATUS.COMPLETED || status === ORDER_STATUS.CANCELLED;
+        // Long-poll, so requests only return when the order changes
+        const poll = async (etag) => {
+            while (!cancelled) {
+                try {
+                    const result = await api.waitForOrderChange(orderId, etag);
+                    if (result.order && !cancelled) {
+                        setOrder(result.order);
+                        if (isFinal(result.order.status)) {
+                            return;
+                        }
+                    }
+                    etag = result.etag;
+                } catch (err) {
+                    await new Promise(resolve => setTimeout(resolve, 5000));
+                }
+            }
         };
 
-        loadOrder();
-        const interval = setInterval(loadOrder, 5000);
-        return () => clearInterval(interval);
-    }, [orderId, getOrderById]);
+        if (typeof EventSource === 'undefined') {
+            // No streaming support; the first request has no ETag, so it returns the order straight away
+            poll(null);
+            return () => { cancelled = true; };
+        }
+
+        // One-way stream of just this order; the browser resumes it with Last-Event-ID after drops
+        const source = new EventSource(api.orderEventsUrl(orderId));
+        source.addEventListener('snapshot', (event) => {
+            const orderData = JSON.parse(event.data);
+            setOrder(orderData);
+            if (isFinal(orderData.status)) {
+                source.close();
+            }
+        });
+        source.addEventListener('order_updated', (event) => {
+            const { status } = JSON.parse(event.data);
+            setOrder(prev => prev ? { ...prev, status } : prev);
+            if (isFinal(status)) {
+                source.close();
+            }
+        });
+        source.onerror = () => {
+            // A non-200 answer (e.g. 429) makes the browser give up on the stream for good; fall back to long-polling
+            if (source.readyState === EventSource.CLOSED && !cancelled) {
+                poll(null);
+            }
+        };
+        return () => {
+            cancelled = true;
+            source.close();
+        };
+    }, [orderId]);
 
     if (!order) return <div className="z-loading">Loading...</div>;
 
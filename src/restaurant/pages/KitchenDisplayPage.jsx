@@ -87,10 +87,10 @@ const KitchenDisplayPage = () => {
                 <div className="kds-column new-column">
                     <div className="column-header">
                         <h3>New Orders</h3>
-                        <span className="count-badge">{getOrdersByStatus(ORDER_STATUS.NEW).length}</span>
+                        <span className="count-badge">{getOrdersByStatus(ORDER_STATUS.PENDING).length + getOrdersByStatus(ORDER_STATUS.NEW).length}</span>
                     </div>
                     <div className="column-content">
-                        {getOrdersByStatus(ORDER_STATUS.NEW).map(order => (
+                        {[...getOrdersByStatus(ORDER_STATUS.PENDING), ...getOrdersByStatus(ORDER_STATUS.NEW)].map(order => (
                             <OrderCard
                                 key={order.id}
                                 order={order}
@@ -157,7 +157,10 @@ const OrderCard = ({ order, onStatusUpdate, elapsedTime }) => {
         const processInstructions = async () => {
             const processed = {};
             for (const item of order.items) {
-                if (item.customization) {
+                if (item.kitchenInstruction) {
+                    // Parsed once by the server when the order was placed
+                    processed[item.id] = item.kitchenInstruction;
+                } else if (item.customization) {
                     processed[item.id] = await aiService.processCustomization(item.customization);
                 }
             }
@@ -168,6 +171,8 @@ const OrderCard = ({ order, onStatusUpdate, elapsedTime }) => {
 
     const getNextStatus = () => {
         switch (order.status) {
+            case ORDER_STATUS.PENDING:
+                return ORDER_STATUS.NEW;
             case ORDER_STATUS.NEW:
                 return ORDER_STATUS.PREPARING;
             case ORDER_STATUS.PREPARING:
@@ -181,6 +186,8 @@ const OrderCard = ({ order, onStatusUpdate, elapsedTime }) => {
 
     const getActionLabel = () => {
         switch (order.status) {
+            case ORDER_STATUS.PENDING:
+                return 'Accept Order';
             case ORDER_STATUS.NEW:
                 return 'Start Preparing';
             case ORDER_STATUS.PREPARING:
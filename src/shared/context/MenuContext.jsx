@@ -1,4 +1,4 @@
-import React, { createContext, useContext, useState, useEffect } from 'react';
+import React, { createContext, useContext, useState, useEffect, useRef } from 'react';
 import api from '../services/api';
 import websocket from '../services/websocket';
 
@@ -19,6 +19,10 @@ export const MenuProvider = ({ children }) => {
     ]);
     const [loading, setLoading] = useState(true);
     const [error, setError] = useState(null);
+    // Menu version our items reflect; null until a snapshot reports one
+    const menuVersion = useRef(null);
+    // Server process that numbered that version; versions restart with each deploy and differ per worker
+    const menuEpoch = useRef(null);
 
     // Load menu from backend on mount
     useEffect(() => {
@@ -29,9 +33,8 @@ export const MenuProvider = ({ children }) => {
     useEffect(() => {
         websocket.connect();
 
-        const unsubscribe = websocket.subscribe('menu_updated', () => {
-            console.log('Menu updated via WebSocket, reloading...');
-            loadMenu();
+        const unsubscribe = websocket.subscribe('menu_updated', (event) => {
+            applyMenuChanges(event);
         });
 
         return () => {
@@ -39,11 +42,49 @@ export const MenuProvider = ({ children }) => {
         };
     }, []);
 
+    // Patch items in place when the delta follows our version; refetch on a gap
+    const applyMenuChanges = (event) => {
+        if (!event || !Array.isArray(event.changes) || menuVersion.current === null
+            || event.epoch !== menuEpoch.current) {
+            loadMenu();
+            return;
+        }
+        if (event.version <= menuVersion.current) {
+            return;
+        }
+        if (event.baseVersion !== menuVersion.current) {
+            console.log('Missed menu updates, reloading...');
+            loadMenu();
+            return;
+        }
+
+        menuVersion.current = event.version;
+        setMenuItems(prev => {
+            let items = prev;
+            event.changes.forEach(change => {
+                if (change.op === 'delete') {
+                    items = items.filter(item => item.id !== change.id);
+                } else if (change.op === 'patch') {
+                    items = items.map(item => item.id === change.id ? { ...item, ...change.fields } : item);
+                } else if (change.op === 'upsert') {
+                    items = items.some(item => item.id === change.item.id)
+                        ? items.map(item => item.id === change.item.id ? change.item : item)
+                        : [...items, change.item];
+                }
+            });
+            return items;
+        });
+    };
+
     const loadMenu = async () => {
         try {
             setLoading(true);
             setError(null);
-            const items = await api.getMenu();
+            let version = null;
+            let epoch = null;
+            const items = await api.getMenu({ onVersion: (v, e) => { version = v; epoch = e; } });
+            menuVersion.current = version;
+            menuEpoch.current = epoch;
             setMenuItems(items);
 
             // Extract unique categories from menu items
@@ -133,9 +174,13 @@ export const MenuProvider = ({ children }) => {
                 throw new Error('Menu item not found');
             }
 
-            await updateMenuItem(itemId, { available: !item.available });
+            await api.setMenuItemAvailability(itemId, !item.available);
+            setMenuItems(prev =>
+                prev.map(menuItem => menuItem.id === itemId ? { ...menuItem, available: !item.available } : menuItem)
+            );
         } catch (err) {
             console.error('Error toggling availability:', err);
+            await loadMenu();
             throw err;
         }
     };
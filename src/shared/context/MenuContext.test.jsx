@@ -149,7 +149,7 @@ describe('MenuContext', () => {
             { id: 'item1', name: 'Dish 1', price: 250, category: 'Main Course', available: true }
         ];
         api.getMenu = jest.fn().mockResolvedValue(mockMenuItems);
-        api.updateMenuItem = jest.fn().mockResolvedValue({ message: 'Updated' });
+        api.setMenuItemAvailability = jest.fn().mockResolvedValue({ id: 'item1', available: false });
 
         let contextValue;
         render(
@@ -164,7 +164,8 @@ describe('MenuContext', () => {
             await contextValue.toggleAvailability('item1');
         });
 
-        expect(api.updateMenuItem).toHaveBeenCalledWith('item1', expect.objectContaining({ available: false }));
+        expect(api.setMenuItemAvailability).toHaveBeenCalledWith('item1', false);
+        expect(contextValue.menuItems[0].available).toBe(false);
     });
 
     test('WebSocket menu_updated event refreshes menu', async () => {
@@ -205,4 +206,51 @@ describe('MenuContext', () => {
             expect(contextValue.menuItems).toHaveLength(2);
         });
     });
+
+    test('WebSocket menu_updated delta patches items without refetching', async () => {
+        const initialItems = [{ id: 'item1', name: 'Dish 1', price: 250, category: 'Main Course' }];
+
+        let menuUpdatedCallback;
+        websocket.subscribe = jest.fn((eventType, callback) => {
+            if (eventType === 'menu_updated') {
+                menuUpdatedCallback = callback;
+            }
+            return jest.fn();
+        });
+
+        api.getMenu = jest.fn(async ({ onVersion } = {}) => {
+            onVersion(3);
+            return initialItems;
+        });
+
+        let contextValue;
+        render(
+            <MenuProvider>
+                <TestComponent onRender={(value) => { contextValue = value; }} />
+            </MenuProvider>
+        );
+
+        await waitFor(() => expect(contextValue.loading).toBe(false));
+
+        await act(async () => {
+            menuUpdatedCallback({
+                version: 4,
+                baseVersion: 3,
+                changes: [{ op: 'upsert', item: { id: 'item1', name: 'Dish 1', price: 300, category: 'Main Course' } }]
+            });
+        });
+        expect(contextValue.menuItems[0].price).toBe(300);
+
+        await act(async () => {
+            menuUpdatedCallback({ version: 5, baseVersion: 4, changes: [{ op: 'delete', id: 'item1' }] });
+        });
+        expect(contextValue.menuItems).toHaveLength(0);
+        expect(api.getMenu).toHaveBeenCalledTimes(1);
+
+        // A gap in versions falls back to a full refetch
+        await act(async () => {
+            menuUpdatedCallback({ version: 8, baseVersion: 7, changes: [] });
+        });
+        await waitFor(() => expect(api.getMenu).toHaveBeenCalledTimes(2));
+    });
 });
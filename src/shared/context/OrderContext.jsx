@@ -72,9 +72,11 @@ export const OrderProvider = ({ children }) => {
         }
     };
 
-    const createOrder = async (orderData) => {
+    const createOrder = async (orderData, idempotencyKey) => {
         try {
-            const response = await api.createOrder(orderData);
+            const response = idempotencyKey
+                ? await api.createOrder(orderData, idempotencyKey)
+                : await api.createOrder(orderData);
 
             // Add to user orders immediately
             const newOrder = {
@@ -1,23 +1,53 @@
 // API service for backend communication
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://127.0.0.1:8000';
 
+// Stable per-device id so server rate limits don't lump every phone on the restaurant Wi-Fi together
+const getClientId = () => {
+    try {
+        let clientId = localStorage.getItem('swiftserve-client-id');
+        if (!clientId) {
+            clientId = `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+            localStorage.setItem('swiftserve-client-id', clientId);
+        }
+        return clientId;
+    } catch (error) {
+        return undefined;
+    }
+};
+
 class ApiService {
     async request(endpoint, options = {}) {
         const url = `${API_BASE_URL}${endpoint}`;
+        const { headers, onResponse, ...rest } = options;
+        const clientId = getClientId();
         const config = {
+            ...rest,
             headers: {
                 'Content-Type': 'application/json',
-                ...options.headers,
+                ...(clientId ? { 'X-Client-Id': clientId } : {}),
+                ...headers,
             },
-            ...options,
         };
 
         try {
             const response = await fetch(url, config);
 
+            // Conditional requests answered "unchanged" resolve with null
+            if (response.status === 304) {
+                return null;
+            }
+
             if (!response.ok) {
                 const errorData = await response.json().catch(() => ({}));
-                throw new Error(errorData.detail || `API Error: ${response.statusText}`);
+                const detail = errorData.detail;
+                const error = new Error(detail?.message || detail || `API Error: ${response.statusText}`);
+                error.status = response.status;
+                error.detail = detail;
+                throw error;
+            }
+
+            if (options.onResponse) {
+                options.onResponse(response);
             }
 
             return await response.json();
@@ -74,8 +104,28 @@ class ApiService {
     }
 
     // Menu API methods
-    async getMenu() {
-        return this.get('/api/menu');
+    // onVersion receives the X-Menu-Version of the snapshot, for applying menu_updated deltas
+    async getMenu({ onVersion } = {}) {
+        return this.get('/api/menu', {
+            onResponse: onVersion
+                ? (response) => onVersion(
+                    Number(response.headers.get('X-Menu-Version')) || null,
+                    response.headers.get('X-Menu-Epoch')
+                )
+                : undefined,
+        });
+    }
+
+    async searchMenu(query, limit = 20) {
+        return this.get(`/api/menu/search?q=${encodeURIComponent(query)}&limit=${limit}`);
+    }
+
+    async getItemRecommendations(itemId, limit = 5) {
+        return this.get(`/api/menu/${itemId}/recommendations?limit=${limit}`);
+    }
+
+    async getCartRecommendations(itemIds, limit = 5) {
+        return this.post('/api/menu/recommendations', { itemIds, limit });
     }
 
     async createMenuItem(itemData) {
@@ -90,6 +140,28 @@ class ApiService {
         return this.delete(`/api/menu/${itemId}`);
     }
 
+    async setMenuItemAvailability(itemId, available) {
+        return this.patch(`/api/menu/${itemId}/availability`, { available });
+    }
+
+    async setMenuAvailability(itemIds, available) {
+        return this.patch('/api/menu/availability', { itemIds, available });
+    }
+
+    async getStock() {
+        return this.get('/api/menu/stock');
+    }
+
+    // stock of null stops tracking the item
+    async setStock(itemId, stock) {
+        return this.put(`/api/menu/${itemId}/stock`, { stock });
+    }
+
+    // Kitchen API methods
+    async getKitchenLoad() {
+        return this.get('/api/kitchen/load');
+    }
+
     // Order API methods
     async getOrders() {
         return this.get('/api/orders');
@@ -99,14 +171,47 @@ class ApiService {
         return this.get(`/api/orders/${orderId}`);
     }
 
-    async createOrder(orderData) {
-        return this.post('/api/orders', orderData);
+    // Long-poll: resolves once the order no longer matches etag, or with order null after `wait` seconds
+    async waitForOrderChange(orderId, etag, wait = 30) {
+        let newEtag = etag;
+        const order = await this.get(`/api/orders/${orderId}?wait=${wait}`, {
+            headers: etag ? { 'If-None-Match': etag } : {},
+            onResponse: (response) => { newEtag = response.headers.get('ETag'); },
+        });
+        return { order, etag: newEtag };
+    }
+
+    // Server-Sent Events stream of one order's updates, for EventSource
+    // EventSource can't send X-Client-Id, so the device id rides in the query for rate limiting
+    orderEventsUrl(orderId) {
+        const clientId = getClientId();
+        const query = clientId ? `?clientId=${encodeURIComponent(clientId)}` : '';
+        return `${API_BASE_URL}/api/orders/${orderId}/events${query}`;
+    }
+
+    async createOrder(orderData, idempotencyKey) {
+        // Reusing the key on retries stops a flaky connection from placing the order twice
+        const options = idempotencyKey ? { headers: { 'Idempotency-Key': idempotencyKey } } : {};
+        return this.post('/api/orders', orderData, options);
     }
 
     async updateOrderStatus(orderId, status) {
         return this.patch(`/api/orders/${orderId}`, { status });
     }
 
+    // Table bill API methods
+    async getTableBill(tableNumber) {
+        return this.get(`/api/tables/${tableNumber}/bill`);
+    }
+
+    async closeTable(tableNumber, paymentMethod) {
+        return this.post(`/api/tables/${tableNumber}/close`, { paymentMethod });
+    }
+
+    async closeTables(tableNumbers, paymentMethod) {
+        return this.post('/api/tables/close', { tableNumbers, paymentMethod });
+    }
+
     // AI API methods
     async processCustomization(customText) {
         return this.post('/api/ai/customize', { custom_text: customText });
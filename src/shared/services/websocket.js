@@ -76,8 +76,11 @@ class WebSocketService {
     handleMessage(data) {
         const { type, ...payload } = data;
 
-        // Handle ping/pong for keep-alive
+        // Answer server heartbeats so this connection isn't reaped as dead
         if (type === 'ping') {
+            if (this.ws?.readyState === WebSocket.OPEN) {
+                this.ws.send(JSON.stringify({ type: 'pong' }));
+            }
             return;
         }
 
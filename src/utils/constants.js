@@ -148,6 +148,7 @@ export const mockMenuData = [
 
 // App constants
 export const ORDER_STATUS = {
+    PENDING: 'pending',
     NEW: 'new',
     PREPARING: 'preparing',
     READY: 'ready',
@@ -156,6 +157,7 @@ export const ORDER_STATUS = {
 };
 
 export const ORDER_STATUS_LABELS = {
+    [ORDER_STATUS.PENDING]: 'Awaiting Kitchen',
     [ORDER_STATUS.NEW]: 'New Order',
     [ORDER_STATUS.PREPARING]: 'Preparing',
     [ORDER_STATUS.READY]: 'Ready',